@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+bench.py - מדידת ביצועים של subrecon בלי אינטרנט
+
+מרים שרת DNS סמכותי מקומי עם zones סינתטיים (כולל wildcard, שרת איטי
+והזרקת SERVFAIL) ושרת HTTP מקומי שמגיש תשובות בסגנון crt.sh, RapidDNS,
+HackerTarget ושאר המקורות. לכל שלב מדווחים: שאילתות לשנייה, latency
+p50/p99, הגידול בשיא ה-RSS מתחילת השלב וזמן ריצה. שלבי extract_* מודדים חילוץ שמות מדף גדול בסגנון
+RapidDNS, ו-bruteforce_parse_* מודדים את קצב ה-DNS כשבמקביל מפורסרים דפים
+גדולים (בתהליך הנוכחי מול process pool). הנתונים דטרמיניסטיים (seed קבוע) כך שאפשר
+להשוות בין ריצות ולזהות רגרסיות.
+
+השרתים רצים באותו תהליך (ב-threads), ולכן המספרים המוחלטים הם חסם תחתון;
+המטרה היא השוואה יחסית בין גרסאות על אותה מכונה.
+
+שימוש:
+    python3 bench.py                    # כל השלבים, פלט JSON
+    python3 bench.py --stages bruteforce,validate --repeat 3
+    python3 bench.py -o bench_output.txt
+"""
+
+import argparse
+import asyncio
+import functools
+import gc
+import json
+import random
+import re
+import resource
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+import requests
+
+import subrecon
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+SEED = 1337
+APEX = 'bench.test'
+
+
+# ==================== שרת DNS מקומי ====================
+
+def build_dns_response(query, rcode=0, answers=(), authority=()):
+    """בניית תשובה לשאילתה: answers/authority הם (rtype, ttl, rdata-bytes)"""
+    txid, _flags, _qd = struct.unpack('>HHH', query[:6])
+    end = 12
+    while query[end] != 0:
+        end += query[end] + 1
+    question = query[12:end + 5]
+    flags = 0x8400 | 0x0100 | 0x0080 | rcode  # QR, AA, RD, RA
+    packet = struct.pack('>HHHHHH', txid, flags, 1, len(answers), len(authority), 0) + question
+    for rtype, ttl, rdata in list(answers) + list(authority):
+        # 0xC00C = pointer לשם שבשאלה
+        packet += struct.pack('>HHHIH', 0xC00C, subrecon.DNS_RECORD_TYPES[rtype], 1, ttl, len(rdata)) + rdata
+    return packet
+
+
+def encode_name(name):
+    return b''.join(bytes([len(l)]) + l.encode() for l in name.split('.')) + b'\x00'
+
+
+class SyntheticZones:
+    """zones סינתטיים תחת bench.test
+
+    - hosts קיימים: <word>.bench.test עבור כל מילה N-ית ב-wordlist
+    - wild.bench.test: wildcard (*.wild.bench.test -> 10.9.9.9)
+    - slow.bench.test: כל תשובה מתעכבת slow_ms
+    - flaky.bench.test: SERVFAIL בהסתברות servfail_rate
+    """
+
+    def __init__(self, hosts, slow_ms=50, servfail_rate=0.2):
+        self.hosts = hosts
+        self.slow_ms = slow_ms
+        self.servfail_rate = servfail_rate
+        self.soa = encode_name(f'ns.{APEX}') + encode_name(f'admin.{APEX}') + struct.pack('>IIIII', 1, 3600, 600, 86400, 60)
+
+    def answer(self, name, rtype, rng):
+        """מחזיר (delay_seconds, rcode, answers, authority)"""
+        delay = self.slow_ms / 1000.0 if name.endswith(f'.slow.{APEX}') else 0.0
+        if name.endswith(f'.flaky.{APEX}') and rng.random() < self.servfail_rate:
+            return delay, 2, (), ()
+        address = self.hosts.get(name)
+        if address is None and name.endswith(f'.wild.{APEX}'):
+            address = '10.9.9.9'
+        if address is None:
+            return delay, 3, (), (('SOA', 60, self.soa),)
+        if rtype == 'A':
+            return delay, 0, (('A', 300, socket.inet_aton(address)),), ()
+        return delay, 0, (), (('SOA', 60, self.soa),)
+
+
+class _DNSServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server.queries += 1
+        try:
+            name, offset = subrecon._read_dns_name(data, 12)
+            qtype = struct.unpack('>H', data[offset:offset + 2])[0]
+        except (IndexError, ValueError, struct.error):
+            return
+        rtype = subrecon.DNS_RECORD_NAMES.get(qtype, str(qtype))
+        delay, rcode, answers, authority = self.server.zones.answer(name, rtype, self.server.rng)
+        if self.server.inject_servfail and self.server.rng.random() < self.server.inject_servfail:
+            rcode, answers, authority = 2, (), ()
+        packet = build_dns_response(data, rcode, answers, authority)
+        if delay:
+            asyncio.get_event_loop().call_later(delay, self.transport.sendto, packet, addr)
+        else:
+            self.transport.sendto(packet, addr)
+
+
+class LocalDNSServer:
+    """שרת DNS סמכותי מקומי על UDP ב-thread משלו"""
+
+    def __init__(self, zones, inject_servfail=0.0, seed=SEED):
+        self.zones = zones
+        self.inject_servfail = inject_servfail
+        self.rng = random.Random(seed)
+        self.queries = 0
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+
+        def runner():
+            asyncio.set_event_loop(self._loop)
+            transport, _ = self._loop.run_until_complete(self._loop.create_datagram_endpoint(
+                lambda: _DNSServerProtocol(self), local_addr=('127.0.0.1', 0)))
+            sock = transport.get_extra_info('socket')
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            self.port = transport.get_extra_info('sockname')[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=runner, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    @property
+    def address(self):
+        return f'127.0.0.1:{self.port}'
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+# ==================== שרת HTTP מקומי ====================
+
+def build_payloads(names, seed=SEED):
+    """תשובות בסגנון המקורות האמיתיים, לפי נתיב /<host>/..."""
+    rng = random.Random(seed)
+    certs = []
+    for i, name in enumerate(names):
+        certs.append({
+            'issuer_ca_id': 16418, 'issuer_name': 'C=US, O=Let\'s Encrypt, CN=R3',
+            'common_name': name, 'name_value': f'{name}\n*.{name}',
+            'id': 5000000 + i, 'entry_timestamp': '2024-01-01T00:00:00.000',
+            'not_before': '2024-01-01T00:00:00', 'not_after': '2024-04-01T00:00:00',
+            'serial_number': '%032x' % rng.getrandbits(128),
+        })
+    rows = ''.join(f'<tr><td>{n}</td><td>10.0.0.{i % 250}</td><td>A</td></tr>' for i, n in enumerate(names))
+    rapiddns = f'<html><body><table id="table">{rows}</table></body></html>'
+    scripts = ''.join(f'<script src="/static/app{i}.js"></script>' for i in range(3))
+    js = 'var endpoints = [' + ','.join(f'"https://{n}/api"' for n in names[:200]) + '];'
+    return {
+        'crt.sh': ('application/json', json.dumps(certs).encode()),
+        'api.hackertarget.com': ('text/plain', '\n'.join(f'{n},10.0.0.1' for n in names).encode()),
+        'jonlu.ca': ('application/json', json.dumps(names).encode()),
+        'threatcrowd.org': ('application/json', json.dumps({
+            'subdomains': names, 'resolutions': [{'domain': n} for n in names[:100]]}).encode()),
+        'rapiddns.io': ('text/html', rapiddns.encode()),
+        'dns.bufferover.run': ('application/json', json.dumps({
+            'FDNS_A': [f'10.0.0.1,{n}' for n in names]}).encode()),
+        'www.google.com': ('text/html', ''.join(f'<a href="https://{n}/">{n}</a>' for n in names[:50]).encode()),
+        'duckduckgo.com': ('text/html', ''.join(f'<a href="https://{n}/">{n}</a>' for n in names[:50]).encode()),
+        APEX: ('text/html', f'<html><head>{scripts}</head></html>'.encode()),
+        '__js__': ('application/javascript', js.encode()),
+    }
+
+
+def build_large_page(count):
+    """דף RapidDNS עם ?full=1 - טבלה אחת של count שורות (כ-60 בתים לשורה)"""
+    rows = ''.join(f'<tr><td>{i}</td><td><a href="/ip/{n}">{n}</a></td><td>10.0.{i % 250}.{i % 200}</td>'
+                   f'<td>A</td><td>2024-01-01</td></tr>'
+                   for i, n in enumerate(f'l{i:06d}.{APEX}' for i in range(count)))
+    return f'<html><body><table class="table">{rows}</table></body></html>'.encode()
+
+
+class LocalHTTPServer:
+    """שרת HTTP שמגיש את ה-payloads לפי ה-host המקורי שבנתיב"""
+
+    def __init__(self, payloads):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                host = self.path.lstrip('/').split('/', 1)[0]
+                if self.path.endswith('.js'):
+                    host = '__js__'
+                content_type, body = payloads.get(host, ('text/plain', b''))
+                self.send_response(200 if host in payloads else 404)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+
+
+class RewriteAdapter(requests.adapters.HTTPAdapter):
+    """מפנה כל בקשה (http/https לכל host) לשרת המקומי: /<host><path>"""
+
+    def __init__(self, base, **kwargs):
+        super().__init__(**kwargs)
+        self.base = base
+
+    def send(self, request, **kwargs):
+        parsed = urlparse(request.url)
+        path = parsed.path or '/'
+        query = f'?{parsed.query}' if parsed.query else ''
+        request.url = f'{self.base}/{parsed.hostname}{path}{query}'
+        kwargs['verify'] = False
+        return super().send(request, **kwargs)
+
+
+# ==================== מדידה ====================
+
+class TimedEngine(subrecon.AsyncDNSEngine):
+    """מנוע DNS שרושם latency לכל שאילתה שיוצאת לרשת"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    async def _query_network(self, name, rtype):
+        started = time.perf_counter()
+        try:
+            return await super()._query_network(name, rtype)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def reset_peak_rss():
+    """איפוס VmHWM (לינוקס) כדי שהשיא יימדד לכל שלב בנפרד"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _proc_status_mb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_mb():
+    return _proc_status_mb('VmRSS')
+
+
+def peak_rss_mb():
+    peak = _proc_status_mb('VmHWM')
+    if peak is not None:
+        return peak
+    # fallback: שיא לכל חיי התהליך (KB בלינוקס, bytes ב-macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Bench:
+    """מריץ שלבים מול השרתים המקומיים ואוסף מדדים"""
+
+    def __init__(self, words=20000, hit_every=50, passive_names=5000, dns_concurrency=500,
+                 large_page_names=100000):
+        rng = random.Random(SEED)
+        self.words = [f'w{i:06d}' for i in range(words)]
+        hosts = {f'{w}.{APEX}': f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+                 for w in self.words[::hit_every]}
+        self.passive_names = [f'p{i:05d}.{APEX}' for i in range(passive_names)]
+        for name in self.passive_names[::2]:
+            hosts[name] = '10.1.1.1'
+        self.zones = SyntheticZones(hosts)
+        self.dns_concurrency = dns_concurrency
+        self.primary = LocalDNSServer(self.zones).start()
+        self.secondary = LocalDNSServer(self.zones).start()
+        self.http = LocalHTTPServer(build_payloads(self.passive_names)).start()
+        self.large_page = build_large_page(large_page_names)
+
+    def new_enumerator(self, servfail=0.0):
+        """enumerator טרי עם cache ריק, מחווט לשרתים המקומיים"""
+        self.primary.inject_servfail = servfail
+        # המנוע נבנה כאן ונסגר ב-measure - ה-context לא יוצר מנוע משלו
+        engine = TimedEngine([self.primary.address, self.secondary.address], max_inflight=self.dns_concurrency,
+                             cache=subrecon.DNSCache(), timeout=1.0)
+        context = subrecon.ScanContext(dns_engine=engine)
+        context.rate_limiter = subrecon.HostRateLimiter(limits={}, default=(10000, 10000))
+        adapter = RewriteAdapter(self.http.base)
+        context.session.mount('http://', adapter)
+        context.session.mount('https://', adapter)
+        return subrecon.SubdomainEnumerator(APEX, context=context, quiet=True)
+
+    def measure(self, name, enumerator, func):
+        """הרצת שלב ומדידה; הזיכרון מדווח כגידול מה-RSS בתחילת השלב
+
+        ה-RSS של התהליך כולל את כל מה שנשאר משלבים קודמים, ולכן השיא המוחלט
+        לא אומר הרבה על שלב בודד. כשאיפוס VmHWM לא זמין, הגידול נמדד מול
+        השיא הקודם של התהליך (חסם תחתון).
+        """
+        queries_before = self.primary.queries + self.secondary.queries
+        gc.collect()
+        rss_start = current_rss_mb()
+        scoped = reset_peak_rss()
+        peak_before = peak_rss_mb()
+        baseline = rss_start if scoped and rss_start is not None else peak_before
+        started = time.perf_counter()
+        func()
+        wall = time.perf_counter() - started
+        queries = self.primary.queries + self.secondary.queries - queries_before
+        latencies = enumerator.dns_engine.latencies
+        peak = peak_rss_mb()
+        enumerator.context.close()
+        enumerator.dns_engine.close()
+        return {
+            'stage': name,
+            'wall_s': round(wall, 3),
+            'queries': queries,
+            'qps': round(queries / wall, 1) if wall else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'rss_start_mb': round(rss_start if rss_start is not None else peak_before, 1),
+            'peak_rss_delta_mb': round(max(peak - baseline, 0.0), 1),
+            'found': len(enumerator.subdomains),
+        }
+
+    # ---------- שלבים ----------
+
+    def stage_bruteforce(self):
+        e = self.new_enumerator()
+        return self.measure('bruteforce', e, lambda: e.dns_bruteforce_advanced(self.words))
+
+    def stage_bruteforce_wildcard(self):
+        e = self.new_enumerator()
+        words = [f'{w}.wild' for w in self.words[:5000]]
+        return self.measure('bruteforce_wildcard', e, lambda: e.dns_bruteforce_advanced(words))
+
+    def stage_bruteforce_slow(self):
+        e = self.new_enumerator()
+        words = [f'{w}.slow' for w in self.words[:5000]]
+        return self.measure('bruteforce_slow', e, lambda: e.dns_bruteforce_advanced(words))
+
+    def stage_bruteforce_servfail(self):
+        e = self.new_enumerator(servfail=0.3)
+        words = [f'{w}.flaky' for w in self.words[:5000]]
+        return self.measure('bruteforce_servfail', e, lambda: e.dns_bruteforce_advanced(words))
+
+    def stage_validate(self):
+        e = self.new_enumerator()
+        e.subdomains.update(self.passive_names)
+        return self.measure('validate', e, e.validate_all_subdomains)
+
+    def _extract_stage(self, name, extract):
+        e = self.new_enumerator()
+
+        def run():
+            for host in extract(self.large_page):
+                e.add_subdomain(host, 'rapiddns')
+        return self.measure(name, e, run)
+
+    def stage_extract_bs4(self):
+        # הפרסור הישן של rapiddns - לנקודת השוואה
+        def extract(body):
+            text = body.decode('utf-8', errors='replace')
+            soup = BeautifulSoup(text, 'html.parser')
+            for row in soup.find_all('tr'):
+                cols = row.find_all('td')
+                if cols and APEX in cols[0].text:
+                    yield cols[0].text.strip()
+            yield from re.findall(r'[\w\.-]+\.' + re.escape(APEX), text, re.IGNORECASE)
+        return self._extract_stage('extract_bs4', extract)
+
+    def _extractor_stage(self, name, backend):
+        extractor = subrecon.HostExtractor(backend, workers=0)
+        return lambda: self._extract_stage(name, functools.partial(extractor.extract, APEX))
+
+    def _parse_during_bruteforce(self, name, workers):
+        """brute force כשב-thread אחר מפורסרים שוב ושוב דפים גדולים"""
+        e = self.new_enumerator()
+        extractor = subrecon.HostExtractor(workers=workers, offload_threshold=0)
+        extractor.extract(APEX, b'')  # חימום ה-process pool מחוץ למדידה
+        done = threading.Event()
+        pages = 0
+
+        def parse():
+            nonlocal pages
+            while not done.is_set():
+                extractor.extract(APEX, self.large_page)
+                pages += 1
+
+        def run():
+            parser = threading.Thread(target=parse, daemon=True)
+            parser.start()
+            try:
+                e.dns_bruteforce_advanced(self.words)
+            finally:
+                done.set()
+                parser.join()
+        result = self.measure(name, e, run)
+        extractor.close()
+        result['pages_parsed'] = pages
+        return result
+
+    def _passive_stage(self, method_name):
+        def stage():
+            e = self.new_enumerator()
+            return self.measure(f'passive_{method_name}', e, getattr(e, method_name))
+        return stage
+
+    def stages(self):
+        stages = {
+            'bruteforce': self.stage_bruteforce,
+            'bruteforce_wildcard': self.stage_bruteforce_wildcard,
+            'bruteforce_slow': self.stage_bruteforce_slow,
+            'bruteforce_servfail': self.stage_bruteforce_servfail,
+            'validate': self.stage_validate,
+        }
+        for method in ('crt_sh_advanced', 'hackertarget_dns', 'anubis_db', 'threatcrowd',
+                       'rapiddns', 'dnsbufferoverrun', 'find_subdomains_from_js'):
+            stages[f'passive_{method}'] = self._passive_stage(method)
+        if BeautifulSoup is not None:
+            stages['extract_bs4'] = self.stage_extract_bs4
+        stages['extract_regex'] = self._extractor_stage('extract_regex', 'regex')
+        if subrecon.LXML_AVAILABLE:
+            stages['extract_lxml'] = self._extractor_stage('extract_lxml', 'lxml')
+        stages['bruteforce_parse_inline'] = lambda: self._parse_during_bruteforce('bruteforce_parse_inline', 0)
+        stages['bruteforce_parse_offload'] = lambda: self._parse_during_bruteforce('bruteforce_parse_offload', 1)
+        return stages
+
+
+def median_result(runs):
+    """איחוד חזרות: חציון לכל מדד מספרי"""
+    merged = dict(runs[0])
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)) and key != 'found':
+            merged[key] = round(statistics.median(r[key] for r in runs), 3)
+    merged['runs'] = len(runs)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark for subrecon')
+    parser.add_argument('--stages', help='Comma separated stages (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Repetitions per stage; the median is reported')
+    parser.add_argument('--words', type=int, default=20000, help='Brute force wordlist size (default: 20000)')
+    parser.add_argument('--passive-names', type=int, default=5000, help='Names in passive payloads (default: 5000)')
+    parser.add_argument('--dns-concurrency', type=int, default=500, help='Engine in-flight limit (default: 500)')
+    parser.add_argument('--large-page-names', type=int, default=100000,
+                        help='Rows in the large page for extract_* stages (default: 100000)')
+    parser.add_argument('-o', '--output', help='Write the JSON report to a file')
+    parser.add_argument('--list', action='store_true', help='List available stages')
+    args = parser.parse_args()
+
+    bench = Bench(words=args.words, passive_names=args.passive_names, dns_concurrency=args.dns_concurrency,
+                  large_page_names=args.large_page_names)
+    available = bench.stages()
+    if args.list:
+        print('\n'.join(available))
+        return
+    selected = args.stages.split(',') if args.stages else list(available)
+    unknown = [s for s in selected if s not in available]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    results = []
+    for name in selected:
+        runs = [available[name]() for _ in range(args.repeat)]
+        result = median_result(runs)
+        results.append(result)
+        print(f"{name:32} {result['wall_s']:8.3f}s {result['qps']:10.1f} q/s "
+              f"p50 {result['p50_ms']:7.2f}ms p99 {result['p99_ms']:8.2f}ms "
+              f"rss +{result['peak_rss_delta_mb']:6.1f}MB found {result['found']}", file=sys.stderr)
+
+    report = {
+        'python': sys.version.split()[0],
+        'seed': SEED,
+        'params': {'words': args.words, 'passive_names': args.passive_names,
+                   'dns_concurrency': args.dns_concurrency, 'large_page_names': args.large_page_names,
+                   'repeat': args.repeat},
+        'stages': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,18 +13,48 @@ import os
 import re
 import random
 import socket
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urlparse, urljoin
-from collections import OrderedDict
-from bs4 import BeautifulSoup
+import struct
+import math
+import hashlib
+import hmac
+import ipaddress
+import mmap
+import array
+import codecs
+import zlib
+import shutil
+import tempfile
+import itertools
+import functools
+import heapq
+import asyncio
+import contextvars
+import threading
+import multiprocessing
+import signal
+import socketserver
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse, urljoin
+from requests.adapters import HTTPAdapter
+from collections import Counter, OrderedDict, deque
 
 # התקנת התלויות הנדרשות:
-# pip install requests beautifulsoup4 dnspython
+# pip install requests dnspython
+# אופציונלי: pip install lxml (backend פרסור HTML)
 
 try:
     import dns.resolver
     import dns.query
+    import dns.zone
     DNS_AVAILABLE = True
+    try:
+        import dns.nameserver  # dnspython >= 2.4: port לכל שרת
+    except ImportError:
+        pass
 except ImportError:
     DNS_AVAILABLE = False
     print("[!] Warning: dnspython not installed. Some features will be limited.")
@@ -44,147 +74,3137 @@ try:
 except ImportError:
     TQDM_AVAILABLE = False
 
+try:
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# תיקיית הקונפיגורציה (נוצרת ע"י install.sh / setup.sh)
+CONFIG_DIR = os.path.join(os.path.expanduser('~'), '.subrecon')
+DEFAULT_DNS_CACHE = os.path.join(CONFIG_DIR, 'dns_cache.jsonl')
+DEFAULT_HTTP_CACHE = os.path.join(CONFIG_DIR, 'http_cache')
+
+# קצב בקשות לכל host: (בקשות לשנייה, burst)
+HOST_RATE_LIMITS = {
+    'crt.sh': (1.0, 2),
+    'www.google.com': (0.5, 1),
+    'duckduckgo.com': (0.5, 1),
+}
+DEFAULT_HOST_RATE = (2.0, 4)
+
+# ==================== מנוע DNS אסינכרוני ====================
+
+DNS_RECORD_TYPES = {
+    'A': 1, 'NS': 2, 'CNAME': 5, 'SOA': 6, 'PTR': 12,
+    'MX': 15, 'TXT': 16, 'AAAA': 28,
+}
+DNS_RECORD_NAMES = {v: k for k, v in DNS_RECORD_TYPES.items()}
+DNS_RCODES = {
+    0: 'NOERROR', 1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN',
+    4: 'NOTIMP', 5: 'REFUSED',
+}
+
+
+def build_dns_query(txid, name, rtype='A'):
+    """בניית חבילת שאילתה בפורמט wire (RFC 1035) עם RD דלוק"""
+    qname = b''
+    for label in name.rstrip('.').split('.'):
+        encoded = label.encode('ascii')
+        if not encoded or len(encoded) > 63:
+            raise ValueError(f"Invalid label in {name!r}")
+        qname += bytes([len(encoded)]) + encoded
+    qname += b'\x00'
+    header = struct.pack('>HHHHHH', txid, 0x0100, 1, 0, 0, 0)
+    return header + qname + struct.pack('>HH', DNS_RECORD_TYPES[rtype], 1)
+
+
+def _read_dns_name(data, offset):
+    """קריאת שם מחבילה כולל תמיכה ב-compression pointers"""
+    labels = []
+    jumped = False
+    end = offset
+    for _ in range(128):  # הגנה מלולאות pointers
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            pointer = ((length & 0x3F) << 8) | data[offset + 1]
+            if not jumped:
+                end = offset + 2
+            jumped = True
+            offset = pointer
+            continue
+        if length == 0:
+            if not jumped:
+                end = offset + 1
+            return '.'.join(labels).lower(), end
+        offset += 1
+        labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+        offset += length
+    raise ValueError("DNS name compression loop")
+
+
+def parse_dns_response(data):
+    """פענוח תשובת DNS: מחזיר (txid, rcode, qname, records, authority)
+
+    כל רשומה היא tuple של (name, rtype, ttl, value).
+    """
+    txid, flags, qdcount, ancount, nscount, arcount = struct.unpack('>HHHHHH', data[:12])
+    rcode = DNS_RCODES.get(flags & 0x000F, str(flags & 0x000F))
+    offset = 12
+    qname = ''
+    for _ in range(qdcount):
+        qname, offset = _read_dns_name(data, offset)
+        offset += 4
+
+    sections = ([], [])
+    for section, count in zip(sections, (ancount, nscount)):
+        for _ in range(count):
+            name, offset = _read_dns_name(data, offset)
+            rtype, _rclass, ttl, rdlength = struct.unpack('>HHIH', data[offset:offset + 10])
+            offset += 10
+            rdata_offset = offset
+            offset += rdlength
+            type_name = DNS_RECORD_NAMES.get(rtype, str(rtype))
+            if type_name == 'A' and rdlength == 4:
+                value = socket.inet_ntoa(data[rdata_offset:offset])
+            elif type_name == 'AAAA' and rdlength == 16:
+                value = socket.inet_ntop(socket.AF_INET6, data[rdata_offset:offset])
+            elif type_name in ('CNAME', 'NS', 'PTR'):
+                value, _ = _read_dns_name(data, rdata_offset)
+            elif type_name == 'SOA':
+                mname, pos = _read_dns_name(data, rdata_offset)
+                _rname, pos = _read_dns_name(data, pos)
+                # השדה האחרון ב-SOA הוא ה-minimum (TTL שלילי)
+                minimum = struct.unpack('>I', data[pos + 16:pos + 20])[0]
+                value = (mname, minimum)
+            else:
+                value = data[rdata_offset:offset]
+            section.append((name, type_name, ttl, value))
+    return txid, rcode, qname, sections[0], sections[1]
+
+
+# סוג "מדומה" לוולידציה: A ו-AAAA יחד, כולל שרשרת ה-CNAME
+ADDRESS_TYPES = ('A', 'AAAA')
+MAX_CNAME_CHAIN = 8
+
+
+class CNAMEMemo(dict):
+    """יעדי CNAME שכבר נפתרו בסריקה (שם -> future), וההמתנות בין ה-futures
+
+    waiting[name] = target כשה-future של name ממתין ל-future של target. לפני
+    המתנה ל-future קיים בודקים שהוא לא ממתין (דרך שרשרת אחרת) לנו עצמנו.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = {}
+
+    def would_cycle(self, name, target):
+        node = target
+        for _ in range(len(self.waiting) + 1):
+            if node == name:
+                return True
+            node = self.waiting.get(node)
+            if node is None:
+                return False
+        return True
+
+
+class DNSResult:
+    """תוצאת שאילתה אחת מהמנוע"""
+    __slots__ = ('name', 'rtype', 'rcode', 'records', 'authority', 'resolver')
+
+    def __init__(self, name, rtype, rcode, records=(), authority=(), resolver=None):
+        self.name = name
+        self.rtype = rtype
+        self.rcode = rcode
+        self.records = list(records)
+        self.authority = list(authority)
+        self.resolver = resolver
+
+    @property
+    def found(self):
+        """האם התקבלה תשובה חיובית מהסוג המבוקש (ל-ADDR: A או AAAA)"""
+        wanted = ADDRESS_TYPES if self.rtype == 'ADDR' else (self.rtype,)
+        return self.rcode == 'NOERROR' and any(r[1] in wanted for r in self.records)
+
+    def values(self, rtype=None):
+        rtype = rtype or self.rtype
+        wanted = ADDRESS_TYPES if rtype == 'ADDR' else (rtype,)
+        return [r[3] for r in self.records if r[1] in wanted]
+
+    def __repr__(self):
+        return f"DNSResult({self.name!r}, {self.rtype}, {self.rcode}, {len(self.records)} records)"
+
+
+def parse_nameserver(ns):
+    """תמיכה ב-'ip', 'ip:port' ו-'[ipv6]:port'"""
+    if isinstance(ns, tuple):
+        return ns
+    if ns.startswith('['):
+        host, _, port = ns[1:].partition(']:')
+        return host.rstrip(']'), int(port or 53)
+    if ns.count(':') == 1:
+        host, port = ns.split(':')
+        return host, int(port)
+    return ns, 53
+
+
+def format_nameserver(server):
+    """הפעולה ההפוכה ל-parse_nameserver"""
+    host, port = server
+    if port == 53:
+        return host
+    return f"[{host}]:{port}" if ':' in host else f"{host}:{port}"
+
+
+def dnspython_resolver(nameservers):
+    """Resolver של dnspython על אותם resolvers (כולל 'ip:port') - dnspython לא מקבל port במחרוזת"""
+    servers = [parse_nameserver(ns) for ns in nameservers]
+    resolver = dns.resolver.Resolver(configure=False)
+    if hasattr(dns, 'nameserver'):
+        resolver.nameservers = [dns.nameserver.Do53Nameserver(host, port) for host, port in servers]
+    else:
+        resolver.nameservers = [host for host, _port in servers]
+        resolver.port = servers[0][1] if servers else 53
+    return resolver
+
+
+# גבולות ה-buckets של היסטוגרמת ה-latency (שניות)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class ResolverHealth:
+    """מצב בריאות של resolver בודד - latency ו-error rate ממוצעים (EWMA)
+
+    בנוסף נשמרים מונים מצטברים לייצוא: ספירת rcodes והיסטוגרמת latency.
+    """
+    __slots__ = ('server', 'latency', 'error_rate', 'queries', 'errors', 'rcodes',
+                 'latency_buckets', 'latency_sum', 'latency_count')
+
+    ALPHA = 0.2
+
+    def __init__(self, server):
+        self.server = server
+        self.latency = 0.1
+        self.error_rate = 0.0
+        self.queries = 0
+        self.errors = 0
+        self.rcodes = {}
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+
+    def record(self, latency, rcode):
+        self.queries += 1
+        self.rcodes[rcode] = self.rcodes.get(rcode, 0) + 1
+        failed = rcode in ('TIMEOUT', 'SERVFAIL', 'REFUSED', 'NETERR')
+        if failed:
+            self.errors += 1
+        self.error_rate += self.ALPHA * ((1.0 if failed else 0.0) - self.error_rate)
+        if latency is not None:
+            self.latency += self.ALPHA * (latency - self.latency)
+            self.latency_sum += latency
+            self.latency_count += 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    self.latency_buckets[i] += 1
+                    break
+
+    @property
+    def label(self):
+        return self.server[0] if self.server[1] == 53 else f"{self.server[0]}:{self.server[1]}"
+
+    @property
+    def weight(self):
+        """משקל לניתוב: מהיר ואמין = משקל גבוה, עם רצפה כדי לבדוק התאוששות"""
+        penalty = (1.0 + 10.0 * self.error_rate) ** 2
+        return max(1.0 / (max(self.latency, 0.001) * penalty), 0.05)
+
+
+class ResolverPool:
+    """מאגר resolvers עם ניקוד בריאות וניתוב משוקלל
+
+    כל תשובה (או timeout) מעדכנת את הניקוד של השרת, ו-pick() בוחר שרת
+    באקראיות משוקללת כך שתנועה מתרחקת משרתים איטיים או שמחזירים שגיאות.
+    """
+
+    def __init__(self, nameservers, initial_concurrency=20, max_concurrency=500):
+        self.servers = [parse_nameserver(ns) for ns in nameservers]
+        self.health = {server: ResolverHealth(server) for server in self.servers}
+        # מגבלת in-flight אדפטיבית לכל resolver
+        self.limits = {server: AIMDController(initial_concurrency, 1, max_concurrency)
+                       for server in self.servers}
+
+    def __len__(self):
+        return len(self.servers)
+
+    def pick(self, exclude=(), candidates=None):
+        candidates = [s for s in (candidates or self.servers) if s not in exclude] or candidates or self.servers
+        weights = [self.health[s].weight for s in candidates]
+        return random.choices(candidates, weights)[0]
+
+    def record(self, server, latency, rcode):
+        self.health[server].record(latency, rcode)
+
+    def total_queries(self):
+        return sum(h.queries for h in self.health.values())
+
+    def summary(self):
+        """סיכום מצב לכל שרת, ממוין לפי משקל"""
+        rows = []
+        for server in self.servers:
+            h = self.health[server]
+            rows.append({
+                'server': h.label,
+                'queries': h.queries,
+                'errors': h.errors,
+                'latency_ms': round(h.latency * 1000, 1),
+                'error_rate': round(h.error_rate, 3),
+                'weight': round(h.weight, 2),
+                'limit': int(self.limits[server].limit),
+            })
+        return sorted(rows, key=lambda r: -r['weight'])
+
+
+class DNSCache:
+    """cache תשובות DNS משותף לכל שלבי הסריקה
+
+    מפתח: (name, rtype). מכבד TTL, שומר גם תשובות שליליות (NXDOMAIN / NODATA
+    לפי ה-SOA minimum, RFC 2308), מפנה לפי LRU כשעוברים את תקרת הזיכרון,
+    ויכול להישמר לדיסק כדי שסריקה חוזרת של אותה מטרה תדלג על עבודה שכבר נעשתה.
+    """
+
+    NEGATIVE_TTL = 300
+    MAX_TTL = 86400
+
+    def __init__(self, max_entries=500000, max_bytes=256 * 1024 * 1024, path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0  # שורות פגומות שדולגו ב-load
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _entry_size(name, records):
+        return 160 + len(name) + sum(64 + len(str(r[3])) for r in records)
+
+    @classmethod
+    def ttl_for(cls, rcode, rtype, records, authority):
+        """חישוב TTL לשמירה; None = לא שומרים (שגיאות זמניות)"""
+        if rcode == 'NOERROR' and any(r[1] == rtype for r in records):
+            return min(min(r[2] for r in records), cls.MAX_TTL)
+        if rcode in ('NOERROR', 'NXDOMAIN'):
+            for _name, rt, ttl, value in authority:
+                if rt == 'SOA':
+                    return min(ttl, value[1], cls.MAX_TTL)
+            return cls.NEGATIVE_TTL
+        return None
+
+    def get(self, name, rtype):
+        key = (name, rtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, rcode, records, resolver, size = entry
+            if expires <= time.time():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return DNSResult(name, rtype, rcode, records, (), resolver)
+
+    def put(self, result):
+        ttl = self.ttl_for(result.rcode, result.rtype, result.records, result.authority)
+        if ttl is None:
+            return
+        self._store((result.name, result.rtype), time.time() + ttl,
+                    result.rcode, result.records, result.resolver)
+
+    def _store(self, key, expires, rcode, records, resolver):
+        size = self._entry_size(key[0], records)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[4]
+            self._entries[key] = (expires, rcode, records, resolver, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[4]
+
+    def load(self):
+        """טעינת cache מהדיסק (רשומות שפג תוקפן מדולגות)
+
+        שורה פגומה (למשל שורה קטועה מקריסה באמצע שמירה) מדולגת ונספרת
+        ב-skipped - שאר ה-cache נטען כרגיל.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        now = time.time()
+        loaded = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        name, rtype, expires, rcode, records, resolver = json.loads(line)
+                        if expires <= now:
+                            continue
+                        records = [tuple(tuple(v) if isinstance(v, list) else v for v in r) for r in records]
+                        self._store((name, rtype), float(expires), rcode, records, resolver)
+                    except (ValueError, TypeError, IndexError):
+                        self.skipped += 1
+                        continue
+                    loaded += 1
+        except OSError:
+            pass
+        return loaded
+
+    def save(self):
+        """שמירת הרשומות התקפות לדיסק (JSON lines, כתיבה אטומית)"""
+        if not self.path:
+            return
+        now = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            entries = list(self._entries.items())
+        with open(tmp_path, 'w') as f:
+            for (name, rtype), (expires, rcode, records, resolver, _size) in entries:
+                if expires <= now:
+                    continue
+                # רשומות בינאריות (סוגים לא מוכרים) לא נשמרות
+                records = [r for r in records if not isinstance(r[3], bytes)]
+                f.write(json.dumps([name, rtype, expires, rcode, records, resolver]) + '\n')
+        os.replace(tmp_path, self.path)
+
+
+class DNSAccount:
+    """מונים של צרכן אחד (מטרה) על מנוע DNS משותף
+
+    מוצמד ל-coroutine דרך contextvar, כך שכל ה-tasks שנוצרים ממנו (workers,
+    בדיקות wildcard, השלמת CNAME) נספרים לאותה מטרה גם כשהרבה מטרות רצות
+    במקביל על אותו מנוע. המונים מתעדכנים רק מה-thread של המנוע.
+    """
+
+    __slots__ = ('queries', 'cache_hits', 'latency', 'answered')
+
+    def __init__(self):
+        self.queries = 0
+        self.cache_hits = 0
+        self.latency = 0.0
+        self.answered = 0
+
+    def snapshot(self):
+        return self.queries, self.cache_hits, self.latency, self.answered
+
+
+_DNS_ACCOUNT = contextvars.ContextVar('subrecon_dns_account', default=None)
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    """פרוטוקול UDP שמעביר כל datagram חזרה למנוע"""
+
+    def __init__(self, engine, index):
+        self.engine = engine
+        self.index = index
+
+    def datagram_received(self, data, addr):
+        self.engine._on_datagram(self.index, data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
+class AsyncDNSEngine:
+    """מנוע DNS אסינכרוני מעל raw UDP
+
+    מרבב אלפי שאילתות במקביל על מספר קטן של sockets, מתאים תשובות לפי
+    transaction ID ומטפל בעצמו ב-retries וב-timeouts. המנוע רץ על event loop
+    ב-thread משלו, כך שקוד סינכרוני יכול להשתמש בו דרך run() / submit().
+    """
+
+    def __init__(self, nameservers, timeout=2.0, retries=3, sockets=4, max_inflight=500, cache=None,
+                 initial_concurrency=20):
+        if isinstance(nameservers, ResolverPool):
+            self.pool = nameservers
+        else:
+            self.pool = ResolverPool(nameservers, initial_concurrency, max_inflight)
+        self.timeout = timeout
+        self.retries = retries
+        self.socket_count = sockets
+        self.max_inflight = max_inflight
+        self.cache = cache
+        self.loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._transports = {}
+        self._pending = {}
+        self._inflight_queries = {}
+        self._prefetch_slots = threading.BoundedSemaphore(max_inflight * 2)
+        self._semaphore = None
+        self._slot_waiters = deque()
+
+    # ---------- ניהול ה-loop ----------
+
+    def start(self):
+        """הפעלת ה-event loop ב-thread רקע (אידמפוטנטי)"""
+        with self._start_lock:
+            if self.loop is not None:
+                return self
+            self.loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def runner():
+                asyncio.set_event_loop(self.loop)
+                self._semaphore = asyncio.Semaphore(self.max_inflight)
+                self.loop.call_soon(ready.set)
+                self.loop.run_forever()
+
+            self._thread = threading.Thread(target=runner, name='subrecon-dns', daemon=True)
+            self._thread.start()
+            ready.wait()
+        return self
+
+    def submit(self, coro, account=None):
+        """הרצת coroutine על ה-loop של המנוע, מחזיר concurrent Future
+
+        עם account (DNSAccount) כל השאילתות שה-coroutine מייצר נספרות בו.
+        """
+        self.start()
+        if account is not None:
+            coro = self._accounted(coro, account)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    @staticmethod
+    async def _accounted(coro, account):
+        _DNS_ACCOUNT.set(account)  # ה-task הזה וכל מה שנוצר ממנו
+        return await coro
+
+    def run(self, coro, account=None):
+        """הרצה סינכרונית של coroutine על ה-loop של המנוע"""
+        return self.submit(coro, account).result()
+
+    def close(self):
+        if self.loop is None:
+            return
+
+        async def shutdown():
+            # ביטול שאילתות שעדיין באוויר (למשל prefetch) לפני עצירת ה-loop
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for transport in self._transports.values():
+                transport.close()
+            self._transports.clear()
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self._thread.join(timeout=5)
+        self.loop.close()
+        self.loop = None
+
+    # ---------- sockets ----------
+
+    async def _get_transport(self, index, family):
+        key = (family, index)
+        transport = self._transports.get(key)
+        if transport is None or transport.is_closing():
+            local = ('::', 0) if family == socket.AF_INET6 else ('0.0.0.0', 0)
+            transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _DNSProtocol(self, key), local_addr=local, family=family)
+            self._transports[key] = transport
+        return transport
+
+    def _on_datagram(self, key, data, addr):
+        if len(data) < 12:
+            return
+        txid = struct.unpack('>H', data[:2])[0]
+        entry = self._pending.get((key, txid))
+        if entry is None:
+            return
+        future, server = entry
+        # מתעלמים מתשובות שלא הגיעו מהשרת שאליו שלחנו
+        if addr[0] != server[0] or addr[1] != server[1] or future.done():
+            return
+        future.set_result(data)
+
+    # ---------- שאילתות ----------
+
+    async def _exchange(self, name, rtype, server):
+        """שליחת שאילתה אחת לשרת אחד והמתנה לתשובה המתאימה"""
+        family = socket.AF_INET6 if ':' in server[0] else socket.AF_INET
+        index = random.randrange(self.socket_count)
+        transport = await self._get_transport(index, family)
+        key = (family, index)
+        txid = random.getrandbits(16)
+        while (key, txid) in self._pending:
+            txid = random.getrandbits(16)
+        future = self.loop.create_future()
+        self._pending[(key, txid)] = (future, server)
+        try:
+            transport.sendto(build_dns_query(txid, name, rtype), server)
+            while True:
+                data = await asyncio.wait_for(future, self.timeout)
+                _txid, rcode, qname, records, authority = parse_dns_response(data)
+                if qname == name.lower().rstrip('.'):
+                    return rcode, records, authority
+                # תשובה עם שאלה לא תואמת - ממשיכים לחכות
+                future = self.loop.create_future()
+                self._pending[(key, txid)] = (future, server)
+        finally:
+            self._pending.pop((key, txid), None)
+
+    async def query(self, name, rtype='A'):
+        """שאילתה דרך ה-cache, עם איחוד של שאילתות זהות שכבר באוויר"""
+        name = name.lower().rstrip('.')
+        if self.cache is not None:
+            cached = self.cache.get(name, rtype)
+            if cached is not None:
+                account = _DNS_ACCOUNT.get()
+                if account is not None:
+                    account.cache_hits += 1
+                return cached
+        key = (name, rtype)
+        future = self._inflight_queries.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(self._query_network(name, rtype))
+        self._inflight_queries[key] = future
+        future.add_done_callback(lambda f: self._query_done(key, f))
+        return await asyncio.shield(future)
+
+    def _query_done(self, key, future):
+        self._inflight_queries.pop(key, None)
+        if self.cache is not None and not future.cancelled() and future.exception() is None:
+            self.cache.put(future.result())
+
+    async def _query_network(self, name, rtype):
+        """שאילתה עם retries על פני שרתים שונים
+
+        NOERROR ו-NXDOMAIN הן תשובות סופיות. רק SERVFAIL/REFUSED או timeout
+        גורמים לניסיון חוזר - ותמיד על שרת אחר מהמאגר.
+        """
+        rcode = 'TIMEOUT'
+        tried = set()
+        account = _DNS_ACCOUNT.get()
+        async with self._semaphore:
+            for _ in range(self.retries):
+                server = await self._acquire_server(tried)
+                tried.add(server)
+                started = time.monotonic()
+                latency = None
+                try:
+                    rcode, records, authority = await self._exchange(name, rtype, server)
+                    latency = time.monotonic() - started
+                except asyncio.TimeoutError:
+                    rcode = 'TIMEOUT'
+                except (ValueError, struct.error, IndexError):
+                    rcode = 'FORMERR'
+                except OSError:
+                    rcode = 'NETERR'
+                finally:
+                    self._release_server(server, latency, rcode)
+                if account is not None:
+                    account.queries += 1
+                    if latency is not None:
+                        account.latency += latency
+                        account.answered += 1
+                if rcode == 'FORMERR':
+                    return DNSResult(name, rtype, 'FORMERR')
+                self.pool.record(server, latency, rcode)
+                if rcode in ('TIMEOUT', 'NETERR', 'SERVFAIL', 'REFUSED'):
+                    continue
+                return DNSResult(name, rtype, rcode, records, authority, server[0])
+        return DNSResult(name, rtype, rcode)
+
+    async def _acquire_server(self, tried):
+        """בחירת resolver שיש לו מקום פנוי לפי המגבלה האדפטיבית שלו (או המתנה לכזה)"""
+        while True:
+            available = [s for s in self.pool.servers if self.pool.limits[s].has_capacity]
+            if available:
+                server = self.pool.pick(exclude=tried, candidates=available)
+                self.pool.limits[server].inflight += 1
+                return server
+            waiter = self.loop.create_future()
+            self._slot_waiters.append(waiter)
+            await waiter
+
+    def _release_server(self, server, latency, rcode):
+        controller = self.pool.limits[server]
+        controller.inflight -= 1
+        if rcode in ('TIMEOUT', 'NETERR', 'SERVFAIL', 'REFUSED'):
+            controller.on_congestion()
+        elif rcode != 'FORMERR':
+            controller.on_success(latency)
+        # מעירים כמספר המקומות הפנויים (ב-slow start המגבלה גדלה תוך כדי)
+        free = sum(max(int(c.limit) - c.inflight, 0) for c in self.pool.limits.values())
+        while self._slot_waiters and free > 0:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def prefetch(self, name, rtype='A', account=None):
+        """שאילתת fire-and-forget לחימום ה-cache מ-thread כלשהו
+
+        מספר ה-prefetches הממתינים חסום; מעבר לכך השם פשוט ייפתר מאוחר יותר
+        בשלב הוולידציה.
+        """
+        if self.cache is None or not self._prefetch_slots.acquire(blocking=False):
+            return False
+        future = self.submit(self.query(name, rtype), account)
+        future.add_done_callback(lambda _f: self._prefetch_slots.release())
+        return True
+
+    async def query_addresses(self, name, cname_memo=None, chain=None):
+        """A ו-AAAA במקביל לשם אחד, כולל השלמת שרשרת CNAME
+
+        מחזיר DNSResult מסוג ADDR עם כל הרשומות (CNAME, A, AAAA). אם ה-resolver
+        החזיר שרשרת CNAME בלי הכתובות של היעד, היעד נפתר בנפרד - ו-cname_memo
+        (CNAMEMemo לכל סריקה) דואג שיעד משותף (CDN) ייפתר פעם אחת בלבד. chain
+        הם השמות שכבר בשרשרת: לולאת CNAME (x -> a -> x) נעצרת ולא ממתינה לעצמה.
+        """
+        name = name.lower().rstrip('.')
+        a, aaaa = await asyncio.gather(self.query(name, 'A'), self.query(name, 'AAAA'))
+        records = list(a.records)
+        records.extend(r for r in aaaa.records if r not in records)
+        if a.found or aaaa.found:
+            rcode = 'NOERROR'
+        else:
+            # תשובה סופית (NXDOMAIN / NODATA) עדיפה על כשל זמני
+            rcode = a.rcode if a.rcode in ('NOERROR', 'NXDOMAIN') else aaaa.rcode
+
+        cnames = {r[0]: r[3] for r in records if r[1] == 'CNAME'}
+        visited = (chain or frozenset()) | {name}
+        target = name
+        while target in cnames:
+            target = cnames[target]
+            if target in visited:
+                target = None  # לולאה בתוך התשובה או בשרשרת
+            else:
+                visited |= {target}
+        if (target is not None and target != name and len(visited) <= MAX_CNAME_CHAIN
+                and not any(r[0] == target and r[1] in ADDRESS_TYPES for r in records)):
+            memo = cname_memo if cname_memo is not None else CNAMEMemo()
+            future = memo.get(target)
+            if future is None:
+                future = memo[target] = asyncio.ensure_future(self.query_addresses(target, memo, visited))
+            elif chain is not None and memo.would_cycle(name, target):
+                future = None  # ה-future של היעד כבר ממתין (דרך שרשרת אחרת) לשם הזה
+            if future is not None:
+                if chain is not None:
+                    memo.waiting[name] = target
+                try:
+                    resolved = await asyncio.shield(future)
+                finally:
+                    if chain is not None:
+                        memo.waiting.pop(name, None)
+                records.extend(r for r in resolved.records if r not in records)
+                if resolved.found:
+                    rcode = 'NOERROR'
+        return DNSResult(name, 'ADDR', rcode, records, a.authority, a.resolver or aaaa.resolver)
+
+    async def resolve_many(self, names, rtype='A', on_result=None, concurrency=None, cname_memo=None):
+        """רזולוציה של רצף שמות עם מספר workers קבוע
+
+        names יכול להיות כל iterable (גם generator) - ה-workers מושכים ממנו
+        לפי הצורך, כך שאין צורך להחזיק את כל הרשימה בזיכרון.
+        on_result יכול להיות פונקציה רגילה או coroutine function. עם
+        rtype='ADDR' כל שם נפתר ל-A/AAAA/CNAME דרך query_addresses.
+        """
+        iterator = iter(names)
+
+        async def worker():
+            for name in iterator:
+                if rtype == 'ADDR':
+                    result = await self.query_addresses(name, cname_memo)
+                else:
+                    result = await self.query(name, rtype)
+                if on_result is not None:
+                    pending = on_result(result)
+                    if asyncio.iscoroutine(pending):
+                        await pending
+
+        workers = concurrency or self.max_inflight
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+class WildcardFingerprint:
+    """טביעת אצבע של תשובות wildcard עבור zone אחד וסוג רשומה אחד"""
+    __slots__ = ('zone', 'rtype', 'addresses', 'cnames', 'ttl', 'rotating')
+
+    def __init__(self, zone, rtype):
+        self.zone = zone
+        self.rtype = rtype
+        self.addresses = set()
+        self.cnames = set()
+        self.ttl = 0
+        self.rotating = False
+
+    @staticmethod
+    def _network(address):
+        if ':' in address:
+            return address.rsplit(':', 2)[0]
+        return address.rsplit('.', 1)[0]
+
+    def matches(self, result):
+        """האם תשובה למועמד זהה לתשובת ה-wildcard"""
+        addresses = set(result.values(self.rtype))
+        cnames = set(result.values('CNAME'))
+        if cnames and cnames & self.cnames:
+            return True
+        if addresses and addresses <= self.addresses:
+            return True
+        # wildcard שמחזיר כתובות מתחלפות: משווים רשתות ו-TTL
+        if self.rotating and addresses:
+            networks = {self._network(a) for a in self.addresses}
+            ttl = max((r[2] for r in result.records if r[1] == self.rtype), default=0)
+            if all(self._network(a) in networks for a in addresses) and ttl <= self.ttl:
+                return True
+        return False
+
+
+class WildcardDetector:
+    """זיהוי wildcard DNS לכל רמת zone
+
+    לכל zone הורה נשלחות שאילתות לתוויות אקראיות. אם הן נפתרות, נשמרת טביעת
+    אצבע של ה-A/AAAA/CNAME וה-TTL, ומועמדים שתשובתם תואמת נזרקים מיד.
+    הבדיקה נעשית פעם אחת לכל zone גם כשהרבה מועמדים מגיעים במקביל.
+    """
+
+    def __init__(self, engine, probes=3):
+        self.engine = engine
+        self.probes = probes
+        self._zones = {}
+        self.rejected = 0
+
+    @staticmethod
+    def parent_zone(name):
+        return name.split('.', 1)[1] if '.' in name else name
+
+    @staticmethod
+    def _random_label():
+        return ''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=14))
+
+    async def _probe(self, zone, rtype):
+        fingerprint = WildcardFingerprint(zone, rtype)
+        answers = []
+        probes = [f"{self._random_label()}.{zone}" for _ in range(self.probes)]
+        results = await asyncio.gather(*(self.engine.query(p, rtype) for p in probes))
+        for result in results:
+            if not result.found:
+                continue
+            addresses = frozenset(result.values(rtype))
+            answers.append(addresses)
+            fingerprint.addresses |= addresses
+            fingerprint.cnames.update(result.values('CNAME'))
+            fingerprint.ttl = max([fingerprint.ttl] + [r[2] for r in result.records])
+        if not answers:
+            return None
+        fingerprint.rotating = len(set(answers)) > 1
+        return fingerprint
+
+    async def fingerprint(self, zone, rtype='A'):
+        key = (zone, rtype)
+        future = self._zones.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._probe(zone, rtype))
+            self._zones[key] = future
+        return await future
+
+    async def is_wildcard(self, result):
+        fingerprint = await self.fingerprint(self.parent_zone(result.name), result.rtype)
+        if fingerprint is not None and fingerprint.matches(result):
+            self.rejected += 1
+            return True
+        return False
+
+    def wildcard_zones(self):
+        """רשימת ה-zones שזוהו כ-wildcard"""
+        return sorted(zone for (zone, _), future in self._zones.items()
+                      if future.done() and not future.cancelled() and future.result() is not None)
+
+
+# ==================== wordlists בזרימה ====================
+
+class BloomFilter:
+    """Bloom filter ל-dedup בזיכרון חסום
+
+    שומר ~10 ביטים לכל פריט (בשיעור false-positive של 0.1%), כך שגם רשימה של
+    50M מילים דורשת כ-70MB במקום set של מחרוזות. false-positive פירושו
+    שמילה בודדת תדולג - מחיר סביר ל-brute force.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(int(capacity), 1024)
+        self.size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8', 'replace'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        """הוספה; מחזיר True אם הפריט חדש"""
+        new = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, item):
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+
+def iter_wordlist_file(path):
+    """קריאת wordlist שורה אחר שורה, בלי לטעון את כל הקובץ לזיכרון"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            word = line.strip().lower()
+            if word and not word.startswith('#'):
+                yield word
+
+
+# פורמט wordlist מקומפל: header, אינדקס של count+1 offsets (uint64) ואחריו
+# המילים ממוינות, ייחודיות ומופרדות ב-'\n' - קובץ אחד שנקרא דרך mmap
+WORDLIST_MAGIC = b'SRWL'
+WORDLIST_VERSION = 1
+WORDLIST_FLAG_BUILTIN = 1
+_WORDLIST_HEADER = struct.Struct('<4sBBHQQ')  # magic, version, flags, reserved, count, data offset
+_WORDLIST_WORD = re.compile(rb'[a-z0-9_](?:[a-z0-9_.-]{0,251}[a-z0-9_])?')
+
+
+class CompiledWordlist:
+    """wordlist מקומפל (subrecon compile-wordlist) שנקרא דרך mmap
+
+    המילים לא נטענות לזיכרון: כל התהליכים שפותחים את אותו קובץ חולקים את
+    אותם דפים מה-page cache, והפתיחה מיידית בלי קשר לגודל. האינדקס מאפשר
+    גישה לפי מיקום, חלוקה לטווחים (split / slice) לכמה workers והמשך
+    מ-offset בלי לקרוא את מה שלפניו.
+    """
+
+    BLOCK = 4096  # מילים לכל קריאה רציפה מה-mmap
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.flags, _reserved, self.count, self._data = _WORDLIST_HEADER.unpack_from(self._mmap)
+        except struct.error:
+            magic = version = None
+        if magic != WORDLIST_MAGIC or version != WORDLIST_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a compiled wordlist (version {WORDLIST_VERSION})")
+        self._start = 0
+        self._stop = self.count
+
+    @staticmethod
+    def is_compiled(path):
+        """זיהוי לפי ה-magic בתחילת הקובץ"""
+        try:
+            with open(path, 'rb') as f:
+                return f.read(len(WORDLIST_MAGIC)) == WORDLIST_MAGIC
+        except OSError:
+            return False
+
+    @property
+    def includes_builtin(self):
+        return bool(self.flags & WORDLIST_FLAG_BUILTIN)
+
+    def _offset(self, index):
+        return self._data + struct.unpack_from('<Q', self._mmap, _WORDLIST_HEADER.size + 8 * index)[0]
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('wordlist index out of range')
+        index += self._start
+        return self._mmap[self._offset(index):self._offset(index + 1) - 1].decode('utf-8')
+
+    def iter_range(self, start=0, stop=None):
+        """המילים בטווח [start, stop) - בלוקים רציפים מה-mmap"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for block in range(self._start + max(start, 0), self._start + stop, self.BLOCK):
+            end = min(block + self.BLOCK, self._start + stop)
+            chunk = self._mmap[self._offset(block):self._offset(end)]
+            yield from chunk.decode('utf-8').split('\n')[:-1]
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def __contains__(self, word):
+        """חיפוש בינארי - המילים ממוינות לפי bytes"""
+        target = word.encode('utf-8')
+        lo, hi = self._start, self._stop
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._mmap[self._offset(mid):self._offset(mid + 1) - 1] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self._stop and self._mmap[self._offset(lo):self._offset(lo + 1) - 1] == target
+
+    def split(self, parts):
+        """חלוקה ל-parts טווחים רציפים בגודל כמעט שווה: [(start, stop), ...]"""
+        parts = max(int(parts), 1)
+        return [(len(self) * i // parts, len(self) * (i + 1) // parts) for i in range(parts)]
+
+    def slice(self, start, stop):
+        """תצוגה על טווח [start, stop) שחולקת את אותו mmap"""
+        view = object.__new__(CompiledWordlist)
+        view.__dict__.update(self.__dict__)
+        view._start = self._start + max(start, 0)
+        view._stop = self._start + min(stop, len(self))
+        return view
+
+    def close(self):
+        self._mmap.close()
+
+
+def _sorted_run(words, directory, number):
+    """run ממוין וייחודי אחד של merge sort חיצוני"""
+    path = os.path.join(directory, f"run{number:05d}")
+    with open(path, 'wb') as f:
+        f.write(b'\n'.join(sorted(set(words))) + b'\n')
+    return path
+
+
+def parse_affix_rules(affixes):
+    """כללי affix ('{}-dev') -> [(prefix, suffix, אורך מילה מקסימלי)]; זורק ValueError"""
+    rules = []
+    for affix in affixes:
+        if affix.count('{}') != 1 or not _WORDLIST_WORD.fullmatch(affix.replace('{}', 'a').encode('utf-8')):
+            raise ValueError(f"invalid affix rule: {affix!r}")
+        prefix, suffix = affix.encode('utf-8').split(b'{}')
+        rules.append((prefix, suffix, 253 - len(prefix) - len(suffix)))
+    return rules
+
+
+def compile_wordlist(output, paths=(), affixes=('{}',), builtin=True, run_words=1000000, tmp_dir=None):
+    """בניית wordlist מקומפל: merge sort חיצוני עם dedup, ואז אינדקס ונתונים
+
+    כל מילה מ-paths עוברת כל אחד מכללי ה-affixes ('{}' הוא המילה, למשל
+    '{}-dev' או 'dev-{}'); עם builtin נוספת ה-wordlist המובנה. הזיכרון
+    חסום ב-run_words מילים לכל run, כך שגם רשימות של מאות מיליוני שורות
+    עוברות. הכתיבה לקובץ זמני והחלפה אטומית. מחזיר את מספר המילים.
+    """
+    rules = parse_affix_rules(affixes)
+    
+    def batches():
+        # עבודה ב-batches של שורות - כאן עוברות כל המילים, וזה החלק היקר
+        if builtin:
+            yield [word.encode('utf-8') for word in load_common_subdomains()]
+        for path in paths:
+            with open(path, 'rb') as f:
+                while True:
+                    lines = f.readlines(4 * 1024 * 1024)
+                    if not lines:
+                        break
+                    words = [w for w in (line.strip().lower() for line in lines) if _WORDLIST_WORD.fullmatch(w)]
+                    for prefix, suffix, limit in rules:
+                        yield [prefix + w + suffix for w in words if len(w) <= limit]
+    
+    output_dir = os.path.dirname(os.path.abspath(output))
+    with tempfile.TemporaryDirectory(prefix='subrecon-wordlist-', dir=tmp_dir) as tmp:
+        # שלב 1: runs ממוינים על הדיסק
+        runs = []
+        pending = []
+        for batch in batches():
+            pending.extend(batch)
+            if len(pending) >= run_words:
+                runs.append(_sorted_run(pending, tmp, len(runs)))
+                pending = []
+        if pending or not runs:
+            runs.append(_sorted_run(pending, tmp, len(runs)))
+        
+        # שלב 2: מיזוג עם dedup - הנתונים והאינדקס נכתבים לקבצים נפרדים
+        data_path = os.path.join(tmp, 'data')
+        index_path = os.path.join(tmp, 'index')
+        count = 0
+        offset = 0
+        run_files = [open(path, 'rb') for path in runs]
+        try:
+            with open(data_path, 'wb') as data, open(index_path, 'wb') as index:
+                index.write(struct.pack('<Q', 0))
+                merged = (line for line, _group in itertools.groupby(heapq.merge(*run_files)) if line != b'\n')
+                while True:
+                    block = list(itertools.islice(merged, 65536))
+                    if not block:
+                        break
+                    data.write(b''.join(block))
+                    offsets = list(itertools.accumulate(map(len, block), initial=offset))[1:]
+                    index.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+                    offset = offsets[-1]
+                    count += len(block)
+        finally:
+            for f in run_files:
+                f.close()
+        
+        # שלב 3: header + אינדקס + נתונים, והחלפה אטומית
+        fd, partial = tempfile.mkstemp(prefix='.wordlist-', dir=output_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                flags = WORDLIST_FLAG_BUILTIN if builtin else 0
+                out.write(_WORDLIST_HEADER.pack(WORDLIST_MAGIC, WORDLIST_VERSION, flags, 0, count,
+                                                _WORDLIST_HEADER.size + 8 * (count + 1)))
+                for path in (index_path, data_path):
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, out, 1024 * 1024)
+            os.replace(partial, output)
+        except BaseException:
+            os.unlink(partial)
+            raise
+    return count
+
+
+# ==================== פרסור בזרימה ====================
+
+def compile_host_pattern(domain):
+    """regex מקומפל אחד לאיתור סאב-דומיינים של domain בטקסט"""
+    return re.compile(
+        r'(?<![\w-])((?:[a-z0-9_](?:[a-z0-9_-]*[a-z0-9_])?\.)+' + re.escape(domain) + r')(?![\w-]|\.[\w-])',
+        re.IGNORECASE)
+
+
+class JSONStreamError(ValueError):
+    """הזרם אינו מערך JSON תקין; remainder הוא הטקסט שכבר נקרא מהזרם ועוד לא פורסר"""
+
+    def __init__(self, message, remainder=''):
+        super().__init__(message)
+        self.remainder = remainder
+
+
+def iter_json_array(chunks, max_buffer=64 * 1024 * 1024):
+    """פרסור אינקרמנטלי של מערך JSON - מחזיר כל איבר ברגע שהגיע במלואו
+
+    chunks הוא iterable של bytes (למשל response.iter_content). הזיכרון חסום
+    בגודל האיבר הגדול ביותר ולא בגודל התשובה כולה. זורק JSONStreamError
+    (ValueError) אם התוכן אינו מערך JSON - עם הטקסט שנקרא ולא פורסר, כך
+    שאפשר להמשיך לסרוק אותו יחד עם שארית הזרם.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    started = False
+    exhausted = False
+
+    def fill():
+        nonlocal buffer, pos, exhausted
+        for chunk in chunks:
+            if chunk:
+                buffer = buffer[pos:] + text_decoder.decode(chunk)
+                pos = 0
+                return True
+        exhausted = True
+        buffer = buffer[pos:] + text_decoder.decode(b'', final=True)
+        pos = 0
+        return False
+
+    while True:
+        # דילוג על רווחים ומפרידים
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) or exhausted:
+                break
+            fill()
+        if pos >= len(buffer):
+            if started:
+                raise JSONStreamError("Unterminated JSON array")
+            raise JSONStreamError("Empty response")
+        if not started:
+            if buffer[pos] != '[':
+                raise JSONStreamError("Response is not a JSON array", buffer[pos:])
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise JSONStreamError("Truncated JSON array", buffer[pos:])
+            if len(buffer) - pos > max_buffer:
+                raise JSONStreamError("JSON array item exceeds buffer limit", buffer[pos:])
+            fill()
+            continue
+        # מספר שמסתיים בסוף הבאפר, או שאחריו תו שממשיך מספר ('-0' מתוך '-0.5'), עלול להיות חתוך
+        if (not exhausted and isinstance(item, (int, float))
+                and (end == len(buffer) or buffer[end] in '0123456789.eE+-')):
+            fill()
+            continue
+        pos = end
+        yield item
+
+
+def iter_text_matches(chunks, pattern, overlap=512):
+    """הרצת regex על זרם bytes, עם חפיפה בין chunks כדי לא לפספס התאמות בגבול"""
+    text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    tail = ''
+    for chunk in chunks:
+        text = tail + text_decoder.decode(chunk)
+        # חותכים רק על תו שאינו חלק משם host, כדי ששם לא ייחתך באמצע
+        cut = max(len(text) - overlap, 0)
+        limit = max(cut - 256, 0)
+        while cut > limit and (text[cut - 1].isalnum() or text[cut - 1] in '_.-'):
+            cut -= 1
+        for match in pattern.finditer(text, 0, cut):
+            yield match.group(1)
+        tail = text[cut:]
+    for match in pattern.finditer(tail + text_decoder.decode(b'', final=True)):
+        yield match.group(1)
+
+
+# ==================== חילוץ שמות ====================
+
+EXTRACT_BACKENDS = ('regex', 'lxml')
+# גוף גדול מזה נסרק ב-process pool - פרסור של מגה-בייטים מחזיק את ה-GIL
+OFFLOAD_THRESHOLD = 1024 * 1024
+
+
+_LABEL_BYTES = rb'[a-z0-9_](?:[a-z0-9_-]*[a-z0-9_])?'
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_host_scanner(domain):
+    """scanner מקומפל ל-domain שרץ על bytes הפוכים ובאותיות קטנות
+
+    אותה התאמה כמו compile_host_pattern, אבל הדומיין הפוך נמצא בתחילת
+    התבנית - כך שמנוע ה-regex קופץ בין מופעי הסיומת במקום לנסות כל מיקום
+    בגוף. ה-lookbehinds הם הגבולות של השם המקורי מימין.
+    """
+    suffix = re.escape(domain.lower().encode('utf-8')[::-1])
+    return re.compile(
+        b'(' + suffix + rb'(?<![\w-]' + suffix + rb')(?<![\w-]\.' + suffix + rb')'
+        rb'(?:\.' + _LABEL_BYTES + rb')+)(?![\w-])')
+
+
+def _lxml_text(body):
+    """טקסט וערכי attributes של המסמך, עם ישויות HTML מפוענחות"""
+    tree = lxml_html.fromstring(body)
+    return '\n'.join(tree.xpath('//text() | //@*')).encode('utf-8', errors='replace')
+
+
+def extract_hosts(domain, body, backend='regex'):
+    """כל ה-hosts תחת domain שמופיעים ב-body (bytes), באותיות קטנות ולפי סדר הופעה
+
+    ברמת המודול כדי שאפשר יהיה להריץ אותה ב-process pool.
+    """
+    if backend == 'lxml' and LXML_AVAILABLE and body.strip():
+        try:
+            body = _lxml_text(body)
+        except Exception:
+            pass  # מסמך שבור - סורקים את ה-bytes כמו שהם
+    matches = compile_host_scanner(domain).findall(body.lower()[::-1])
+    return list(dict.fromkeys(m[::-1].decode('utf-8', errors='replace') for m in reversed(matches)))
+
+
+class HostExtractor:
+    """מנוע חילוץ משותף לכל המקורות
+
+    scanner מקומפל לכל דומיין, backend לבחירה (regex על bytes או lxml), וגופים
+    מעל offload_threshold נשלחים ל-process pool שנוצר רק כשצריך - כך שפרסור
+    דף ענק לא עוצר את ה-threads של DNS ו-HTTP. workers=0 מבטל את ה-offload.
+    """
+
+    def __init__(self, backend='regex', workers=None, offload_threshold=OFFLOAD_THRESHOLD):
+        if backend not in EXTRACT_BACKENDS:
+            raise ValueError(f"Unknown extraction backend: {backend}")
+        self.backend = backend if backend != 'lxml' or LXML_AVAILABLE else 'regex'
+        self.workers = min(os.cpu_count() or 1, 4) if workers is None else workers
+        self.offload_threshold = offload_threshold
+        self._pool = None
+        self._broken = False
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn ולא fork - התהליך כבר מריץ threads ו-event loop
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def extract(self, domain, body):
+        """hosts תחת domain ב-body; גופים גדולים נסרקים בתהליך נפרד"""
+        if self.workers and not self._broken and len(body) >= self.offload_threshold:
+            try:
+                return self._executor().submit(extract_hosts, domain, bytes(body), self.backend).result()
+            except (BrokenProcessPool, OSError):
+                # בלי process pool (סביבה מוגבלת, תהליך שקרס) ממשיכים בתהליך הנוכחי
+                self._broken = True
+        return extract_hosts(domain, body, self.backend)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ==================== crawler ====================
+
+_LINK_ATTR = re.compile(r'''(?:src|href|data-src|action)\s*=\s*["']([^"'#<>\s]+)''', re.IGNORECASE)
+_ASSET_REF = re.compile(r'''["'`]((?:https?:)?//[^"'`\s]+|/?[\w./-]+\.(?:js|mjs|json|map))(?:\?[^"'`\s]*)?["'`]''')
+_SOURCE_MAP = re.compile(r'''[#@]\s*sourceMappingURL=([^\s'"*]+)''')
+_ASSET_EXTENSIONS = ('.js', '.mjs', '.json', '.map')
+_SKIP_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.css', '.woff', '.woff2',
+                    '.ttf', '.eot', '.mp4', '.webm', '.mp3', '.pdf', '.zip', '.gz')
+
+
+class SiteCrawler:
+    """crawler מקבילי לדפי HTML ולקובצי JS/JSON/source map של המטרה
+
+    מתחיל מדפי השורש, עוקב אחרי קישורים בתוך ה-scope (הדומיין וכל תת-דומיין
+    שלו) ואחרי assets של JS/JSON/source maps גם מ-hosts חיצוניים (CDN) - עד
+    עומק נתון. כל host חדש שנמצא בתוכן נשלח מיד ל-on_host, ודף השורש שלו נכנס
+    לתור. fetch מקבל (url, max_bytes) ומחזיר (status, content_type, body) או
+    None; הגודל מוגבל ע"י fetch, והכפילויות מסוננות לפי URL ולפי hash של התוכן.
+    extract מקבל body ומחזיר את ה-hosts שבו (ברירת מחדל: extract_hosts).
+    """
+
+    def __init__(self, domain, fetch, on_host, max_depth=2, max_pages=300,
+                 max_bytes=5 * 1024 * 1024, workers=20, extract=None):
+        self.domain = domain
+        self.fetch = fetch
+        self.on_host = on_host
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.extract = extract or functools.partial(extract_hosts, domain)
+        self.seen_urls = set()
+        self.seen_hashes = set()
+        self.seen_hosts = set()
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def in_scope(self, host):
+        host = (host or '').lower()
+        return host == self.domain or host.endswith(f".{self.domain}")
+
+    @staticmethod
+    def _is_asset(path):
+        return path.lower().endswith(_ASSET_EXTENSIONS)
+
+    @staticmethod
+    def _normalize(url, base=None):
+        if base is not None:
+            url = urljoin(base, url)
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            return None
+        if parsed.path.lower().endswith(_SKIP_EXTENSIONS):
+            return None
+        return parsed._replace(fragment='').geturl()
+
+    def _claim(self, url):
+        """סימון URL כנסרק; False אם כבר נסרק או שנגמרה המכסה"""
+        with self._lock:
+            if url in self.seen_urls or self.pages >= self.max_pages:
+                return False
+            self.seen_urls.add(url)
+            self.pages += 1
+            return True
+
+    def _hosts(self, body):
+        """hosts חדשים בתוכן, כולל שליחה ל-on_host"""
+        new_hosts = []
+        for host in self.extract(body):
+            with self._lock:
+                if host in self.seen_hosts:
+                    continue
+                self.seen_hosts.add(host)
+            self.on_host(host)
+            new_hosts.append(host)
+        return new_hosts
+
+    def _links(self, url, text, is_html):
+        """URLs להמשך: קישורים ב-HTML, הפניות ל-assets ו-source maps"""
+        links = []
+        if is_html:
+            links.extend(_LINK_ATTR.findall(text))
+        links.extend(_ASSET_REF.findall(text))
+        links.extend(_SOURCE_MAP.findall(text))
+        for link in links:
+            target = self._normalize(link, url)
+            if target is None:
+                continue
+            parsed = urlparse(target)
+            # דפים רק בתוך ה-scope; assets גם מ-CDN חיצוני
+            if self.in_scope(parsed.hostname) or self._is_asset(parsed.path):
+                yield target
+
+    def _visit(self, url, depth):
+        """הורדת URL אחד; מחזיר רשימת (url, depth) להמשך"""
+        response = self.fetch(url, self.max_bytes)
+        if response is None:
+            return []
+        status, content_type, body = response
+        if status != 200 or not body:
+            return []
+        digest = hashlib.sha1(body).digest()
+        with self._lock:
+            if digest in self.seen_hashes:
+                return []
+            self.seen_hashes.add(digest)
+
+        next_urls = [(f"https://{host}/", depth + 1) for host in self._hosts(body)]
+        text = body.decode('utf-8', errors='replace')
+        if depth < self.max_depth:
+            is_html = 'html' in (content_type or '') or not self._is_asset(urlparse(url).path)
+            next_urls.extend((link, depth + 1) for link in self._links(url, text, is_html))
+        return [(u, d) for u, d in next_urls if d <= self.max_depth]
+
+    def crawl(self, seeds):
+        """סריקה מקבילית מה-seeds עד העומק/המכסה; מחזיר את ה-hosts שנמצאו"""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='crawl') as executor:
+            pending = set()
+            for seed in seeds:
+                url = self._normalize(seed)
+                if url and self._claim(url):
+                    pending.add(executor.submit(self._visit, url, 0))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        next_urls = future.result()
+                    except SourceTimeout:
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    except Exception:
+                        continue
+                    for url, depth in next_urls:
+                        if self._claim(url):
+                            pending.add(executor.submit(self._visit, url, depth))
+        return sorted(self.seen_hosts)
+
+
+# ==================== אחסון תוצאות ====================
+
+class SubdomainStore:
+    """אוסף שמות קומפקטי בסדר DNS קנוני
+
+    כל שם נשמר כמפתח bytes של ה-labels בסדר הפוך, מופרדים ב-\\x00
+    (com\\x00example\\x00dev), כך שמיון המפתחות הוא בדיוק הסדר הקנוני (הורה לפני
+    ילדיו, labels לפי סדר). רוב השמות יושבים בבלוק ממוין אחד: blob של bytes,
+    מערך offsets ורשימת מטא-דאטה - כ-30 בתים לשם במקום ~100 ב-set של
+    מחרוזות. שמות חדשים נכנסים ל-dict קטן וממוזגים לבלוק כשהוא גדל (מיזוג
+    ליניארי של שני רצפים ממוינים). חיפוש בינארי ל-in, טווח מפתחות ל-under(),
+    ואיטרציה בלי למיין את האוסף. המטא-דאטה (source, first_seen, records)
+    משותפת לשמות רצופים מאותו מקור באותה שנייה.
+    """
+
+    MERGE_MIN = 8192
+
+    def __init__(self, names=()):
+        self.clear()
+        self.update(names)
+
+    def clear(self):
+        self._block = (b'', array.array('I', [0]), [], array.array('I', [0]))  # keys, offsets, metas, index
+        self._pending = {}
+        self._size = 0
+        self._dead = 0
+        self._last_meta = {}
+
+    @staticmethod
+    def _key(name):
+        labels = name.rstrip('.').lower().split('.')
+        if '' in labels:
+            return None
+        return '\x00'.join(reversed(labels)).encode('utf-8')
+
+    @staticmethod
+    def _name(key):
+        return '.'.join(reversed(key.decode('utf-8').split('\x00')))
+
+    def _shared_meta(self, source, first_seen, records):
+        if records is not None:
+            return source, first_seen, records
+        last = self._last_meta.get(source)
+        if last is None or last[1] != first_seen:
+            last = self._last_meta[source] = (source, first_seen, None)
+        return last
+
+    @staticmethod
+    def _search(block, key):
+        """אינדקס המפתח הראשון >= key בבלוק (לשאילתות טווח)"""
+        keys, offsets, metas, _index = block
+        lo, hi = 0, len(metas)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[offsets[mid]:offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, key):
+        """(meta, אינדקס בבלוק או None); meta הוא None אם השם לא קיים או נמחק"""
+        meta = self._pending.get(key)
+        if meta is not None:
+            return meta, None
+        keys, offsets, metas, table = self._block
+        mask = len(table) - 1
+        slot = hash(key) & mask
+        while True:
+            index = table[slot]
+            if not index:
+                return None, None
+            index -= 1
+            if keys[offsets[index]:offsets[index + 1]] == key:
+                return metas[index], index
+            slot = (slot + 1) & mask
+
+    def add(self, name, source=None, records=None):
+        """הוספת שם; מחזיר True אם השם חדש. records מעדכן גם שם קיים"""
+        key = self._key(name)
+        if key is None:
+            return False
+        if records is not None:
+            records = tuple(records)
+        current, index = self._find(key)
+        if current is not None:
+            if records is None:
+                return False
+            meta = self._shared_meta(current[0], current[1], records)
+            is_new = False
+        else:
+            meta = self._shared_meta(source, int(time.time()), records)
+            self._size += 1
+            is_new = True
+        if index is not None:
+            if current is None:
+                self._dead -= 1  # שם שנמחק וחוזר - חוזר למקומו בבלוק
+            self._block[2][index] = meta
+        else:
+            self._pending[key] = meta
+            if len(self._pending) >= max(self.MERGE_MIN, len(self._block[2]) // 2):
+                self._merge()
+        return is_new
+
+    def _merge(self):
+        """מיזוג ה-dict של השמות החדשים לבלוק (ומחיקת שמות שנמחקו)"""
+        keys, offsets, metas, _table = self._block
+        items = [(keys[offsets[i]:offsets[i + 1]], meta) for i, meta in enumerate(metas) if meta is not None]
+        items.extend(self._pending.items())
+        items.sort(key=lambda item: item[0])  # שני רצפים ממוינים - timsort ממזג בזמן ליניארי
+        new_keys = b''.join(key for key, _meta in items)
+        typecode = 'I' if len(new_keys) < 2 ** 32 else 'Q'
+        new_offsets = array.array(typecode, [0])
+        new_offsets.extend(itertools.accumulate(len(key) for key, _meta in items))
+        # טבלת hash פתוחה (linear probing, עומס <= 0.5) של אינדקס+1 - in בלי חיפוש בינארי
+        size = 1 << (2 * len(items)).bit_length()
+        table = array.array('I', bytes(size * 4))
+        mask = size - 1
+        for index, (key, _meta) in enumerate(items, 1):
+            slot = hash(key) & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = index
+        self._block = (new_keys, new_offsets, [meta for _key, meta in items], table)
+        self._pending = {}
+        self._dead = 0
+
+    def update(self, names):
+        for name in names:
+            self.add(name)
+
+    def discard(self, name):
+        key = self._key(name)
+        if key is None:
+            return
+        if self._pending.pop(key, None) is not None:
+            self._size -= 1
+            return
+        current, index = self._find(key)
+        if current is not None:
+            self._block[2][index] = None
+            self._size -= 1
+            self._dead += 1
+            if self._dead > max(self.MERGE_MIN, len(self._block[2]) // 2):
+                self._merge()
+
+    def __contains__(self, name):
+        key = self._key(name)
+        return key is not None and self._find(key)[0] is not None
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def _range(self, start=b'', stop=None):
+        """(key, meta) לכל המפתחות ב-[start, stop) בסדר ממוין"""
+        block = self._block
+        keys, offsets, metas, _table = block
+        index = self._search(block, start) if start else 0
+        stop_index = self._search(block, stop) if stop is not None else len(metas)
+
+        def from_block():
+            for i in range(index, stop_index):
+                meta = metas[i]
+                if meta is not None:
+                    yield keys[offsets[i]:offsets[i + 1]], meta
+
+        pending = sorted((key, meta) for key, meta in list(self._pending.items())
+                         if key >= start and (stop is None or key < stop))
+        if not pending:
+            return from_block()
+        return heapq.merge(from_block(), pending, key=lambda item: item[0])
+
+    def __iter__(self):
+        for key, _meta in self._range():
+            yield self._name(key)
+
+    def under(self, name, include_self=True):
+        """כל השמות מתחת ל-name (למשל כל מה שתחת dev.example.com)"""
+        key = self._key(name)
+        if key is None:
+            return
+        if include_self and self._find(key)[0] is not None:
+            yield self._name(key)
+        for sub, _meta in self._range(key + b'\x00', key + b'\x01'):
+            yield self._name(sub)
+
+    @staticmethod
+    def _meta_dict(meta):
+        return {'source': meta[0], 'first_seen': meta[1], 'records': meta[2]}
+
+    def meta(self, name):
+        """מטא-דאטה של שם: source, records, first_seen (או None אם השם לא קיים)"""
+        key = self._key(name)
+        meta = self._find(key)[0] if key is not None else None
+        return self._meta_dict(meta) if meta is not None else None
+
+    def items(self):
+        """זוגות (שם, מטא-דאטה) בסדר קנוני"""
+        for key, meta in self._range():
+            yield self._name(key), self._meta_dict(meta)
+
+
+# ==================== פרמוטציות ====================
+
+# טוקנים שכיחים בתשתיות - משמשים בנוסף לטוקנים שנלמדים מהתוצאות
+PERMUTATION_SEED_TOKENS = (
+    'dev', 'test', 'staging', 'stage', 'prod', 'uat', 'qa', 'api', 'admin',
+    'internal', 'beta', 'old', 'new', 'backup', 'v2',
+)
+
+_TOKEN_SPLIT = re.compile(r'(\d+|-)')
+_VALID_LABEL = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$')
+
+
+def tokenize_label(label):
+    """פירוק label לטוקנים: מילים, מספרים ומפרידים ('api-v2' -> ['api', '-', 'v', '2'])"""
+    return [t for t in _TOKEN_SPLIT.split(label) if t]
+
+
+class PermutationEngine:
+    """מחולל מועמדים בסגנון altdns/dnsgen מתוך שמות שכבר נמצאו
+
+    השמות מפורקים לטוקנים, והמועמדים נוצרים בשלוש שיטות: הגדלה/הקטנה של
+    מספרים, החלפת מילה בטוקן שכיח, והוספת טוקן (כ-prefix/suffix או כ-label
+    חדש). הטוקנים נלמדים מהתוצאות ומדורגים לפי שכיחות, והמועמדים מיוצרים
+    בעצלות לפי הדירוג - קודם מספרים, אחר כך הטוקן השכיח ביותר על כל הבסיסים,
+    וכן הלאה. כל מועמד מוחזר פעם אחת בלבד לאורך כל הסבבים.
+    """
+
+    def __init__(self, domain, seed_tokens=PERMUTATION_SEED_TOKENS, max_tokens=40, number_range=2):
+        self.domain = domain
+        self.suffix = f".{domain}"
+        self.seed_tokens = seed_tokens
+        self.max_tokens = max_tokens
+        self.number_range = number_range
+        self.token_counts = Counter()
+        self.seen = set()
+
+    def relative(self, name):
+        """החלק שלפני הדומיין, או None לשם שאינו תחתיו"""
+        if name.endswith(self.suffix):
+            return name[:-len(self.suffix)] or None
+        return None
+
+    def learn(self, names):
+        """עדכון שכיחות הטוקנים מתוך שמות שנמצאו"""
+        for name in names:
+            rel = self.relative(name)
+            if rel is None:
+                continue
+            for label in rel.split('.'):
+                for token in tokenize_label(label):
+                    if token != '-' and not token.isdigit() and len(token) > 1:
+                        self.token_counts[token] += 1
+
+    def tokens(self):
+        """טוקנים לפי סדר שכיחות: נלמדים (שהופיעו לפחות פעמיים) ואחריהם ה-seed"""
+        learned = [t for t, count in self.token_counts.most_common(self.max_tokens) if count > 1]
+        return learned + [t for t in self.seed_tokens if t not in learned]
+
+    def _numbers(self, label):
+        tokens = tokenize_label(label)
+        for i, token in enumerate(tokens):
+            if not token.isdigit():
+                continue
+            value = int(token)
+            for delta in range(1, self.number_range + 1):
+                for number in (value + delta, value - delta):
+                    if number >= 0:
+                        yield ''.join(tokens[:i] + [str(number).zfill(len(token))] + tokens[i + 1:])
+
+    @staticmethod
+    def _swaps(label, token):
+        tokens = tokenize_label(label)
+        for i, word in enumerate(tokens):
+            if word != '-' and not word.isdigit() and word != token:
+                yield ''.join(tokens[:i] + [token] + tokens[i + 1:])
+
+    @staticmethod
+    def _inserts(label, token):
+        yield f"{token}-{label}"
+        yield f"{label}-{token}"
+        yield f"{token}{label}"
+        yield f"{label}{token}"
+
+    def _emit(self, first, rest, is_known):
+        name = f"{first}.{rest}{self.suffix}" if rest else f"{first}{self.suffix}"
+        if name in self.seen or len(name) > 253:
+            return None
+        if not all(_VALID_LABEL.match(label) for label in first.split('.')):
+            return None
+        self.seen.add(name)
+        if is_known is not None and is_known(name):
+            return None
+        return name
+
+    def candidates(self, names, is_known=None):
+        """generator של מועמדים מתוך השמות הנתונים, לפי סדר סבירות משוער"""
+        bases = []
+        for name in names:
+            rel = self.relative(name)
+            if rel is not None:
+                first, _, rest = rel.partition('.')
+                bases.append((first, rest))
+        bases.sort(key=lambda base: (base[1].count('.'), len(base[0]) + len(base[1])))
+
+        for first, rest in bases:
+            for label in self._numbers(first):
+                name = self._emit(label, rest, is_known)
+                if name:
+                    yield name
+
+        for token in self.tokens():
+            for first, rest in bases:
+                for label in itertools.chain(self._swaps(first, token), self._inserts(first, token)):
+                    name = self._emit(label, rest, is_known)
+                    if name:
+                        yield name
+                # טוקן כ-label חדש מעל הבסיס (dev.api.example.com)
+                name = self._emit(token, f"{first}.{rest}" if rest else first, is_known)
+                if name:
+                    yield name
+
+
+# labels שמרמזים על zone עם ילדים (סביבות, אזורים, חלוקה פנימית)
+LIKELY_PARENT_TOKENS = frozenset((
+    'dev', 'test', 'stage', 'staging', 'prod', 'uat', 'qa', 'internal', 'corp', 'int', 'ext',
+    'eu', 'us', 'uk', 'de', 'fr', 'asia', 'apac', 'emea', 'east', 'west', 'north', 'south',
+    'region', 'zone', 'dc', 'cloud', 'aws', 'gcp', 'azure', 'k8s', 'svc', 'cluster', 'lab',
+))
+
+
+class ExpansionScheduler:
+    """בחירת ה-subtree הבא ל-brute force רקורסיבי לפי תפוקה
+
+    כל parent מורחב במנות (CHUNK מילים). הציון של parent הוא הערכת ה-hit rate
+    שלו: הממצאים שלו עצמו, מוחלקים לכיוון ה-hit rate הממוצע של הרמה שלו
+    (PRIOR_WEIGHT שאילתות מדומות), כפול prior לפי מבנה (יש לו כבר ילדים / label
+    שמרמז על zone). parent שלא מניב יורד בתור, וכל השאילתות נספרות מול תקציב אחד.
+    """
+
+    CHUNK = 256
+    PRIOR_WEIGHT = 64
+
+    def __init__(self, words, budget, max_depth):
+        self.words = words
+        self.budget = budget
+        self.max_depth = max_depth
+        self.spent = 0
+        self.level_hits = Counter()
+        self.level_queries = Counter()
+        self.parents = {}
+        self._heap = []
+        self._seq = itertools.count()
+
+    def level_rate(self, depth):
+        # Beta prior קטן כדי שרמה בלי נתונים עדיין תקבל הזדמנות
+        return (self.level_hits[depth] + 1.0) / (self.level_queries[depth] + 50.0)
+
+    def score(self, parent):
+        depth, prior, offset, hits, queries = self.parents[parent]
+        rate = (hits + self.PRIOR_WEIGHT * self.level_rate(depth + 1)) / (queries + self.PRIOR_WEIGHT)
+        return rate * prior
+
+    def add(self, parent, depth, prior=1.0):
+        """parent חדש להרחבה (depth = מספר ה-labels מתחת לדומיין)"""
+        if parent in self.parents or depth >= self.max_depth:
+            return False
+        self.parents[parent] = [depth, prior, 0, 0, 0]
+        heapq.heappush(self._heap, (-self.score(parent), next(self._seq), parent))
+        return True
+
+    def next_batch(self):
+        """(parent, depth, מילים) של המנה הבאה, או None כשנגמר התור או התקציב"""
+        while self._heap and self.spent < self.budget:
+            neg_score, _seq, parent = heapq.heappop(self._heap)
+            current = -self.score(parent)
+            if current > neg_score + 1e-12:
+                # הציון ירד מאז שנכנס לתור (הרמה התבררה כפחות מניבה) - מחזירים עם הציון העדכני
+                heapq.heappush(self._heap, (current, next(self._seq), parent))
+                continue
+            depth, _prior, offset, _hits, _queries = self.parents[parent]
+            size = min(self.CHUNK, self.budget - self.spent)
+            chunk = self.words[offset:offset + size]
+            if not chunk:
+                continue
+            return parent, depth, chunk
+        return None
+
+    def record(self, parent, queries, hits):
+        """עדכון אחרי מנה: hit rate של ה-parent ושל הרמה, והחזרה לתור אם נשארו מילים"""
+        entry = self.parents[parent]
+        entry[2] += queries
+        entry[3] += hits
+        entry[4] += queries
+        self.spent += queries
+        self.level_hits[entry[0] + 1] += hits
+        self.level_queries[entry[0] + 1] += queries
+        if entry[2] < len(self.words):
+            heapq.heappush(self._heap, (-self.score(parent), next(self._seq), parent))
+
+
+# ==================== checkpoint והמשך סריקה ====================
+
+class StreamProgress:
+    """מעקב אחר ה-offset הרציף שהושלם ברצף שמעובד במקביל
+
+    פריטים מסתיימים בסדר לא קבוע; watermark הוא האינדקס הראשון שעדיין לא
+    הסתיים, כך שהמשך מה-watermark לא מדלג על אף פריט.
+    """
+
+    def __init__(self, start=0):
+        self.issued = start
+        self._outstanding = {}
+        self._heap = []
+        self._done = set()
+
+    def track(self, items):
+        for item in items:
+            index = self.issued
+            self.issued += 1
+            self._outstanding.setdefault(item, deque()).append(index)
+            heapq.heappush(self._heap, index)
+            yield item
+
+    def complete(self, item):
+        indices = self._outstanding.get(item)
+        if not indices:
+            return
+        self._done.add(indices.popleft())
+        if not indices:
+            del self._outstanding[item]
+        while self._heap and self._heap[0] in self._done:
+            self._done.discard(heapq.heappop(self._heap))
+
+    @property
+    def watermark(self):
+        return self._heap[0] if self._heap else self.issued
+
+
+class ScanJournal:
+    """יומן סריקה (JSON lines) שמאפשר להמשיך סריקה שנקטעה
+
+    נרשמים: מקורות פסיביים שהסתיימו, שלבים שהסתיימו, ההתקדמות ב-wordlist
+    של ה-brute force, ושמות שהתגלו/אומתו. הכתיבה נעשית ב-append עם flush
+    ו-fsync כל FLUSH_INTERVAL שניות, כך שקריסה מאבדת לכל היותר כמה שניות.
+    היומן נכתב רק כשמבקשים (--journal / --resume) ונמחק כשהסריקה מסתיימת.
+    """
+
+    FLUSH_INTERVAL = 2.0
+
+    def __init__(self, path):
+        self.path = path
+        self.params = {}
+        self.sources_done = set()
+        self.stages_done = set()
+        self.bruteforce_offset = 0
+        self.discovered = {}
+        self.validated = set()
+        self._file = None
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._last_offset_write = 0.0
+
+    @staticmethod
+    def default_path(domain):
+        return os.path.join(CONFIG_DIR, 'scans', f"{domain}.journal")
+
+    def load(self):
+        """קריאת יומן קיים; שורה אחרונה חתוכה (קריסה באמצע כתיבה) מדולגת"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                kind = event.get('t')
+                if kind == 'start':
+                    self.params = event.get('params', {})
+                elif kind == 'source':
+                    self.sources_done.add(event['name'])
+                elif kind == 'stage':
+                    self.stages_done.add(event['name'])
+                elif kind == 'bf':
+                    self.bruteforce_offset = max(self.bruteforce_offset, event['offset'])
+                elif kind == 'found':
+                    self.discovered.setdefault(event['name'], event.get('source'))
+                elif kind == 'valid':
+                    self.validated.add(event['name'])
+        return True
+
+    def open(self, params, resume=False):
+        """פתיחת היומן לכתיבה. ב-resume ממשיכים את היומן הקיים אם הפרמטרים תואמים"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if resume and self.load():
+            if any(self.params.get(key) != params.get(key) for key in ('wordlist', 'wordlist_shard')):
+                # wordlist אחר - ה-offset הישן חסר משמעות
+                self.bruteforce_offset = 0
+                self.stages_done.discard('bruteforce')
+            self._file = open(self.path, 'a')
+            return True
+        self._file = open(self.path, 'w')
+        self._write({'t': 'start', 'params': params, 'time': time.time()}, flush=True)
+        return False
+
+    def _write(self, event, flush=False):
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.write(json.dumps(event) + '\n')
+            now = time.monotonic()
+            if flush or now - self._last_flush >= self.FLUSH_INTERVAL:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._last_flush = now
+
+    def source_done(self, name):
+        self.sources_done.add(name)
+        self._write({'t': 'source', 'name': name}, flush=True)
+
+    def stage_done(self, name):
+        self.stages_done.add(name)
+        self._write({'t': 'stage', 'name': name}, flush=True)
+
+    def record_discovered(self, name, source):
+        self._write({'t': 'found', 'name': name, 'source': source})
+
+    def record_validated(self, name):
+        self.validated.add(name)
+        self._write({'t': 'valid', 'name': name})
+
+    def record_bruteforce(self, offset, force=False):
+        """שמירת offset ה-brute force (מוגבל לכתיבה אחת לשנייה)"""
+        now = time.monotonic()
+        if force or now - self._last_offset_write >= 1.0:
+            self._last_offset_write = now
+            self.bruteforce_offset = offset
+            self._write({'t': 'bf', 'offset': offset}, flush=force)
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                self._file.flush()
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """סגירה ומחיקה - לסריקה שהסתיימה אין מה להמשיך"""
+        self.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class TargetState:
+    """תוצאות מאומתות של הסריקה הקודמת של מטרה - בסיס לסריקה אינקרמנטלית (--since)
+
+    לכל שם נשמרים הרשומות, ה-TTL, זמן הגילוי הראשון, הפעם האחרונה שנראה
+    והפעם האחרונה שנבדק. שם מוכר נבדק מחדש רק כשעבר מרווח שתלוי ב-TTL ובזמן
+    שהשם כבר יציב (שם ותיק נבדק לעתים רחוקות יותר), בין MIN_INTERVAL ל-MAX_INTERVAL.
+    """
+
+    MIN_INTERVAL = 3600
+    MAX_INTERVAL = 7 * 86400
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+    @staticmethod
+    def default_path(domain):
+        return os.path.join(CONFIG_DIR, 'state', f"{domain}.jsonl")
+
+    def load(self):
+        """טעינת המצב הקודם; מחזיר את מספר השמות"""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entry['records'] = [tuple(r) for r in entry.get('records', [])]
+                self.entries[entry['name']] = entry
+        return len(self.entries)
+
+    def interval(self, entry):
+        stable_for = entry['last_seen'] - entry['first_seen']
+        return min(max(entry.get('ttl', 0), stable_for / 4, self.MIN_INTERVAL), self.MAX_INTERVAL)
+
+    def due(self, name, now=None):
+        """האם שם מוכר צריך בדיקה חוזרת (שם לא מוכר - תמיד)"""
+        entry = self.entries.get(name)
+        if entry is None:
+            return True
+        now = time.time() if now is None else now
+        return now - entry['last_checked'] >= self.interval(entry)
+
+    def save(self, entries):
+        """כתיבת המצב החדש (JSON lines, כתיבה אטומית)"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for name in sorted(entries):
+                entry = dict(entries[name], name=name)
+                entry['records'] = [list(r) for r in entry['records']]
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+        self.entries = entries
+
+
+# ==================== מקביליות אדפטיבית ====================
+
+class AIMDController:
+    """מגבלת מקביליות שמתכווננת לבד לפי תוצאות הבקשות (AIMD)
+
+    בהתחלה slow start: כל הצלחה מוסיפה 1 (המגבלה מוכפלת בכל "חלון"). מהכשל
+    הראשון - הגדלה של 1/limit לכל הצלחה. timeout, SERVFAIL/REFUSED, 429/503
+    או latency גבוה פי LATENCY_FACTOR מה-latency הבסיסי (ומעל
+    MIN_CONGESTED_LATENCY) מקטינים את המגבלה פי BACKOFF, לכל היותר פעם אחת
+    בחלון (בערך זמן תשובה אחד). לא בטוח ל-threads בעצמו - העוטף אחראי לנעילה.
+    """
+
+    BACKOFF = 0.7
+    LATENCY_FACTOR = 4.0
+    MIN_CONGESTED_LATENCY = 0.2
+    ALPHA = 0.1
+
+    def __init__(self, initial, minimum=1, maximum=1000):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.inflight = 0
+        self.slow_start = True
+        self.latency = None
+        self.base_latency = None
+        self.decreases = 0
+        self._last_decrease = 0.0
+
+    @property
+    def has_capacity(self):
+        return self.inflight < int(self.limit)
+
+    def on_success(self, latency=None):
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + self.ALPHA * (latency - self.latency)
+            if self.base_latency is None or self.latency < self.base_latency:
+                self.base_latency = self.latency
+            else:
+                # הבסיס מטפס לאט, כדי ששינוי קבוע ברשת לא ייחשב עומס לנצח
+                self.base_latency += 0.001 * (self.latency - self.base_latency)
+            if (self.latency > self.MIN_CONGESTED_LATENCY
+                    and self.latency > self.base_latency * self.LATENCY_FACTOR):
+                self.on_congestion()
+                return
+        if self.slow_start:
+            self.limit += 1
+        else:
+            self.limit += 1.0 / self.limit
+        self.limit = min(self.limit, self.maximum)
+
+    def on_congestion(self):
+        now = time.monotonic()
+        if now - self._last_decrease < max(self.latency or 0.0, 0.05):
+            return
+        self._last_decrease = now
+        self.slow_start = False
+        self.decreases += 1
+        self.limit = max(self.minimum, self.limit * self.BACKOFF)
+
+
+class HostConcurrency:
+    """מגבלת מקביליות אדפטיבית נפרדת לכל host, לשימוש מ-threads"""
+
+    MAXIMUM = 64
+
+    def __init__(self, initial=20, maximum=MAXIMUM):
+        self.initial = initial
+        self.maximum = maximum
+        self._controllers = {}
+        self._conditions = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host):
+        with self._lock:
+            controller = self._controllers.get(host)
+            if controller is None:
+                controller = self._controllers[host] = AIMDController(self.initial, 1, self.maximum)
+                self._conditions[host] = threading.Condition()
+            return controller, self._conditions[host]
+
+    def acquire(self, host, deadline=None):
+        """המתנה למקום פנוי; זורק SourceTimeout אם ההמתנה חורגת מה-deadline"""
+        controller, condition = self._get(host)
+        with condition:
+            while not controller.has_capacity:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    raise SourceTimeout(f"no free connection slot for {host}")
+                condition.wait(timeout)
+            controller.inflight += 1
+
+    def release(self, host, latency=None, congested=False):
+        controller, condition = self._get(host)
+        with condition:
+            controller.inflight -= 1
+            if congested:
+                controller.on_congestion()
+            else:
+                controller.on_success(latency)
+            condition.notify_all()
+
+    def limits(self):
+        with self._lock:
+            return {host: int(c.limit) for host, c in self._controllers.items()}
+
+
+# ==================== הגבלת קצב HTTP ====================
+
+class SourceTimeout(Exception):
+    """חריגה מתקציב הזמן של מקור פסיבי"""
+
+
+class SourceRun:
+    """ריצה של מקור פסיבי אחד - משותפת לכל ה-threads שעובדים בשבילו
+
+    timed_out נרשם כשבקשה כלשהי חרגה מה-deadline, גם אם המקור עצמו בלע את
+    החריגה; abandoned מסומן כשהמקור נזנח, ומאותו רגע הוא לא מוסיף שמות
+    ולא שולח בקשות חדשות. ריצה מסתיימת או ננטשת - לא שניהם.
+    """
+
+    def __init__(self, label, timeout):
+        self.label = label
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.timed_out = False
+        self.abandoned = threading.Event()
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.deadline = time.monotonic() + self.timeout
+
+    def finish(self):
+        """סימון סיום מתוך ה-thread של המקור; False אם המקור כבר נזנח"""
+        with self._lock:
+            if self.abandoned.is_set():
+                return False
+            self._finished = True
+            return True
+
+    def abandon(self):
+        """נטישה מה-thread הראשי; False אם המקור כבר הספיק לסיים"""
+        with self._lock:
+            if self._finished:
+                return False
+            self.abandoned.set()
+            return True
+
+    @property
+    def expired(self):
+        return self.timed_out or time.monotonic() >= self.deadline
+
+
+class TokenBucket:
+    """Token bucket בטוח ל-threads, עם אפשרות להשהות את ה-host (Retry-After)"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """המתנה לטוקן; זורק SourceTimeout אם ההמתנה חורגת מה-deadline"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            if deadline is not None and time.monotonic() + wait_for > deadline:
+                raise SourceTimeout("rate limit wait exceeds source deadline")
+            time.sleep(wait_for)
+
+    def block(self, seconds):
+        """השהיית כל הבקשות ל-host (למשל אחרי 429 עם Retry-After)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class HostRateLimiter:
+    """token bucket נפרד לכל host"""
+
+    def __init__(self, limits=None, default=DEFAULT_HOST_RATE):
+        self.limits = dict(HOST_RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(*self.limits.get(host, self.default))
+                self._buckets[host] = bucket
+            return bucket
+
+
+def parse_retry_after(value, default=5.0):
+    """פענוח כותרת Retry-After (שניות או תאריך HTTP)"""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+# ==================== cache HTTP ====================
+
+# כמה זמן (שניות) תשובה של מקור פסיבי נחשבת טרייה בלי לפנות לשרת בכלל.
+# אחרי זה נשלחת בקשה מותנית (ETag / Last-Modified), ו-304 מחזיר את העותק המקומי.
+HTTP_CACHE_TTLS = {
+    'crt.sh': 12 * 3600,
+    'rapiddns': 24 * 3600,
+    'hackertarget': 24 * 3600,
+    'anubis': 24 * 3600,
+    'threatcrowd': 24 * 3600,
+    'bufferover': 24 * 3600,
+}
+
+
+class CachedBody:
+    """קורא הגוף של רשומה ב-cache: פותח את הקובץ רק בקריאה הראשונה ופורס
+    את ה-zlib בהדרגה, כך שתשובה גדולה לא נטענת כולה לזיכרון"""
+
+    CHUNK = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._decompressor = zlib.decompressobj()
+        self._tail = b''
+        self._closed = False
+
+    def read(self, size=-1):
+        if self._closed:
+            return b''
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        chunks = []
+        wanted = size if size is not None and size >= 0 else -1
+        try:
+            while wanted != 0:
+                data = self._tail or self._file.read(self.CHUNK)
+                if not data:
+                    chunks.append(self._decompressor.flush())
+                    break
+                chunk = self._decompressor.decompress(data, max(wanted, 0))
+                self._tail = self._decompressor.unconsumed_tail
+                chunks.append(chunk)
+                if wanted > 0:
+                    wanted -= len(chunk)
+        except zlib.error as e:
+            self.close()
+            raise requests.exceptions.ContentDecodingError(f"corrupt cache entry {self.path}: {e}")
+        return b''.join(chunks)
+
+    def close(self):
+        self._closed = True
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class HTTPCache:
+    """cache תשובות HTTP על הדיסק, לתשובות של המקורות הפסיביים
+
+    כל URL נשמר בשני קבצים: הגוף דחוס ב-zlib (.cache) ו-sidecar קטן של
+    JSON (.meta) עם ETag, Last-Modified וזמן השמירה. בתוך ה-TTL של המקור
+    התשובה מוגשת מהדיסק (כ-stream), אחריו נשלחת בקשה מותנית ו-304 מעדכן רק
+    את ה-sidecar. כשהגודל הכולל עובר את התקרה נמחקים הקבצים שהשימוש האחרון
+    בהם הכי ישן.
+    """
+
+    def __init__(self, path=DEFAULT_HTTP_CACHE, max_bytes=512 * 1024 * 1024, ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = HTTP_CACHE_TTLS if ttls is None else ttls
+        self.hits = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._sizes = {}
+        os.makedirs(self.path, exist_ok=True)
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.cache'):
+                self._sizes[entry.name] = entry.stat().st_size
+        self._total = sum(self._sizes.values())
+
+    @staticmethod
+    def _file_name(url):
+        return hashlib.sha1(url.encode()).hexdigest() + '.cache'
+
+    def _meta_path(self, file_name):
+        return os.path.join(self.path, file_name[:-len('.cache')] + '.meta')
+
+    def ttl(self, source):
+        return self.ttls.get(source)
+
+    def lookup(self, url):
+        """(meta, CachedBody) של URL שמור, או None. הגוף נקרא רק כשצורכים אותו"""
+        file_name = self._file_name(url)
+        file_path = os.path.join(self.path, file_name)
+        try:
+            with open(self._meta_path(file_name), 'rb') as f:
+                meta = json.loads(f.read())
+            os.utime(file_path)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict) or meta.get('url') != url:
+            return None
+        return meta, CachedBody(file_path)
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def _meta(self, url, response):
+        return {
+            'url': url,
+            'stored': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'encoding': response.encoding,
+        }
+
+    def _open_entry(self, url):
+        file_name = self._file_name(url)
+        tmp_path = os.path.join(self.path, f"{file_name}.{threading.get_ident()}.tmp")
+        return file_name, tmp_path, open(tmp_path, 'wb')
+
+    def _write_meta(self, file_name, meta):
+        meta_path = self._meta_path(file_name)
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _commit(self, file_name, tmp_path, meta):
+        file_path = os.path.join(self.path, file_name)
+        os.replace(tmp_path, file_path)
+        self._write_meta(file_name, meta)
+        size = os.path.getsize(file_path)
+        with self._lock:
+            self._total += size - self._sizes.get(file_name, 0)
+            self._sizes[file_name] = size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # מוחקים לפי זמן שימוש אחרון עד 90% מהתקרה
+        entries = []
+        for file_name in self._sizes:
+            try:
+                entries.append((os.path.getmtime(os.path.join(self.path, file_name)), file_name))
+            except OSError:
+                entries.append((0, file_name))
+        for _mtime, file_name in sorted(entries):
+            if self._total <= self.max_bytes * 0.9:
+                break
+            for path in (self._meta_path(file_name), os.path.join(self.path, file_name)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total -= self._sizes.pop(file_name)
+
+    def store(self, url, response, body):
+        """שמירת תשובה שכבר נקראה במלואה"""
+        file_name, tmp_path, f = self._open_entry(url)
+        with f:
+            f.write(zlib.compress(body, 6))
+        self._commit(file_name, tmp_path, self._meta(url, response))
+
+    def refresh(self, url, meta):
+        """עדכון זמן השמירה אחרי 304 - רק ה-sidecar נכתב מחדש, הגוף נשאר"""
+        try:
+            self._write_meta(self._file_name(url), dict(meta, stored=time.time()))
+        except OSError:
+            pass
+
+    def tee(self, url, response):
+        """עטיפת iter_content של תשובת stream כך שהגוף נשמר תוך כדי קריאה
+
+        הרשומה נשמרת רק אם הגוף נקרא עד הסוף.
+        """
+        iter_content = response.iter_content
+        meta = self._meta(url, response)
+
+        def tee_content(chunk_size=1, decode_unicode=False):
+            file_name, tmp_path, f = self._open_entry(url)
+            compressor = zlib.compressobj(6)
+            complete = False
+            try:
+                for chunk in iter_content(chunk_size, decode_unicode):
+                    f.write(compressor.compress(chunk))
+                    yield chunk
+                f.write(compressor.flush())
+                complete = True
+            finally:
+                f.close()
+                if complete:
+                    self._commit(file_name, tmp_path, meta)
+                else:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+
+        return tee_content
+
+    @staticmethod
+    def build_response(url, meta, body):
+        """אובייקט Response של requests מתוך רשומה שמורה; הגוף (CachedBody)
+        נקרא כמו raw של תשובת רשת, כך ש-iter_content מזרים אותו מהדיסק"""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.raw = body
+        response.encoding = meta.get('encoding')
+        if meta.get('content_type'):
+            response.headers['Content-Type'] = meta['content_type']
+        response.headers['X-Subrecon-Cache'] = 'hit'
+        return response
+
+
+# ==================== מדדים ====================
+
+def _prom_labels(labels):
+    return ','.join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                    for k, v in labels.items())
+
+
+class ScanMetrics:
+    """מדדים לכל שלב ולכל מקור בסריקה אחת
+
+    לכל שלב: זמן ריצה, שאילתות DNS ושמות חדשים. לכל מקור: זמן, bytes שהורדו,
+    שמות שהחזיר, שמות חדשים (שלא נמצאו קודם ע"י מקור אחר), בקשות ושגיאות.
+    ייצוא ל-JSON ול-Prometheus textfile (יחד עם מדדי ה-resolvers מה-pool).
+    """
+
+    SOURCE_FIELDS = ('wall_s', 'bytes', 'requests', 'cached', 'names', 'new_names', 'errors')
+
+    def __init__(self, domain):
+        self.domain = domain
+        self.stages = OrderedDict()
+        self.sources = OrderedDict()
+        self._lock = threading.Lock()
+
+    def source(self, name):
+        with self._lock:
+            entry = self.sources.get(name)
+            if entry is None:
+                entry = dict.fromkeys(self.SOURCE_FIELDS, 0)
+                entry['status'] = 'running'
+                self.sources[name] = entry
+            return entry
+
+    def count(self, source, field, amount=1):
+        entry = self.source(source)
+        with self._lock:
+            entry[field] += amount
+
+    def finish_source(self, source, wall, status):
+        entry = self.source(source)
+        with self._lock:
+            entry['wall_s'] = round(wall, 3)
+            entry['status'] = status
+
+    def record_stage(self, name, wall, dns_queries, new_names, dns_cache_hits=0, dns_latency=None):
+        with self._lock:
+            latency_ms = round(dns_latency * 1000, 2) if dns_latency is not None else None
+            self.stages[name] = {'wall_s': round(wall, 3), 'dns_queries': dns_queries,
+                                 'dns_cache_hits': dns_cache_hits, 'dns_latency_avg_ms': latency_ms,
+                                 'new_names': new_names}
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'domain': self.domain,
+                'stages': {k: dict(v) for k, v in self.stages.items()},
+                'sources': {k: dict(v) for k, v in self.sources.items()},
+            }
+
+    def prometheus_lines(self):
+        """שורות מדדים (ללא HELP/TYPE) עם label של הדומיין"""
+        lines = []
+        data = self.to_dict()
+        for stage, values in data['stages'].items():
+            labels = _prom_labels({'domain': self.domain, 'stage': stage})
+            lines.append(f'subrecon_stage_duration_seconds{{{labels}}} {values["wall_s"]}')
+            lines.append(f'subrecon_stage_dns_queries{{{labels}}} {values["dns_queries"]}')
+            lines.append(f'subrecon_stage_dns_cache_hits{{{labels}}} {values["dns_cache_hits"]}')
+            lines.append(f'subrecon_stage_new_names{{{labels}}} {values["new_names"]}')
+        for source, values in data['sources'].items():
+            labels = _prom_labels({'domain': self.domain, 'source': source})
+            lines.append(f'subrecon_source_duration_seconds{{{labels}}} {values["wall_s"]}')
+            lines.append(f'subrecon_source_bytes_total{{{labels}}} {values["bytes"]}')
+            lines.append(f'subrecon_source_requests_total{{{labels}}} {values["requests"]}')
+            lines.append(f'subrecon_source_cache_hits_total{{{labels}}} {values["cached"]}')
+            lines.append(f'subrecon_source_names_total{{{labels}}} {values["names"]}')
+            lines.append(f'subrecon_source_new_names_total{{{labels}}} {values["new_names"]}')
+            lines.append(f'subrecon_source_errors_total{{{labels}}} {values["errors"]}')
+        return lines
+
+
+PROMETHEUS_HELP = [
+    ('subrecon_stage_duration_seconds', 'gauge', 'Wall time per scan stage'),
+    ('subrecon_stage_dns_queries', 'gauge', 'DNS queries sent during a stage'),
+    ('subrecon_stage_dns_cache_hits', 'gauge', 'DNS lookups answered from the cache during a stage'),
+    ('subrecon_stage_new_names', 'gauge', 'New names discovered during a stage'),
+    ('subrecon_source_duration_seconds', 'gauge', 'Wall time per source'),
+    ('subrecon_source_bytes_total', 'counter', 'Bytes fetched per source'),
+    ('subrecon_source_requests_total', 'counter', 'HTTP requests per source'),
+    ('subrecon_source_cache_hits_total', 'counter', 'Responses served from the HTTP cache per source'),
+    ('subrecon_source_names_total', 'counter', 'Names yielded per source'),
+    ('subrecon_source_new_names_total', 'counter', 'Unique new names contributed per source'),
+    ('subrecon_source_errors_total', 'counter', 'Errors per source'),
+    ('subrecon_resolver_queries_total', 'counter', 'DNS queries per resolver and rcode'),
+    ('subrecon_resolver_latency_seconds', 'histogram', 'DNS query latency per resolver'),
+]
+
+
+def resolver_metrics(pool):
+    """מדדי ה-resolvers (היסטוגרמה ו-rcodes) כ-dict"""
+    resolvers = {}
+    for server in pool.servers:
+        h = pool.health[server]
+        resolvers[h.label] = {
+            'queries': h.queries,
+            'errors': h.errors,
+            'rcodes': dict(h.rcodes),
+            'latency_ewma_ms': round(h.latency * 1000, 2),
+            'concurrency_limit': int(pool.limits[server].limit),
+            'latency_sum_s': round(h.latency_sum, 6),
+            'latency_count': h.latency_count,
+            'latency_buckets': dict(zip([str(b) for b in LATENCY_BUCKETS], h.latency_buckets)),
+        }
+    return resolvers
+
+
+def write_metrics(metrics_list, pool, json_path=None, prom_path=None):
+    """ייצוא מדדים של סריקה אחת או יותר (batch) ל-JSON ול-Prometheus textfile"""
+    def atomic_write(path, text):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    if json_path:
+        data = {
+            'generated': time.time(),
+            'targets': [m.to_dict() for m in metrics_list],
+            'resolvers': resolver_metrics(pool),
+        }
+        atomic_write(json_path, json.dumps(data, indent=2) + '\n')
+
+    if prom_path:
+        by_metric = OrderedDict((name, []) for name, _type, _help in PROMETHEUS_HELP)
+        for metrics in metrics_list:
+            for line in metrics.prometheus_lines():
+                by_metric[line.split('{', 1)[0]].append(line)
+        for server in pool.servers:
+            h = pool.health[server]
+            for rcode, count in sorted(h.rcodes.items()):
+                labels = _prom_labels({'resolver': h.label, 'rcode': rcode})
+                by_metric['subrecon_resolver_queries_total'].append(
+                    f'subrecon_resolver_queries_total{{{labels}}} {count}')
+            cumulative = 0
+            hist = by_metric['subrecon_resolver_latency_seconds']
+            for bound, count in zip(LATENCY_BUCKETS, h.latency_buckets):
+                cumulative += count
+                labels = _prom_labels({'resolver': h.label, 'le': bound})
+                hist.append(f'subrecon_resolver_latency_seconds_bucket{{{labels}}} {cumulative}')
+            labels = _prom_labels({'resolver': h.label, 'le': '+Inf'})
+            hist.append(f'subrecon_resolver_latency_seconds_bucket{{{labels}}} {h.latency_count}')
+            labels = _prom_labels({'resolver': h.label})
+            hist.append(f'subrecon_resolver_latency_seconds_sum{{{labels}}} {h.latency_sum:.6f}')
+            hist.append(f'subrecon_resolver_latency_seconds_count{{{labels}}} {h.latency_count}')
+        lines = []
+        for name, metric_type, help_text in PROMETHEUS_HELP:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.extend(by_metric[name])
+        atomic_write(prom_path, '\n'.join(lines) + '\n')
+
+
+# ==================== פלט בזרימה ====================
+
+class EventWriter:
+    """כתיבת אירועי סריקה כ-NDJSON (שורת JSON לכל אירוע) לקובץ או ל-stdout
+
+    האירועים נכתבים מיד כשהם קורים, כך שכלים שממשיכים את העבודה (probing,
+    התראות) לא מחכים לסוף הסריקה. הכתיבה עוברת דרך buffer שמתרוקן כל
+    FLUSH_LINES שורות, וגם thread רקע מרוקן אותו כל FLUSH_INTERVAL שניות -
+    כך שאירוע בודד לא נתקע ב-buffer כשהסריקה שקטה.
+    """
+
+    FLUSH_LINES = 256
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, target):
+        if hasattr(target, 'write'):
+            self._file = target
+            self._owns_file = False
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            self._file = open(target, 'w', buffering=1024 * 1024)
+            self._owns_file = True
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._flusher = None
+
+    def emit(self, event, domain, **fields):
+        record = {'event': event, 'domain': domain, 'ts': round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            self._buffer.append(line)
+            now = time.monotonic()
+            if len(self._buffer) >= self.FLUSH_LINES or now - self._last_flush >= self.FLUSH_INTERVAL:
+                self._flush(now)
+            elif self._flusher is None and not self._closed.is_set():
+                self._flusher = threading.Thread(target=self._flush_loop, name='event-flush', daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.FLUSH_INTERVAL):
+            with self._lock:
+                now = time.monotonic()
+                if self._buffer and now - self._last_flush >= self.FLUSH_INTERVAL:
+                    try:
+                        self._flush(now)
+                    except (OSError, ValueError):
+                        return  # הקובץ נסגר מבחוץ
+
+    def _flush(self, now):
+        if self._buffer:
+            self._file.write('\n'.join(self._buffer) + '\n')
+            self._buffer.clear()
+        self._file.flush()
+        self._last_flush = now
+
+    def flush(self):
+        with self._lock:
+            self._flush(time.monotonic())
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+
+
+# ==================== תשתית משותפת ====================
+
+# User Agents שונים
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15',
+]
+
+# רשימת name servers ציבוריים
+DEFAULT_NAMESERVERS = [
+    '8.8.8.8',      # Google
+    '8.8.4.4',      # Google
+    '1.1.1.1',      # Cloudflare
+    '1.0.0.1',      # Cloudflare
+    '9.9.9.9',      # Quad9
+    '208.67.222.222', # OpenDNS
+    '208.67.220.220', # OpenDNS
+]
+
+
+def create_session():
+    """יצירת session עם headers מתאימים"""
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    })
+    session.verify = False
+    # pool לכל host בגודל המקביליות המקסימלית, אחרת urllib3 פותח וזורק חיבורים מעל 10
+    adapter = HTTPAdapter(pool_maxsize=HostConcurrency.MAXIMUM)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    # השתמשתי ב-try/except במקום disable_warnings ישיר
+    try:
+        import urllib3
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    except:
+        pass
+    return session
+
+
+# כללי הווריאציות של ה-wordlist המובנה ('{}' הוא המילה); compile-wordlist
+# יכול להחיל אותם גם על wordlists מותאמים
+WORDLIST_AFFIXES = (
+    '{}', '{}1', '{}2', '{}01', '{}-01', '{}-prod', '{}-production', '{}-live',
+    '{}-new', '{}-old', 'new-{}', 'old-{}', 'prod-{}',
+)
+
+
+@functools.lru_cache(maxsize=1)
+def load_common_subdomains():
+    """טעינת רשימת סאב-דומיינים נפוצים (נבנית פעם אחת לכל תהליך)"""
+    common = [
+        # בסיסיים
+        'www', 'mail', 'ftp', 'smtp', 'pop', 'pop3', 'imap', 'webmail',
+        # אדמיניסטרציה
+        'admin', 'administrator', 'login', 'dashboard', 'control', 'cpanel',
+        'whm', 'plesk', 'webadmin', 'server', 'ns1', 'ns2', 'ns3', 'ns4',
+        # פיתוח
+        'dev', 'development', 'test', 'testing', 'stage', 'staging', 'beta',
+        'alpha', 'demo', 'sandbox', 'lab', 'experiment',
+        # אפליקציות
+        'app', 'api', 'api2', 'api3', 'mobile', 'm', 'wap', 'apps',
+        # שירותים
+        'blog', 'news', 'forum', 'forums', 'support', 'help', 'kb',
+        'wiki', 'docs', 'documentation', 'status', 'monitor', 'stats',
+        'analytics', 'metrics', 'graph', 'grafana', 'prometheus',
+        # קבצים ואחסון
+        'files', 'file', 'upload', 'download', 'storage', 'backup',
+        'share', 'shared', 'public', 'private', 'secure', 's',
+        # שירותי ענן
+        'aws', 'azure', 'cloud', 'gcp', 's3', 'bucket', 'blob', 'cdn',
+        'cloudfront', 'akamai', 'fastly', 'storage',
+        # שירותים פנימיים
+        'internal', 'intranet', 'vpn', 'proxy', 'gateway', 'router',
+        'firewall', 'fw', 'switch', 'hub', 'printer', 'print',
+        # CI/CD
+        'jenkins', 'git', 'gitlab', 'github', 'bitbucket', 'svn',
+        'docker', 'registry', 'nexus', 'artifactory', 'sonar',
+        # בסיסי נתונים
+        'db', 'database', 'mysql', 'postgres', 'mongo', 'redis',
+        'elasticsearch', 'kibana', 'logstash', 'rabbitmq',
+        # אימייל
+        'mail', 'smtp', 'pop3', 'imap', 'exchange', 'owa', 'webmail',
+        # DNS
+        'dns', 'bind', 'ns', 'nameserver', 'resolver',
+        # אחרים
+        'portal', 'hub', 'center', 'core', 'main', 'primary',
+        'secondary', 'backup', 'failover', 'replica', 'cluster',
+        'node', 'service', 'services', 'svc', 'endpoint',
+        'gateway', 'router', 'switch', 'firewall', 'fw',
+        'bastion', 'jump', 'jumpserver', 'terminal',
+        'vcenter', 'esxi', 'hyperv', 'xen', 'kvm',
+        'sharepoint', 'jira', 'confluence', 'bitbucket',
+        'teamcity', 'bamboo', 'octopus', 'ansible',
+        'puppet', 'chef', 'salt', 'terraform',
+        'kafka', 'zookeeper', 'spark', 'hadoop',
+        'hive', 'hbase', 'cassandra', 'couchbase',
+        'orientdb', 'neo4j', 'arangodb', 'influxdb',
+        'prometheus', 'alertmanager', 'thanos',
+        'consul', 'etcd', 'zookeeper', 'eureka',
+        'istio', 'linkerd', 'envoy', 'traefik',
+        'nginx', 'apache', 'tomcat', 'jetty',
+        'iis', 'weblogic', 'websphere', 'jboss',
+        'wildfly', 'glassfish', 'payara',
+        'php', 'python', 'ruby', 'node', 'java',
+        'go', 'rust', 'dotnet', 'aspnet',
+        'wordpress', 'joomla', 'drupal', 'magento',
+        'shopify', 'woocommerce', 'prestashop',
+        'sharepoint', 'dynamics', 'salesforce',
+        'zendesk', 'freshdesk', 'helpdesk',
+        'sentry', 'rollbar', 'bugsnag', 'airbrake',
+        'newrelic', 'datadog', 'appdynamics',
+        'splunk', 'sumologic', 'loggly', 'papertrail',
+    ]
+
+    # וריאציות עם הדומיין
+    variations = [affix.replace('{}', sub) for sub in common for affix in WORDLIST_AFFIXES]
+
+    # dedup ששומר על הסדר - חשוב כדי ש-offset של checkpoint יהיה יציב בין ריצות
+    return tuple(dict.fromkeys(variations))
+
+
+class ScanCancelled(Exception):
+    """הסריקה בוטלה דרך CancelToken"""
+
+
+class CancelToken:
+    """ביטול סריקה מבחוץ (מכל thread)
+
+    ה-enumerator בודק את ה-token בין שלבים, לפני כל בקשת HTTP ותוך כדי
+    רזולוציה, ועוצר עם ScanCancelled. token אחד יכול לבטל כמה סריקות, ו-token
+    עם parent מבוטל גם כשה-parent מבוטל.
+    """
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self.parent = parent
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise ScanCancelled("scan cancelled")
+
+
+class ScanContext:
+    """תשתית שמשותפת לכל הסריקות בתהליך
+
+    session HTTP אחד (connection pool), rate limiter לכל host, מאגר resolvers
+    ומנוע DNS אחד, cache תשובות DNS (ואופציונלית HTTP), מנוע חילוץ השמות
+    (וה-process pool שלו), זרם אירועי NDJSON אופציונלי וה-wordlist המובנה.
+    במצב batch תקציב
+    ה-DNS מתחלק שווה בשווה בין המטרות הפעילות. session ומנוע DNS שהגיעו
+    מבחוץ (שימוש כספרייה) נשארים פתוחים ב-close - הם שייכים למי שיצר אותם.
+    """
+
+    def __init__(self, nameservers=None, dns_concurrency=500, dns_cache=None, http_cache=None, events=None,
+                 initial_concurrency=20, extractor=None, session=None, dns_engine=None):
+        self._owns_session = session is None
+        self._owns_engine = dns_engine is None
+        self.session = session if session is not None else create_session()
+        self.http_cache = http_cache
+        self.extractor = extractor if extractor is not None else HostExtractor()
+        self.events = events
+        self.rate_limiter = HostRateLimiter()
+        self.http_limits = HostConcurrency(initial_concurrency)
+        if dns_engine is not None:
+            self.nameservers = [format_nameserver(server) for server in dns_engine.pool.servers]
+            self.dns_cache = dns_engine.cache if dns_engine.cache is not None else DNSCache()
+            self.dns_engine = dns_engine
+        else:
+            self.nameservers = list(nameservers or DEFAULT_NAMESERVERS)
+            self.dns_cache = dns_cache if dns_cache is not None else DNSCache()
+            self.dns_engine = AsyncDNSEngine(self.nameservers, max_inflight=dns_concurrency,
+                                             cache=self.dns_cache, initial_concurrency=initial_concurrency)
+        self.common_subdomains = load_common_subdomains()
+        self._active_targets = 0
+        self._lock = threading.Lock()
+
+    def target_started(self):
+        with self._lock:
+            self._active_targets += 1
+
+    def target_finished(self):
+        with self._lock:
+            self._active_targets = max(self._active_targets - 1, 0)
+
+    def dns_share(self):
+        """החלק ההוגן של מטרה אחת מתקציב השאילתות הכולל"""
+        with self._lock:
+            active = max(self._active_targets, 1)
+        return max(self.dns_engine.max_inflight // active, 1)
+
+    def close(self):
+        if self._owns_engine:
+            self.dns_engine.close()
+        self.extractor.close()
+        if self._owns_session:
+            self.session.close()
+
+
 class SubdomainEnumerator:
-    def __init__(self, domain, output_file=None, threads=20, timeout=30):
+    def __init__(self, domain, output_file=None, threads=20, timeout=30, dns_concurrency=500,
+                 dns_cache=None, source_timeout=120, journal=None, context=None, quiet=False,
+                 permutation_budget=20000, permutation_rounds=3, crawl_depth=2, crawl_pages=300,
+                 recursive=False, recursive_depth=3, query_budget=100000, events=None, write_files=True,
+                 cancel=None, on_status=None, wordlist_shard=None):
         self.domain = domain
         self.output_file = output_file
         self.threads = threads
         self.timeout = timeout
-        self.subdomains = set()
-        self.validated_subs = set()
-        
-        # User Agents שונים - תיקון: הוספתי את זה לפני קריאה ל-_create_session
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15',
-        ]
+        self.subdomains = SubdomainStore()
+        self.validated_subs = SubdomainStore()
+        self.host_pattern = compile_host_pattern(domain)
+        self.journal = journal
+        self.metrics = ScanMetrics(domain)
+        self._results_lock = threading.Lock()
+        self.quiet = quiet
+        self.source_timeout = source_timeout
+        self.permutation_budget = permutation_budget
+        self.permutation_rounds = permutation_rounds
+        self.crawl_depth = crawl_depth
+        self.crawl_pages = crawl_pages
+        self.recursive = recursive
+        self.recursive_depth = recursive_depth
+        self.query_budget = query_budget
+        # (k, n): ה-brute force מכסה רק את החלק ה-k מתוך n של wordlist מקומפל
+        self.wordlist_shard = wordlist_shard
+        # בלי write_files התוצאות נשארות בזיכרון (daemon) - לא נכתבים קבצי פלט
+        self.write_files = write_files
+        self.cancel = cancel
+        # on_status(status, message) מחליף את ההדפסה למסך (שימוש כספרייה)
+        self.on_status = on_status
+        self._source_ctx = threading.local()
+        self.state = None
+        self.diff = None
         
-        self.session = self._create_session()
-        
-        # רשימת name servers ציבוריים
-        self.nameservers = [
-            '8.8.8.8',      # Google
-            '8.8.4.4',      # Google
-            '1.1.1.1',      # Cloudflare
-            '1.0.0.1',      # Cloudflare
-            '9.9.9.9',      # Quad9
-            '208.67.222.222', # OpenDNS
-            '208.67.220.220', # OpenDNS
-        ]
+        # תשתית משותפת (session, resolvers, מנוע DNS, cache, wordlist) -
+        # במצב batch כל המטרות חולקות context אחד
+        if context is None:
+            context = ScanContext(dns_concurrency=dns_concurrency, dns_cache=dns_cache, initial_concurrency=threads)
+        self.context = context
+        self.session = context.session
+        self.rate_limiter = context.rate_limiter
+        self.http_limits = context.http_limits
+        self.nameservers = context.nameservers
+        self.dns_cache = context.dns_cache
+        self.http_cache = context.http_cache
+        self.extractor = context.extractor
+        self.events = events if events is not None else context.events
+        self.dns_engine = context.dns_engine
+        # השאילתות של המטרה הזו בלבד, גם כשהמנוע משותף לכמה מטרות
+        self.dns_account = DNSAccount()
+        self.wildcards = WildcardDetector(self.dns_engine)
+        self._reported_wildcards = set()
+        self._resolved_events = set()
+        # יעדי CNAME שכבר נפתרו בסריקה הזו (משותף לכל שלבי הוולידציה)
+        self._cname_memo = CNAMEMemo()
         
         # wordlist בסיסית
-        self.common_subdomains = self._load_common_subdomains()
-    
-    def _create_session(self):
-        """יצירת session עם headers מתאימים"""
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': random.choice(self.user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-        session.verify = False
-        # השתמשתי ב-try/except במקום disable_warnings ישיר
-        try:
-            import urllib3
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        except:
-            pass
-        return session
-    
-    def _load_common_subdomains(self):
-        """טעינת רשימת סאב-דומיינים נפוצים"""
-        common = [
-            # בסיסיים
-            'www', 'mail', 'ftp', 'smtp', 'pop', 'pop3', 'imap', 'webmail',
-            # אדמיניסטרציה
-            'admin', 'administrator', 'login', 'dashboard', 'control', 'cpanel',
-            'whm', 'plesk', 'webadmin', 'server', 'ns1', 'ns2', 'ns3', 'ns4',
-            # פיתוח
-            'dev', 'development', 'test', 'testing', 'stage', 'staging', 'beta',
-            'alpha', 'demo', 'sandbox', 'lab', 'experiment',
-            # אפליקציות
-            'app', 'api', 'api2', 'api3', 'mobile', 'm', 'wap', 'apps',
-            # שירותים
-            'blog', 'news', 'forum', 'forums', 'support', 'help', 'kb',
-            'wiki', 'docs', 'documentation', 'status', 'monitor', 'stats',
-            'analytics', 'metrics', 'graph', 'grafana', 'prometheus',
-            # קבצים ואחסון
-            'files', 'file', 'upload', 'download', 'storage', 'backup',
-            'share', 'shared', 'public', 'private', 'secure', 's',
-            # שירותי ענן
-            'aws', 'azure', 'cloud', 'gcp', 's3', 'bucket', 'blob', 'cdn',
-            'cloudfront', 'akamai', 'fastly', 'storage',
-            # שירותים פנימיים
-            'internal', 'intranet', 'vpn', 'proxy', 'gateway', 'router',
-            'firewall', 'fw', 'switch', 'hub', 'printer', 'print',
-            # CI/CD
-            'jenkins', 'git', 'gitlab', 'github', 'bitbucket', 'svn',
-            'docker', 'registry', 'nexus', 'artifactory', 'sonar',
-            # בסיסי נתונים
-            'db', 'database', 'mysql', 'postgres', 'mongo', 'redis',
-            'elasticsearch', 'kibana', 'logstash', 'rabbitmq',
-            # אימייל
-            'mail', 'smtp', 'pop3', 'imap', 'exchange', 'owa', 'webmail',
-            # DNS
-            'dns', 'bind', 'ns', 'nameserver', 'resolver',
-            # אחרים
-            'portal', 'hub', 'center', 'core', 'main', 'primary',
-            'secondary', 'backup', 'failover', 'replica', 'cluster',
-            'node', 'service', 'services', 'svc', 'endpoint',
-            'gateway', 'router', 'switch', 'firewall', 'fw',
-            'bastion', 'jump', 'jumpserver', 'terminal',
-            'vcenter', 'esxi', 'hyperv', 'xen', 'kvm',
-            'sharepoint', 'jira', 'confluence', 'bitbucket',
-            'teamcity', 'bamboo', 'octopus', 'ansible',
-            'puppet', 'chef', 'salt', 'terraform',
-            'kafka', 'zookeeper', 'spark', 'hadoop',
-            'hive', 'hbase', 'cassandra', 'couchbase',
-            'orientdb', 'neo4j', 'arangodb', 'influxdb',
-            'prometheus', 'alertmanager', 'thanos',
-            'consul', 'etcd', 'zookeeper', 'eureka',
-            'istio', 'linkerd', 'envoy', 'traefik',
-            'nginx', 'apache', 'tomcat', 'jetty',
-            'iis', 'weblogic', 'websphere', 'jboss',
-            'wildfly', 'glassfish', 'payara',
-            'php', 'python', 'ruby', 'node', 'java',
-            'go', 'rust', 'dotnet', 'aspnet',
-            'wordpress', 'joomla', 'drupal', 'magento',
-            'shopify', 'woocommerce', 'prestashop',
-            'sharepoint', 'dynamics', 'salesforce',
-            'zendesk', 'freshdesk', 'helpdesk',
-            'sentry', 'rollbar', 'bugsnag', 'airbrake',
-            'newrelic', 'datadog', 'appdynamics',
-            'splunk', 'sumologic', 'loggly', 'papertrail',
-        ]
+        self.common_subdomains = context.common_subdomains
+    
+    def http_get(self, url, max_retries=3, **kwargs):
+        """GET עם הגבלת קצב לכל host, כיבוד 429/Retry-After ו-deadline של המקור"""
+        run = getattr(self._source_ctx, 'run', None)
+        try:
+            return self._http_get(url, run, max_retries, **kwargs)
+        except SourceTimeout:
+            if run is not None:
+                run.timed_out = True
+            raise
+    
+    def _http_get(self, url, run, max_retries, **kwargs):
+        host = urlparse(url).hostname or ''
+        bucket = self.rate_limiter.bucket(host)
+        deadline = run.deadline if run is not None else None
+        source = run.label if run is not None else None
+        kwargs.setdefault('verify', False)
+        timeout = kwargs.pop('timeout', self.timeout)
+        
+        # cache על הדיסק למקורות עם TTL: טרי -> מהדיסק, ישן -> בקשה מותנית
+        cache_ttl = self.http_cache.ttl(source) if self.http_cache is not None and source else None
+        cached = self.http_cache.lookup(url) if cache_ttl is not None else None
+        if cached is not None:
+            meta, body = cached
+            if time.time() - meta['stored'] < cache_ttl:
+                self.metrics.count(source, 'cached')
+                return HTTPCache.build_response(url, meta, body)
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **self.http_cache.conditional_headers(meta))
+        
+        for attempt in range(max_retries + 1):
+            self._check_cancelled()
+            if run is not None and run.abandoned.is_set():
+                raise SourceTimeout(f"{source} was abandoned")
+            bucket.acquire(deadline)
+            request_timeout = timeout
+            if deadline is not None:
+                request_timeout = min(timeout, deadline - time.monotonic())
+                if request_timeout <= 0:
+                    raise SourceTimeout(f"deadline exceeded for {host}")
+            if source is not None:
+                self.metrics.count(source, 'requests')
+            # מקביליות אדפטיבית לכל host: timeouts ו-429/503 מקטינים, הצלחות מגדילות
+            self.http_limits.acquire(host, deadline)
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=request_timeout, **kwargs)
+            except requests.Timeout:
+                self.http_limits.release(host, congested=True)
+                if source is not None:
+                    self.metrics.count(source, 'errors')
+                if deadline is not None and time.monotonic() >= deadline - 0.1:
+                    raise SourceTimeout(f"deadline exceeded for {host}")
+                raise
+            except requests.RequestException:
+                self.http_limits.release(host, congested=True)
+                if source is not None:
+                    self.metrics.count(source, 'errors')
+                raise
+            latency = time.monotonic() - started
+            congested = response.status_code in (429, 503)
+            if kwargs.get('stream'):
+                # בתשובת stream החיבור תפוס עד שהגוף נקרא - גם ה-slot
+                self._release_when_consumed(response, host, latency, congested)
+            else:
+                self.http_limits.release(host, latency, congested=congested)
+            if source is not None:
+                if response.status_code >= 400:
+                    self.metrics.count(source, 'errors')
+                # בתשובות stream ה-bytes נספרים ע"י מי שקורא אותן
+                if not kwargs.get('stream'):
+                    self.metrics.count(source, 'bytes', len(response.content))
+            if cached is not None and response.status_code == 304:
+                response.close()
+                self.http_cache.refresh(url, cached[0])
+                self.metrics.count(source, 'cached')
+                return HTTPCache.build_response(url, *cached)
+            if cache_ttl is not None and response.status_code == 200:
+                if kwargs.get('stream'):
+                    response.iter_content = self.http_cache.tee(url, response)
+                else:
+                    self.http_cache.store(url, response, response.content)
+            if response.status_code not in (429, 503) or attempt == max_retries:
+                return response
+            delay = parse_retry_after(response.headers.get('Retry-After'))
+            bucket.block(delay)
+            response.close()
+            self.print_status(f"{host} returned {response.status_code}, backing off {delay:.0f}s", "warning")
+        return response
+    
+    def _release_when_consumed(self, response, host, latency, congested):
+        """שחרור ה-slot של ה-host כשהגוף של תשובת stream נקרא עד הסוף או כשהיא נסגרת"""
+        held = {'slot': True}
+        
+        def release(failed=False):
+            if held.pop('slot', None):
+                self.http_limits.release(host, latency, congested=congested or failed)
         
-        # וריאציות עם הדומיין
-        variations = []
-        for sub in common:
-            variations.extend([
-                sub,
-                f"{sub}1",
-                f"{sub}2",
-                f"{sub}01",
-                f"{sub}-01",
-                f"{sub}-prod",
-                f"{sub}-production",
-                f"{sub}-live",
-                f"{sub}-new",
-                f"{sub}-old",
-                f"new-{sub}",
-                f"old-{sub}",
-                f"prod-{sub}",
-            ])
-        
-        return list(set(variations))
+        iter_content = response.iter_content
+        close = response.close
+        
+        def iter_and_release(chunk_size=1, decode_unicode=False):
+            try:
+                yield from iter_content(chunk_size, decode_unicode)
+            except requests.RequestException:
+                release(failed=True)
+                raise
+            release()  # קורא שעצר באמצע עדיין מחזיק את החיבור - משתחרר ב-close
+        
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+        
+        response.iter_content = iter_and_release
+        response.close = close_and_release
     
     def print_status(self, message, status="info"):
-        """הדפסה עם צבעים לפי סטטוס"""
+        """הדפסה עם צבעים לפי סטטוס
+
+        במצב quiet (batch) מודפסות רק אזהרות ושגיאות, עם שם המטרה.
+        """
+        if self.on_status is not None:
+            self.on_status(status, message)
+            return
+        if self.quiet:
+            if status not in ("warning", "error"):
+                return
+            message = f"[{self.domain}] {message}"
         if COLORS:
             if status == "success":
                 print(f"{Fore.GREEN}[+] {message}")
@@ -202,69 +3222,187 @@ class SubdomainEnumerator:
     # ==================== שיטות DNS מתקדמות ====================
     
     def dns_resolve(self, subdomain):
-        """רזולוציית DNS עם ניסיון מספר שרתים"""
-        if not DNS_AVAILABLE:
-            try:
-                socket.gethostbyname(subdomain)
-                return True, "system"
-            except:
-                return False, None
-        
-        for ns in self.nameservers:
-            try:
-                resolver = dns.resolver.Resolver()
-                resolver.nameservers = [ns]
-                resolver.timeout = 5
-                resolver.lifetime = 5
-                answers = resolver.resolve(subdomain, 'A')
-                if answers:
-                    return True, ns
-            except:
-                continue
+        """רזולוציית DNS דרך המנוע האסינכרוני"""
+        result = self.dns_engine.run(self.dns_engine.query(subdomain, 'A'), self.dns_account)
+        if result.found:
+            return True, result.resolver
         return False, None
     
+    def resolve_names(self, names, on_result=None, desc="Resolving", total=None, filter_wildcards=False,
+                      on_found=None, rtype='A', progress=None):
+        """רזולוציה מקבילית של רצף שמות עם פס התקדמות
+
+        מחזיר רשימה של השמות שנמצאו. on_result נקרא לכל DNSResult ו-on_found
+        לכל שם שנמצא, מיד כשהתשובה מגיעה (מתוך ה-thread של המנוע). עם
+        filter_wildcards, תשובות שתואמות ל-wildcard של ה-zone נזרקות מיד ולא
+        נספרות כממצא. progress הוא פס קיים של שלב שלם (במקום פס לכל קריאה) -
+        הקורא אחראי לסגור אותו.
+        """
+        found = []
+        state = {'checked': 0}
+        owns_progress = progress is None
+        if owns_progress and TQDM_AVAILABLE and not self.quiet:
+            progress = tqdm(total=total, desc=desc)
+        
+        async def handle(result):
+            state['checked'] += 1
+            if result.found and filter_wildcards and await self.wildcards.is_wildcard(result):
+                if self.events is not None:
+                    self.events.emit('rejected', self.domain, name=result.name, reason='wildcard')
+            elif result.found:
+                found.append(result.name)
+                if on_found is not None:
+                    on_found(result.name)
+                if self.events is not None and result.name not in self._resolved_events:
+                    self._resolved_events.add(result.name)
+                    self.events.emit('resolved', self.domain, name=result.name, resolver=result.resolver,
+                                     records=[[r[1], r[3]] for r in result.records if not isinstance(r[3], bytes)])
+            if on_result is not None:
+                on_result(result)
+            if progress is not None:
+                progress.update(1)
+            elif state['checked'] % 500 == 0:
+                self.print_status(f"{desc}: checked {state['checked']}, found {len(found)}", "info")
+        
+        try:
+            # במצב batch כל מטרה מקבלת חלק הוגן מתקציב השאילתות
+            concurrency = self.context.dns_share()
+            self.dns_engine.run(self.dns_engine.resolve_many(self._until_cancelled(names), rtype, handle,
+                                                             concurrency, cname_memo=self._cname_memo),
+                                self.dns_account)
+        finally:
+            if progress is not None and owns_progress:
+                progress.close()
+        self._check_cancelled()
+        return found
+    
+    @property
+    def cancelled(self):
+        return self.cancel is not None and self.cancel.cancelled
+    
+    def _check_cancelled(self):
+        if self.cancel is not None:
+            self.cancel.raise_if_cancelled()
+    
+    def _until_cancelled(self, names):
+        """רצף השמות נקטע ברגע שהסריקה מבוטלת - ה-workers של המנוע מסיימים מיד"""
+        if self.cancel is None:
+            yield from names
+            return
+        for name in names:
+            if self.cancel.cancelled:
+                return
+            yield name
+    
+    def report_wildcards(self):
+        """הדפסת zones עם wildcard שזוהו (כל zone פעם אחת)"""
+        for zone in self.wildcards.wildcard_zones():
+            if zone not in self._reported_wildcards:
+                self.print_status(f"Wildcard DNS detected: *.{zone} (matching answers are dropped)", "warning")
+                self._reported_wildcards.add(zone)
+        if self.wildcards.rejected:
+            self.print_status(f"Dropped {self.wildcards.rejected} wildcard matches so far", "info")
+    
     # ==================== מקורות פסיביים מתקדמים ====================
     
+    def add_subdomain(self, name, source=None, prefetch=False):
+        """נקודת כניסה אחת לכל שם שהתגלה; מחזיר True אם השם חדש
+
+        עם prefetch השם נשלח מיד ל-resolver לחימום ה-cache (לשמות שמגיעים
+        תוך כדי הורדה ארוכה).
+        """
+        name = name.strip().lower().rstrip('.')
+        if not name:
+            return False
+        run = getattr(self._source_ctx, 'run', None)
+        if run is not None and run.abandoned.is_set():
+            return False  # מקור שנזנח ממשיך לרוץ ברקע - התוצאות שלו כבר לא נכנסות
+        if source is not None:
+            self.metrics.count(source, 'names')
+        with self._results_lock:
+            # הנטישה נעשית תחת אותה נעילה - אחריה שום שם של המקור לא נכנס
+            if run is not None and run.abandoned.is_set():
+                return False
+            if not self.subdomains.add(name, source):
+                return False
+        if source is not None:
+            self.metrics.count(source, 'new_names')
+        if self.journal is not None:
+            self.journal.record_discovered(name, source)
+        if self.events is not None:
+            self.events.emit('discovered', self.domain, name=name, source=source)
+        if prefetch:
+            self.dns_engine.prefetch(name, account=self.dns_account)
+        return True
+    
     def crt_sh_advanced(self):
-        """חיפוש מתקדם ב-crt.sh עם פילטרים נוספים"""
+        """חיפוש מתקדם ב-crt.sh עם פילטרים נוספים
+
+        התשובה (לעתים מאות MB) מפורסרת בזרימה: כל תעודה מעובדת ברגע שהגיעה,
+        תעודות שכבר נראו בווריאנט קודם של השאילתה מדולגות (set מדויק של
+        מזהי התעודות - false positive היה מפיל תעודה אמיתית), ושמות חדשים
+        נשלחים ל-resolver עוד לפני שההורדה הסתיימה. ה-deadline של המקור נבדק בין chunks.
+        """
+        run = getattr(self._source_ctx, 'run', None)
         try:
             urls = [
                 f"https://crt.sh/?q=%25.{self.domain}&output=json",
                 f"https://crt.sh/?q={self.domain}&output=json",
                 f"https://crt.sh/?q=*.{self.domain}&output=json",
             ]
+            fields_to_check = ('name_value', 'common_name', 'subject_name')
+            seen_certs = set()
             
             for url in urls:
                 try:
-                    response = self.session.get(url, timeout=self.timeout, verify=False)
-                    if response.status_code == 200:
-                        try:
-                            data = response.json()
-                            for cert in data:
-                                # חיפוש בכל השדות הרלוונטיים
-                                fields_to_check = ['name_value', 'common_name', 'subject_name']
-                                for field in fields_to_check:
-                                    if field in cert:
-                                        values = cert[field]
-                                        if isinstance(values, str):
-                                            values = [values]
-                                        for value in values:
-                                            # חיפוש כל הסאב-דומיינים
-                                            pattern = r'(?:[\w\.-]+\.)?[\w\.-]+\.' + re.escape(self.domain)
-                                            matches = re.findall(pattern, value, re.IGNORECASE)
-                                            for match in matches:
-                                                self.subdomains.add(match.lower())
-                        except json.JSONDecodeError:
-                            # אם זה לא JSON, נחפש בטקסט
-                            pattern = r'[\w\.-]+\.' + re.escape(self.domain)
-                            matches = re.findall(pattern, response.text, re.IGNORECASE)
-                            for match in matches:
-                                self.subdomains.add(match.lower())
+                    response = self.http_get(url, stream=True)
+                    if response.status_code != 200:
+                        response.close()
+                        continue
+                    from_cache = 'X-Subrecon-Cache' in response.headers
+                    
+                    def chunks():
+                        for chunk in response.iter_content(65536):
+                            if run is not None and (run.abandoned.is_set() or run.expired):
+                                run.timed_out = True
+                                raise SourceTimeout("crt.sh download exceeded the source deadline")
+                            if not from_cache:
+                                self.metrics.count('crt.sh', 'bytes', len(chunk))
+                            yield chunk
+                    
+                    stream = chunks()
+                    try:
+                        for cert in iter_json_array(stream):
+                            if not isinstance(cert, dict):
+                                continue
+                            cert_id = cert.get('id')
+                            if isinstance(cert_id, int):
+                                if cert_id in seen_certs:
+                                    continue
+                                seen_certs.add(cert_id)
+                            # חיפוש בכל השדות הרלוונטיים
+                            for field in fields_to_check:
+                                value = cert.get(field)
+                                if isinstance(value, str):
+                                    for match in self.host_pattern.findall(value):
+                                        self.add_subdomain(match, 'crt.sh', prefetch=True)
+                        # קריאת השארית (רווחים אחרי ה-]) כדי שה-cache ישמור תשובה שלמה
+                        for _chunk in stream:
+                            pass
+                    except JSONStreamError as e:
+                        # אם זה לא JSON, נחפש בטקסט: מה שנקרא ולא פורסר, ואז שארית הזרם
+                        remainder = [e.remainder.encode('utf-8')]
+                        for match in iter_text_matches(itertools.chain(remainder, stream), self.host_pattern):
+                            self.add_subdomain(match, 'crt.sh', prefetch=True)
+                    finally:
+                        response.close()
+                except SourceTimeout:
+                    raise
                 except Exception as e:
                     self.print_status(f"Error accessing crt.sh: {e}", "error")
                     continue
-                
-                time.sleep(0.5)  # הגבלת rate
+        except SourceTimeout:
+            raise
         except Exception as e:
             self.print_status(f"Error in crt.sh: {e}", "error")
     
@@ -272,7 +3410,7 @@ class SubdomainEnumerator:
         """שימוש ב-HackerTarget DNS API (חינמי)"""
         try:
             url = f"https://api.hackertarget.com/hostsearch/?q={self.domain}"
-            response = self.session.get(url, timeout=self.timeout, verify=False)
+            response = self.http_get(url)
             
             if response.status_code == 200:
                 lines = response.text.strip().split('\n')
@@ -280,7 +3418,7 @@ class SubdomainEnumerator:
                     if ',' in line:
                         subdomain = line.split(',')[0].strip()
                         if subdomain and self.domain in subdomain:
-                            self.subdomains.add(subdomain.lower())
+                            self.add_subdomain(subdomain, 'hackertarget')
         except Exception as e:
             self.print_status(f"Error in HackerTarget: {e}", "error")
     
@@ -288,20 +3426,18 @@ class SubdomainEnumerator:
         """חיפוש ב-AnubisDB (מאגר של subdomains)"""
         try:
             url = f"https://jonlu.ca/anubis/subdomains/{self.domain}"
-            response = self.session.get(url, timeout=self.timeout, verify=False)
+            response = self.http_get(url)
             
             if response.status_code == 200:
                 try:
                     data = response.json()
                     for subdomain in data:
                         if isinstance(subdomain, str):
-                            self.subdomains.add(subdomain.lower())
+                            self.add_subdomain(subdomain, 'anubis')
                 except:
                     # נסה לפרש כטקסט
-                    pattern = r'[\w\.-]+\.' + re.escape(self.domain)
-                    matches = re.findall(pattern, response.text, re.IGNORECASE)
-                    for match in matches:
-                        self.subdomains.add(match.lower())
+                    for match in self.extractor.extract(self.domain, response.content):
+                        self.add_subdomain(match, 'anubis')
         except Exception as e:
             self.print_status(f"Error in AnubisDB: {e}", "error")
     
@@ -309,7 +3445,7 @@ class SubdomainEnumerator:
         """חיפוש ב-ThreatCrowd API"""
         try:
             url = f"https://threatcrowd.org/searchApi/v2/domain/report/?domain={self.domain}"
-            response = self.session.get(url, timeout=self.timeout, verify=False)
+            response = self.http_get(url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -317,13 +3453,13 @@ class SubdomainEnumerator:
                 if 'subdomains' in data:
                     for subdomain in data['subdomains']:
                         if isinstance(subdomain, str):
-                            self.subdomains.add(subdomain.lower())
+                            self.add_subdomain(subdomain, 'threatcrowd')
                 
                 # חיפוש ב-resolutions
                 if 'resolutions' in data:
                     for resolution in data['resolutions']:
                         if isinstance(resolution, dict) and 'domain' in resolution:
-                            self.subdomains.add(resolution['domain'].lower())
+                            self.add_subdomain(resolution['domain'], 'threatcrowd')
         except Exception as e:
             self.print_status(f"Error in ThreatCrowd: {e}", "error")
     
@@ -331,28 +3467,12 @@ class SubdomainEnumerator:
         """חיפוש ב-RapidDNS"""
         try:
             url = f"https://rapiddns.io/subdomain/{self.domain}?full=1"
-            response = self.session.get(url, timeout=self.timeout, verify=False)
+            response = self.http_get(url)
             
             if response.status_code == 200:
-                # שימוש ב-BeautifulSoup לפרסון HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # חיפוש בטבלאות
-                tables = soup.find_all('table')
-                for table in tables:
-                    rows = table.find_all('tr')
-                    for row in rows:
-                        cols = row.find_all('td')
-                        if len(cols) >= 1:
-                            subdomain = cols[0].text.strip()
-                            if subdomain and self.domain in subdomain:
-                                self.subdomains.add(subdomain.lower())
-                
-                # חיפוש נוסף באמצעות regex
-                pattern = r'[\w\.-]+\.' + re.escape(self.domain)
-                matches = re.findall(pattern, response.text, re.IGNORECASE)
-                for match in matches:
-                    self.subdomains.add(match.lower())
+                # הדף עם ?full=1 מגיע לכמה מגה - סריקה ישירה של ה-bytes (הטבלה וכל השאר)
+                for subdomain in self.extractor.extract(self.domain, response.content):
+                    self.add_subdomain(subdomain, 'rapiddns')
         except Exception as e:
             self.print_status(f"Error in RapidDNS: {e}", "error")
     
@@ -360,7 +3480,7 @@ class SubdomainEnumerator:
         """חיפוש ב-DNS Buffer Overrun"""
         try:
             url = f"https://dns.bufferover.run/dns?q=.{self.domain}"
-            response = self.session.get(url, timeout=self.timeout, verify=False)
+            response = self.http_get(url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -372,92 +3492,135 @@ class SubdomainEnumerator:
                                 parts = record.split(',')
                                 for part in parts:
                                     if self.domain in part:
-                                        self.subdomains.add(part.strip().lower())
+                                        self.add_subdomain(part.strip(), 'bufferover')
                             else:
                                 if self.domain in record:
-                                    self.subdomains.add(record.strip().lower())
+                                    self.add_subdomain(record.strip(), 'bufferover')
         except Exception as e:
             self.print_status(f"Error in DNS Buffer Overrun: {e}", "error")
     
     def find_subdomains_from_js(self):
-        """חיפוש סאב-דומיינים בקובצי JavaScript"""
-        try:
-            # ראשית, נשיג את הדף הראשי
-            main_url = f"http://{self.domain}"
+        """crawl של דפי האתר וקובצי ה-JS/JSON/source maps שלהם לאיתור סאב-דומיינים"""
+        run = getattr(self._source_ctx, 'run', None)
+        source = run.label if run is not None else None
+        
+        def fetch(url, max_bytes):
+            # הריצה של המקור (deadline, metrics, זניחה) היא thread-local - מעבירים אותה ל-worker
+            self._source_ctx.run = run
             try:
-                response = self.session.get(main_url, timeout=self.timeout, verify=False)
-                if response.status_code == 200:
-                    # חיפוב קישורים ל-JS files
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    js_links = []
-                    
-                    # קישורי script
-                    for script in soup.find_all('script'):
-                        src = script.get('src')
-                        if src:
-                            full_url = urljoin(main_url, src)
-                            js_links.append(full_url)
-                    
-                    # סריקת קובצי JS (מוגבל ל-3 קבצים למהירות)
-                    for js_url in js_links[:3]:
-                        try:
-                            js_response = self.session.get(js_url, timeout=10, verify=False)
-                            if js_response.status_code == 200:
-                                # חיפוש דומיינים בטקסט
-                                pattern = r'(?:https?://)?([\w\.-]+\.' + re.escape(self.domain) + ')'
-                                matches = re.findall(pattern, js_response.text)
-                                for match in matches:
-                                    self.subdomains.add(match.lower())
-                        except:
-                            continue
-            except:
-                pass
-        except Exception as e:
-            self.print_status(f"Error in JS analysis: {e}", "error")
+                response = self.http_get(url, max_retries=1, timeout=10, stream=True)
+            except SourceTimeout:
+                raise
+            except Exception:
+                return None
+            with response:
+                if response.status_code != 200:
+                    return response.status_code, None, None
+                body = bytearray()
+                for chunk in response.iter_content(65536):
+                    body.extend(chunk)
+                    if len(body) >= max_bytes:
+                        del body[max_bytes:]
+                        break
+            if source is not None:
+                self.metrics.count(source, 'bytes', len(body))
+            return response.status_code, response.headers.get('Content-Type', ''), bytes(body)
+        
+        crawler = SiteCrawler(self.domain, fetch, lambda host: self.add_subdomain(host, 'js', prefetch=True),
+                              max_depth=self.crawl_depth, max_pages=self.crawl_pages,
+                              workers=HostConcurrency.MAXIMUM,
+                              extract=functools.partial(self.extractor.extract, self.domain))
+        crawler.crawl([f"https://{self.domain}/", f"http://{self.domain}/", f"https://www.{self.domain}/"])
+        self.print_status(f"Crawled {crawler.pages} URLs, {len(crawler.seen_hosts)} hosts referenced", "info")
     
     # ==================== שיטות אקטיביות מתקדמות ====================
     
+    def iter_wordlist(self, custom_wordlist=None):
+        """זרם מילים ל-brute force: ה-wordlist המובנה ואחריו קובץ מותאם
+
+        המילים נקראות בעצלות ועוברות dedup דרך Bloom filter, כך שהזיכרון
+        נשאר קבוע בלי קשר לגודל הרשימה.
+        """
+        capacity = len(self.common_subdomains)
+        if custom_wordlist:
+            # הערכה גסה: ~8 בתים לשורה
+            capacity += os.path.getsize(custom_wordlist) // 8
+        seen = BloomFilter(capacity)
+        
+        for word in self.common_subdomains:
+            if seen.add(word):
+                yield word
+        if custom_wordlist:
+            for word in iter_wordlist_file(custom_wordlist):
+                if seen.add(word):
+                    yield word
+    
+    def open_compiled_wordlist(self, path):
+        """wordlist מקומפל דרך mmap, מוגבל ל-shard אם נבחר
+
+        רשימה שנבנתה בלי ה-wordlist המובנה (--no-builtin) מקבלת אותו לפניה;
+        עם shard הוא נוסף ל-shard 1 בלבד ומסונן מכל ה-shards, כך שכל מילה
+        נבדקת ע"י shard אחד בדיוק.
+        """
+        compiled = CompiledWordlist(path)
+        words = compiled
+        if self.wordlist_shard is not None:
+            k, n = self.wordlist_shard
+            start, stop = compiled.split(n)[k - 1]
+            self.print_status(f"Compiled wordlist {path}: shard {k}/{n}, words {start}-{stop} "
+                              f"of {len(compiled)}", "success")
+            words = compiled.slice(start, stop)
+        else:
+            self.print_status(f"Compiled wordlist {path}: {len(compiled)} words", "success")
+        if compiled.includes_builtin:
+            return words
+        builtin = frozenset(self.common_subdomains)
+        rest = (word for word in words if word not in builtin)
+        if self.wordlist_shard is not None and self.wordlist_shard[0] != 1:
+            return rest
+        return itertools.chain(self.common_subdomains, rest)
+    
     def dns_bruteforce_advanced(self, wordlist=None):
-        """Brute Force מתקדם עם הגיוון"""
+        """Brute Force מתקדם עם הגיוון
+
+        wordlist יכול להיות רשימה או כל iterable (למשל iter_wordlist());
+        המועמדים נמשכים ממנו לפי הצורך ורק חלון חסום של שאילתות נמצא באוויר.
+        """
         if wordlist is None:
             wordlist = self.common_subdomains
         
-        self.print_status(f"Starting DNS brute force with {len(wordlist)} words", "info")
+        total = len(wordlist) if hasattr(wordlist, '__len__') else None
+        if total is not None:
+            self.print_status(f"Starting DNS brute force with {total} words", "info")
+        else:
+            self.print_status("Starting DNS brute force (streaming wordlist)", "info")
         
-        # הגבלה למהירות ב-fast mode
-        if len(wordlist) > 500:
-            wordlist = wordlist[:500]
+        # המשך מה-checkpoint האחרון
+        start = self.journal.bruteforce_offset if self.journal is not None else 0
+        if start:
+            self.print_status(f"Resuming brute force at word #{start}", "info")
+            if total is not None:
+                total = max(total - start, 0)
+        progress = StreamProgress(start)
         
-        total_found = 0
+        def on_result(result):
+            progress.complete(result.name)
+            if self.journal is not None:
+                self.journal.record_bruteforce(progress.watermark)
         
-        def check_subdomain(subdomain):
-            result, ns = self.dns_resolve(subdomain)
-            if result:
-                return subdomain, ns
-            return None, None
-        
-        with ThreadPoolExecutor(max_workers=self.threads) as executor:
-            futures = []
-            for word in wordlist:
-                subdomain = f"{word}.{self.domain}"
-                futures.append(executor.submit(check_subdomain, subdomain))
-            
-            if TQDM_AVAILABLE:
-                for future in tqdm(as_completed(futures), total=len(futures), desc="Brute forcing"):
-                    subdomain, ns = future.result()
-                    if subdomain:
-                        self.subdomains.add(subdomain.lower())
-                        total_found += 1
-            else:
-                for i, future in enumerate(as_completed(futures)):
-                    subdomain, ns = future.result()
-                    if subdomain:
-                        self.subdomains.add(subdomain.lower())
-                        total_found += 1
-                    if i % 50 == 0:
-                        self.print_status(f"Checked {i}/{len(futures)} words, found {total_found} subdomains", "info")
+        if isinstance(wordlist, CompiledWordlist):
+            words = wordlist.iter_range(start)  # דרך האינדקס, בלי לקרוא את מה שכבר נסרק
+        else:
+            words = itertools.islice(wordlist, start, None)
+        candidates = progress.track(f"{word}.{self.domain}".lower() for word in words)
+        found = self.resolve_names(candidates, on_result=on_result, desc="Brute forcing",
+                                   total=total, filter_wildcards=True,
+                                   on_found=lambda name: self.add_subdomain(name, 'bruteforce'))
+        if self.journal is not None:
+            self.journal.record_bruteforce(progress.watermark, force=True)
         
-        self.print_status(f"Brute force found {total_found} new subdomains", "success")
+        self.report_wildcards()
+        self.print_status(f"Brute force found {len(found)} new subdomains", "success")
     
     def dns_axfr_advanced(self):
         """ניסיון DNS Zone Transfer עם מספר שרתים"""
@@ -469,8 +3632,7 @@ class SubdomainEnumerator:
         
         try:
             # קבלת name servers של הדומיין
-            resolver = dns.resolver.Resolver()
-            resolver.nameservers = self.nameservers
+            resolver = dnspython_resolver(self.nameservers)
             
             # נסה מספר סוגי רשומות
             record_types = ['NS', 'SOA']
@@ -479,17 +3641,18 @@ class SubdomainEnumerator:
                 try:
                     answers = resolver.resolve(self.domain, record_type)
                     for answer in answers:
-                        ns_server = str(answer).rstrip('.')
+                        ns_server = str(answer.mname if record_type == 'SOA' else answer.target).rstrip('.')
                         self.print_status(f"Found {record_type}: {ns_server}", "info")
                         
-                        # נסה AXFR
+                        # נסה AXFR - dns.query.xfr צריך כתובת IP, לא שם
                         try:
-                            zone = dns.zone.from_xfr(dns.query.xfr(ns_server, self.domain))
+                            ns_address = str(resolver.resolve(ns_server, 'A')[0])
+                            zone = dns.zone.from_xfr(dns.query.xfr(ns_address, self.domain, lifetime=self.timeout))
                             if zone:
                                 self.print_status(f"AXFR successful on {ns_server}!", "success")
                                 for name in zone.nodes.keys():
                                     subdomain = f"{name}.{self.domain}"
-                                    self.subdomains.add(subdomain.lower())
+                                    self.add_subdomain(subdomain, 'axfr')
                                 break
                         except:
                             continue
@@ -516,16 +3679,14 @@ class SubdomainEnumerator:
             for engine_base, limit in search_engines:
                 try:
                     url = f"{engine_base}{dork}"
-                    response = self.session.get(url, timeout=self.timeout, verify=False)
+                    response = self.http_get(url)
                     
                     if response.status_code == 200:
-                        # חיפוש בדומיינים בתוצאות
-                        pattern = r'(?:https?://)?([\w\.-]+\.' + re.escape(self.domain) + ')'
-                        matches = re.findall(pattern, response.text)
+                        # חיפוש בדומיינים בתוצאות (ה-scanner מחזיר רק סאב-דומיינים אמיתיים)
+                        matches = self.extractor.extract(self.domain, response.content)
                         
                         for match in matches:
-                            if match.count('.') >= 2:  # רק סאב-דומיינים אמיתיים
-                                self.subdomains.add(match.lower())
+                            self.add_subdomain(match, 'search_engines')
                         
                         # הגבלת התוצאות
                         if len(matches) > limit:
@@ -533,163 +3694,395 @@ class SubdomainEnumerator:
                 except Exception as e:
                     self.print_status(f"Search engine error: {e}", "error")
                     continue
-                
-                time.sleep(1)  # הגבלת rate
     
     # ==================== שיטות וולידציה ====================
     
     def validate_all_subdomains(self):
-        """וולידציה של כל הסאב-דומיינים"""
+        """וולידציה של כל הסאב-דומיינים
+
+        במצב אינקרמנטלי (--since) נבדקים רק שמות חדשים ושמות מוכרים שהגיע
+        זמנם; השאר נלקחים מהסריקה הקודמת כמו שהם.
+        """
         self.print_status(f"Validating {len(self.subdomains)} subdomains", "info")
         
-        valid_subs = set()
+        valid_subs = SubdomainStore()
+        if self.journal is not None:
+            # שמות שכבר אומתו לפני הקריסה לא נבדקים שוב
+            for name in self.journal.validated:
+                meta = self.subdomains.meta(name)
+                if meta is not None:
+                    valid_subs.add(name, meta['source'])
         
-        def validate_sub(subdomain):
-            try:
-                socket.gethostbyname(subdomain)
-                return subdomain
-            except socket.gaierror:
-                return None
-            except:
-                return None
+        now = time.time()
+        carried = 0
+        if self.state is not None:
+            for name, entry in self.state.entries.items():
+                if name not in valid_subs and not self.state.due(name, now):
+                    valid_subs.add(name, entry.get('source'), records=entry['records'])
+                    carried += 1
+        subdomains_list = [sub for sub in self.subdomains if sub not in valid_subs]
+        if carried:
+            self.print_status(f"{carried} known names are not due for revalidation, "
+                              f"checking {len(subdomains_list)}", "info")
         
-        subdomains_list = list(self.subdomains)
-        
-        if TQDM_AVAILABLE:
-            with ThreadPoolExecutor(max_workers=self.threads) as executor:
-                results = list(tqdm(
-                    executor.map(validate_sub, subdomains_list),
-                    total=len(subdomains_list),
-                    desc="Validating"
-                ))
-                for result in results:
-                    if result:
-                        valid_subs.add(result)
-        else:
-            self.print_status(f"Processing {len(subdomains_list)} subdomains...", "info")
-            with ThreadPoolExecutor(max_workers=self.threads) as executor:
-                futures = {executor.submit(validate_sub, sub): sub for sub in subdomains_list}
-                
-                for i, future in enumerate(as_completed(futures)):
-                    result = future.result()
-                    if result:
-                        valid_subs.add(result)
-                    
-                    if i % 50 == 0:
-                        self.print_status(f"Validated {i}/{len(subdomains_list)}", "info")
+        checked = {}
+        
+        def on_result(result):
+            if self.state is not None:
+                checked[result.name] = result
+            if not result.found:
+                if self.events is not None and result.rcode in ('NXDOMAIN', 'NOERROR'):
+                    self.events.emit('rejected', self.domain, name=result.name, reason=result.rcode.lower())
+                return
+            meta = self.subdomains.meta(result.name)
+            valid_subs.add(result.name, meta['source'] if meta else None,
+                           records=[(r[1], r[3]) for r in result.records])
+            if self.journal is not None:
+                self.journal.record_validated(result.name)
+        
+        # A + AAAA + שרשרת CNAME לכל שם, בשאילתה אחת לכל סוג
+        self.resolve_names(subdomains_list, on_result=on_result, rtype='ADDR',
+                           desc="Validating", total=len(subdomains_list))
+        
+        if self.state is not None:
+            self._update_state(valid_subs, checked, now)
         
         self.validated_subs = valid_subs
         self.print_status(f"Validation complete: {len(valid_subs)} valid subdomains", "success")
     
+    def _update_state(self, valid_subs, checked, now):
+        """חישוב ה-diff מול הסריקה הקודמת ובניית המצב החדש"""
+        previous = self.state.entries
+        entries = {}
+        diff = {'added': [], 'removed': [], 'changed': []}
+        
+        for name, meta in valid_subs.items():
+            old = previous.get(name)
+            result = checked.get(name)
+            records = list(meta['records'] or (old['records'] if old else []))
+            if result is None:
+                # לא נבדק עכשיו (לא הגיע זמנו / אומת לפני resume) - נשאר כמו שהיה
+                if old is not None:
+                    entries[name] = old
+                    continue
+                entries[name] = {'records': records, 'ttl': 0, 'first_seen': now,
+                                 'last_seen': now, 'last_checked': now, 'source': meta['source']}
+            else:
+                ttl = min((r[2] for r in result.records), default=0)
+                entries[name] = {'records': records, 'ttl': ttl,
+                                 'first_seen': old['first_seen'] if old else now,
+                                 'last_seen': now, 'last_checked': now,
+                                 'source': old['source'] if old else meta['source']}
+            if old is None:
+                diff['added'].append({'name': name, 'records': records})
+            elif set(old['records']) != set(records):
+                diff['changed'].append({'name': name, 'old': old['records'], 'new': records})
+        
+        for name, old in previous.items():
+            if name in entries:
+                continue
+            result = checked.get(name)
+            if result is not None and result.rcode in ('NXDOMAIN', 'NOERROR'):
+                diff['removed'].append({'name': name, 'records': old['records']})
+            else:
+                # כשל זמני (timeout / SERVFAIL) אינו הוכחה שהשם נעלם
+                entries[name] = old
+                valid_subs.add(name, old.get('source'), records=old['records'])
+        
+        self.state.save(entries)
+        self.diff = diff
+        self.print_status(f"Changes since last scan: {len(diff['added'])} added, "
+                          f"{len(diff['removed'])} removed, {len(diff['changed'])} changed", "success")
+    
     # ==================== הרצה ראשית ====================
     
+    # שם המקור (כפי שמופיע במדדים, ביומן ובפלט) -> המתודה שמממשת אותו
+    PASSIVE_SOURCES = [
+        ('crt.sh', 'crt_sh_advanced'),
+        ('hackertarget', 'hackertarget_dns'),
+        ('anubis', 'anubis_db'),
+        ('threatcrowd', 'threatcrowd'),
+        ('rapiddns', 'rapiddns'),
+        ('bufferover', 'dnsbufferoverrun'),
+        ('search_engines', 'search_engines_dorking'),
+        ('js', 'find_subdomains_from_js'),
+    ]
+    
     def run_passive_enumeration(self):
         """הרצת כל השיטות הפסיביות"""
         self.print_status("Starting passive enumeration", "info")
         
-        passive_methods = [
-            self.crt_sh_advanced,
-            self.hackertarget_dns,
-            self.anubis_db,
-            self.threatcrowd,
-            self.rapiddns,
-            self.dnsbufferoverrun,
-            self.search_engines_dorking,
-            self.find_subdomains_from_js,
-        ]
+        passive_sources = [(label, getattr(self, method)) for label, method in self.PASSIVE_SOURCES]
         
-        # הרצה עם תזמון
-        for method in passive_methods:
+        # כל המקורות רצים במקביל; הקצב נשלט ע"י ה-rate limiter לכל host
+        def run_source(run, method):
+            label = run.label
+            run.start()
+            self._source_ctx.run = run
+            self.metrics.source(label)
+            started = time.monotonic()
+            status = 'failed'
             try:
-                method_name = method.__name__
-                self.print_status(f"Running {method_name}", "info")
                 method()
-                # השהייה בין בקשות
-                time.sleep(1)
+                # המקורות בולעים חריגות בעצמם - חריגה מה-deadline נבדקת כאן
+                if run.expired:
+                    raise SourceTimeout(f"{label} exceeded its deadline")
+                status = 'ok'
+            except SourceTimeout:
+                status = 'timeout'
+                raise
+            finally:
+                self._source_ctx.run = None
+                # מקור שנזנח כבר נרשם כ-timeout ע"י ה-thread הראשי
+                if run.finish():
+                    self.metrics.finish_source(label, time.monotonic() - started, status)
+                    if status == 'failed':
+                        self.metrics.count(label, 'errors')
+            return time.monotonic() - started
+        
+        if self.journal is not None:
+            skipped = [label for label, _m in passive_sources if label in self.journal.sources_done]
+            if skipped:
+                self.print_status(f"Skipping sources finished before resume: {', '.join(skipped)}", "info")
+            passive_sources = [(label, m) for label, m in passive_sources if label not in skipped]
+        if not passive_sources:
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=len(passive_sources), thread_name_prefix='passive')
+        futures = {}
+        runs = {}
+        for label, method in passive_sources:
+            self.print_status(f"Running {method.__name__}", "info")
+            runs[label] = SourceRun(label, self.source_timeout)
+            futures[executor.submit(run_source, runs[label], method)] = label
+        
+        # מקור שלא סיים עד ה-deadline (כולל מרווח קטן) נזנח; ביטול הסריקה עוצר את ההמתנה
+        deadline = time.monotonic() + self.source_timeout + 5
+        not_done = set(futures)
+        while not_done and not self.cancelled:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _finished, not_done = wait(not_done, timeout=min(remaining, 0.5), return_when=FIRST_COMPLETED)
+        # threads שלא סיימו ממשיכים ברקע, אבל לא נוגעים יותר בתוצאות; מקור
+        # שהספיק לסיים בין ה-wait לנטישה נחשב כמו כל מקור שסיים
+        with self._results_lock:
+            not_done = {future for future in not_done if runs[futures[future]].abandon()}
+        done = set(futures) - not_done
+        if self.cancelled:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._check_cancelled()
+        for future in done:
+            name = futures[future]
+            try:
+                elapsed = future.result()
+                self.print_status(f"{name} finished in {elapsed:.1f}s", "info")
+                if self.journal is not None:
+                    self.journal.source_done(name)
+            except SourceTimeout:
+                self.print_status(f"{name} timed out after {self.source_timeout}s", "warning")
             except Exception as e:
-                self.print_status(f"Method {method.__name__} failed: {e}", "error")
-                continue
+                self.print_status(f"Method {name} failed: {e}", "error")
+        for future in not_done:
+            name = futures[future]
+            self.metrics.finish_source(name, self.source_timeout, 'timeout')
+            self.print_status(f"{name} timed out after {self.source_timeout}s", "warning")
+        executor.shutdown(wait=False, cancel_futures=True)
         
         self.print_status(f"Passive enumeration found {len(self.subdomains)} unique subdomains", "success")
     
+    def run_active_source(self, label, method, *args):
+        """הרצת מקור אקטיבי עם מדידה במדדי המקורות (זמן וסטטוס), כמו run_source לפסיביים"""
+        self.metrics.source(label)
+        started = time.monotonic()
+        status = 'failed'
+        try:
+            result = method(*args)
+            status = 'ok'
+            return result
+        except ScanCancelled:
+            status = 'cancelled'
+            raise
+        finally:
+            self.metrics.finish_source(label, time.monotonic() - started, status)
+            if status == 'failed':
+                self.metrics.count(label, 'errors')
+    
     def run_active_enumeration(self, custom_wordlist=None):
         """הרצת כל השיטות האקטיביות"""
         self.print_status("Starting active enumeration", "info")
         
-        # טעינת wordlist
+        # wordlist בזרימה - הקובץ נקרא תוך כדי ה-brute force
         wordlist = self.common_subdomains
-        if custom_wordlist and os.path.exists(custom_wordlist):
-            try:
-                with open(custom_wordlist, 'r') as f:
-                    custom_words = [line.strip() for line in f if line.strip()]
-                wordlist.extend(custom_words)
-                wordlist = list(set(wordlist))  # הסרת כפילויות
-                self.print_status(f"Loaded {len(custom_words)} words from custom wordlist", "success")
-            except Exception as e:
-                self.print_status(f"Could not read wordlist: {e}", "error")
+        compiled = bool(custom_wordlist) and CompiledWordlist.is_compiled(custom_wordlist)
+        if self.wordlist_shard is not None and not compiled:
+            raise ValueError("wordlist_shard needs a compiled wordlist (see compile-wordlist)")
+        if compiled:
+            wordlist = self.open_compiled_wordlist(custom_wordlist)
+        elif custom_wordlist and os.path.exists(custom_wordlist):
+            wordlist = self.iter_wordlist(custom_wordlist)
+            self.print_status(f"Streaming custom wordlist from {custom_wordlist}", "success")
+        elif custom_wordlist:
+            self.print_status(f"Could not read wordlist: {custom_wordlist} not found", "error")
         
         # הרצת השיטות האקטיביות
-        self.dns_axfr_advanced()
-        time.sleep(1)
+        if not self._stage_done('axfr'):
+            self.run_active_source('axfr', self.dns_axfr_advanced)
+            self._mark_stage('axfr')
+        
+        if not self._stage_done('bruteforce'):
+            try:
+                self.run_active_source('bruteforce', self.dns_bruteforce_advanced, wordlist)
+                self._mark_stage('bruteforce')
+            except OSError as e:
+                self.print_status(f"Could not read wordlist: {e}", "error")
         
-        self.dns_bruteforce_advanced(wordlist)
+        if self.recursive and not self._stage_done('recursive'):
+            self.run_active_source('recursive', self.recursive_enumeration)
+            self._mark_stage('recursive')
         
         self.print_status(f"Active enumeration completed. Total: {len(self.subdomains)} subdomains", "success")
     
+    def recursive_enumeration(self):
+        """brute force רקורסיבי מתחת לשמות שנמצאו (eu.prod.example.com וכו')
+
+        כל שם שנמצא נכנס לתור של ExpansionScheduler (עם עדיפות לשמות שכבר יש
+        להם ילדים או שה-label שלהם מרמז על zone), וכל שם חדש נכנס לתור ברמה
+        הבאה. הרשימה לרמות העמוקות: ה-labels השכיחים בתוצאות, labels של zones
+        ואחריהם ה-wordlist המובנה.
+        """
+        self.print_status(f"Starting recursive enumeration (depth {self.recursive_depth}, "
+                          f"budget {self.query_budget} queries)", "info")
+        
+        first_labels = Counter(name.split('.', 1)[0] for name in self.subdomains
+                               if name.endswith(f".{self.domain}"))
+        words = [label for label, count in first_labels.most_common() if count > 1]
+        # labels של zones (אזורים, סביבות) מוקדם ברשימה - הם אלה שפותחים רמה נוספת
+        words.extend(sorted(LIKELY_PARENT_TOKENS - set(words)))
+        seen_words = set(words)
+        words.extend(w for w in self.common_subdomains if w not in seen_words)
+        scheduler = ExpansionScheduler(words, self.query_budget, self.recursive_depth)
+        
+        def enqueue(name):
+            if not name.endswith(f".{self.domain}"):
+                return
+            depth = name[:-len(self.domain) - 1].count('.') + 1
+            label = name.split('.', 1)[0]
+            prior = 1.0
+            if any(True for _ in itertools.islice(self.subdomains.under(name, include_self=False), 1)):
+                prior *= 3.0
+            if any(token in LIKELY_PARENT_TOKENS for token in tokenize_label(label)):
+                prior *= 2.0
+            scheduler.add(name, depth, prior)
+        
+        wildcard_zones = set(self.wildcards.wildcard_zones())
+        for name in list(self.subdomains):
+            if name not in wildcard_zones:
+                enqueue(name)
+        
+        total_found = 0
+        # פס אחד לכל השלב, לפי תקציב השאילתות (לא פס לכל batch של 256 מילים)
+        progress = tqdm(total=self.query_budget, desc="Recursive", unit="q") \
+            if TQDM_AVAILABLE and not self.quiet else None
+        try:
+            while True:
+                batch = scheduler.next_batch()
+                if batch is None:
+                    break
+                parent, depth, chunk = batch
+                if parent in wildcard_zones:
+                    continue
+                candidates = [f"{word}.{parent}" for word in chunk]
+                new_names = []
+                
+                def on_found(name):
+                    if self.add_subdomain(name, 'recursive'):
+                        new_names.append(name)
+                
+                if progress is not None:
+                    progress.set_postfix_str(parent, refresh=False)
+                found = self.resolve_names(candidates, desc=f"Recursive {parent}", total=len(candidates),
+                                           filter_wildcards=True, on_found=on_found, progress=progress)
+                scheduler.record(parent, len(candidates), len(found))
+                total_found += len(new_names)
+                wildcard_zones.update(self.wildcards.wildcard_zones())
+                for name in new_names:
+                    self.print_status(f"Found (recursive): {name}", "success")
+                    enqueue(name)
+        finally:
+            if progress is not None:
+                progress.total = progress.n  # התקציב לא תמיד מנוצל עד הסוף
+                progress.close()
+        
+        self.report_wildcards()
+        levels = ', '.join(f"L{d}: {scheduler.level_hits[d]}/{scheduler.level_queries[d]}"
+                           for d in sorted(scheduler.level_queries))
+        self.print_status(f"Recursive enumeration found {total_found} new subdomains "
+                          f"with {scheduler.spent} queries ({levels})", "success")
+    
     def find_hidden_subdomains(self):
-        """חיפוש סאב-דומיינים מוסתרים"""
+        """חיפוש סאב-דומיינים מוסתרים ע"י פרמוטציות של שמות שכבר נמצאו
+
+        כל סבב מריץ את מנוע הפרמוטציות על השמות שנמצאו בסבב הקודם (בסבב
+        הראשון - על כל התוצאות), עד שאין ממצאים חדשים, עד מספר הסבבים או עד
+        שתקציב השאילתות נגמר.
+        """
         self.print_status("Looking for hidden subdomains", "info")
         
-        # יצירת וריאציות נוספות מהסאב-דומיינים שכבר נמצאו
-        base_subs = []
-        for sub in list(self.subdomains):
-            if f".{self.domain}" in sub:
-                base = sub.replace(f".{self.domain}", "")
-                if base and len(base) < 50:  # הגבלה לאורך סביר
-                    base_subs.append(base)
-        
-        # וריאציות עם תווים מיוחדים
-        variations = []
-        prefixes = ['dev-', 'test-', 'staging-', 'prod-', 'uat-', 'qa-']
-        suffixes = ['-dev', '-test', '-stage', '-prod', '-staging']
-        
-        for base in base_subs[:20]:  # מגבילים ל-20 בסיסים
-            for prefix in prefixes:
-                variations.append(f"{prefix}{base}")
-            for suffix in suffixes:
-                variations.append(f"{base}{suffix}")
-        
-        # בדיקת הווריאציות
-        for variation in variations:
-            subdomain = f"{variation}.{self.domain}"
-            if subdomain not in self.subdomains:
-                try:
-                    socket.gethostbyname(subdomain)
-                    self.subdomains.add(subdomain.lower())
-                    self.print_status(f"Found hidden: {subdomain}", "success")
-                except:
-                    pass
+        engine = PermutationEngine(self.domain)
+        engine.learn(self.subdomains)
+        bases = list(self.subdomains)
+        spent = 0
+        rounds = 0
+        
+        def on_found(subdomain):
+            if self.add_subdomain(subdomain, 'hidden'):
+                self.print_status(f"Found hidden: {subdomain}", "success")
+        
+        def counted(candidates):
+            nonlocal spent
+            for candidate in candidates:
+                spent += 1
+                yield candidate
+        
+        while bases and spent < self.permutation_budget and rounds < self.permutation_rounds:
+            rounds += 1
+            # שמות מתחת ל-zone עם wildcard יחזירו תשובה לכל פרמוטציה - לא שווה לשאול
+            wildcard_zones = self.wildcards.wildcard_zones()
+            bases = [b for b in bases if not any(b.endswith(f".{zone}") for zone in wildcard_zones)]
+            candidates = engine.candidates(bases, is_known=self.subdomains.__contains__)
+            limited = itertools.islice(candidates, self.permutation_budget - spent)
+            found = self.resolve_names(counted(limited), desc=f"Permutations #{rounds}",
+                                       filter_wildcards=True, on_found=on_found)
+            engine.learn(found)
+            bases = found
         
-        self.print_status(f"Hidden subdomain search completed", "success")
+        self.report_wildcards()
+        
+        self.print_status(f"Hidden subdomain search completed ({rounds} rounds, {spent} candidates)", "success")
     
     def save_results(self):
         """שמירת התוצאות"""
         if not self.validated_subs:
             self.validate_all_subdomains()
         
-        # סינון ומיון
-        final_subs = sorted(self.validated_subs)
+        # ה-store כבר ממוין בסדר DNS קנוני - אין צורך בעותק ממוין
+        final_subs = self.validated_subs
         
-        # הצגה
-        print(f"\n{'='*60}")
-        print(f"FINAL RESULTS: {len(final_subs)} validated subdomains")
-        print('='*60)
+        # הצגה (לא במצב NDJSON - שם הצרכנים קוראים את זרם האירועים)
+        if not self.quiet and self.events is None:
+            print(f"\n{'='*60}")
+            print(f"FINAL RESULTS: {len(final_subs)} validated subdomains")
+            print('='*60)
+            
+            for i, sub in enumerate(final_subs, 1):
+                if COLORS:
+                    print(f"{Fore.GREEN}{i:4}. {sub}")
+                else:
+                    print(f"{i:4}. {sub}")
         
-        for i, sub in enumerate(final_subs, 1):
-            if COLORS:
-                print(f"{Fore.GREEN}{i:4}. {sub}")
-            else:
-                print(f"{i:4}. {sub}")
+        if not self.write_files:
+            return
         
         # שמירה לקובץ
         if self.output_file:
@@ -704,7 +4097,7 @@ class SubdomainEnumerator:
                     all_subs_file = self.output_file + '_all.txt'
                     
                 with open(all_subs_file, 'w') as f:
-                    for sub in sorted(self.subdomains):
+                    for sub in self.subdomains:
                         f.write(sub + '\n')
                 
                 self.print_status(f"Results saved to {self.output_file}", "success")
@@ -719,6 +4112,72 @@ class SubdomainEnumerator:
                     f.write(sub + '\n')
             self.print_status(f"Results saved to {default_file}", "success")
     
+    def _stage_done(self, name):
+        return self.journal is not None and name in self.journal.stages_done
+    
+    def _timed_stage(self, name, func, *args):
+        """הרצת שלב עם מדידת זמן, שאילתות DNS (של המטרה הזו) ושמות חדשים"""
+        dns_before = self.dns_account.snapshot()
+        names_before = len(self.subdomains)
+        started = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            queries, cache_hits, latency, answered = (
+                now - before for now, before in zip(self.dns_account.snapshot(), dns_before))
+            self.metrics.record_stage(name, time.monotonic() - started, queries,
+                                      len(self.subdomains) - names_before, cache_hits,
+                                      latency / answered if answered else None)
+            if self.events is not None:
+                self.events.flush()
+    
+    def _mark_stage(self, name):
+        if self.journal is not None:
+            self.journal.stage_done(name)
+    
+    def resume_from_journal(self):
+        """טעינת שמות שכבר התגלו מהיומן אל הסריקה הנוכחית"""
+        if self.journal is None:
+            return
+        with self._results_lock:
+            for name, source in self.journal.discovered.items():
+                self.subdomains.add(name, source)
+        self.print_status(
+            f"Resuming scan: {len(self.journal.discovered)} names, "
+            f"{len(self.journal.sources_done)} sources and {len(self.journal.stages_done)} stages already done",
+            "success")
+    
+    def load_state(self, state):
+        """סריקה אינקרמנטלית: השמות מהסריקה הקודמת נכנסים כשמות מוכרים"""
+        self.state = state
+        with self._results_lock:
+            for name, entry in state.entries.items():
+                self.subdomains.add(name, entry.get('source'))
+        self.print_status(f"Incremental scan: {len(state.entries)} names known from {state.path}", "success")
+    
+    def save_diff(self):
+        """הצגה ושמירה של השינויים מול הסריקה הקודמת"""
+        if self.diff is None:
+            return
+        if not self.quiet:
+            for entry in self.diff['added']:
+                print(f"+ {entry['name']}")
+            for entry in self.diff['removed']:
+                print(f"- {entry['name']}")
+            for entry in self.diff['changed']:
+                print(f"~ {entry['name']}")
+        if not self.write_files:
+            return
+        
+        base = self.output_file or f"subdomains_{self.domain}.txt"
+        diff_file = base[:-4] + '_diff.json' if base.endswith('.txt') else base + '_diff.json'
+        try:
+            with open(diff_file, 'w') as f:
+                json.dump(dict(self.diff, domain=self.domain, generated=time.time()), f, indent=2)
+            self.print_status(f"Diff saved to {diff_file}", "info")
+        except OSError as e:
+            self.print_status(f"Error saving diff: {e}", "error")
+    
     def run(self, passive=True, active=True, validate=True, wordlist=None):
         """הרצת כל התהליך"""
         if COLORS:
@@ -742,33 +4201,74 @@ Threads: {self.threads}
 ══════════════════════════════════════════════════════════
             """
         
-        print(banner)
+        if not self.quiet:
+            print(banner)
         
         start_time = time.time()
+        self.context.target_started()
+        try:
+            self._run_stages(passive, active, validate, wordlist)
+        finally:
+            self.context.target_finished()
         
+        end_time = time.time()
+        elapsed = end_time - start_time
+        if self.events is not None:
+            self.events.emit('completed', self.domain, found=len(self.subdomains),
+                             validated=len(self.validated_subs), elapsed=round(elapsed, 3))
+            self.events.flush()
+        if not self.quiet:
+            self._print_summary(elapsed)
+    
+    def _run_stages(self, passive, active, validate, wordlist):
+        """הרצת שלבי הסריקה לפי הסדר"""
         # שלב 1: איסוף פסיבי
-        if passive:
-            self.run_passive_enumeration()
+        self._check_cancelled()
+        if passive and not self._stage_done('passive'):
+            self._timed_stage('passive', self.run_passive_enumeration)
+            self._mark_stage('passive')
         
         # שלב 2: איסוף אקטיבי
+        self._check_cancelled()
         if active:
-            self.run_active_enumeration(wordlist)
+            self._timed_stage('active', self.run_active_enumeration, wordlist)
         
         # שלב 3: חיפוש סאב-דומיינים מוסתרים
-        self.find_hidden_subdomains()
+        self._check_cancelled()
+        if not self._stage_done('hidden'):
+            self._timed_stage('hidden', self.run_active_source, 'hidden', self.find_hidden_subdomains)
+            self._mark_stage('hidden')
         
         # שלב 4: וולידציה
+        self._check_cancelled()
         if validate:
-            self.validate_all_subdomains()
+            self._timed_stage('validate', self.validate_all_subdomains)
+            self._mark_stage('validate')
         else:
             self.validated_subs = self.subdomains
         
         # שלב 5: תוצאות
         self.save_results()
-        
-        end_time = time.time()
-        elapsed = end_time - start_time
-        
+        self.save_diff()
+        self._mark_stage('complete')
+    
+    def print_source_stats(self):
+        """טבלת ביצועים לכל מקור - כדי לדעת אילו מקורות שווה להשאיר"""
+        sources = self.metrics.to_dict()['sources']
+        if not sources:
+            return
+        print(f"\n{'Source':<16}{'Time':>8}{'KB':>10}{'Names':>8}{'New':>8}{'Errors':>8}  Status")
+        for name, s in sources.items():
+            print(f"{name:<16}{s['wall_s']:>7.1f}s{s['bytes'] / 1024:>10.0f}{s['names']:>8}"
+                  f"{s['new_names']:>8}{s['errors']:>8}  {s['status']}")
+        for row in self.dns_engine.pool.summary():
+            if row['queries']:
+                print(f"Resolver {row['server']:<18} {row['queries']:>8} queries, "
+                      f"{row['errors']} errors, {row['latency_ms']}ms avg, concurrency {row['limit']}")
+    
+    def _print_summary(self, elapsed):
+        """סיכום בסוף הסריקה"""
+        self.print_source_stats()
         if COLORS:
             print(f"\n{Fore.CYAN}{'='*70}")
             print(f"{Fore.GREEN}SCAN COMPLETED!")
@@ -784,44 +4284,1432 @@ Threads: {self.threads}
             print(f"Validated subdomains: {len(self.validated_subs)}")
             print(f"{'='*70}")
 
-def main():
+
+# ==================== API לספרייה ====================
+
+class ScanResult:
+    """תוצאה אחת מ-enumerate_subdomains
+
+    kind הוא discovered (name, source), resolved (name, records, resolver),
+    rejected (name, reason), status (level, message - אזהרות ושגיאות בלבד)
+    או completed (found / validated / elapsed ב-extra).
+    """
+    __slots__ = ('kind', 'domain', 'name', 'source', 'records', 'resolver', 'reason',
+                 'level', 'message', 'ts', 'extra')
+
+    def __init__(self, kind, domain, name=None, source=None, records=(), resolver=None, reason=None,
+                 level=None, message=None, ts=None, **extra):
+        self.kind = kind
+        self.domain = domain
+        self.name = name
+        self.source = source
+        self.records = [tuple(r) for r in records]
+        self.resolver = resolver
+        self.reason = reason
+        self.level = level
+        self.message = message
+        self.ts = ts if ts is not None else time.time()
+        self.extra = extra
+
+    def to_dict(self):
+        """אותו מבנה כמו אירוע NDJSON, בלי שדות ריקים"""
+        record = {'event': self.kind, 'domain': self.domain, 'ts': round(self.ts, 3)}
+        for field in ('name', 'source', 'records', 'resolver', 'reason', 'level', 'message'):
+            value = getattr(self, field)
+            if value:
+                record[field] = value
+        record.update(self.extra)
+        return record
+
+    def __repr__(self):
+        return f"ScanResult({self.kind}, {self.name or self.message or self.domain!r})"
+
+
+class _ResultSink:
+    """sink לאירועי ה-enumerator (ממשק EventWriter) שמעביר אותם לתור של event loop"""
+
+    STATUS_LEVELS = ('warning', 'error')
+
+    def __init__(self, loop, queue, domain):
+        self._loop = loop
+        self._queue = queue
+        self.domain = domain
+
+    def put(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            pass  # ה-event loop כבר נסגר - אין מי שיקרא
+
+    def emit(self, event, domain, **fields):
+        self.put(ScanResult(event, domain, **fields))
+
+    def status(self, level, message):
+        if level in self.STATUS_LEVELS:
+            self.put(ScanResult('status', self.domain, level=level, message=message))
+
+    def flush(self):
+        pass
+
+
+async def enumerate_subdomains(domain, *, passive=True, active=True, validate=True, wordlist=None,
+                               cancel=None, context=None, session=None, resolver=None, nameservers=None,
+                               dns_cache=None, http_cache=None, **options):
+    """סריקה כ-async generator: ScanResult לכל אירוע, מיד כשהוא קורה
+
+    בלי פלט למסך ובלי קבצים. את התשתית אפשר להעביר מבחוץ: context שלם (כמה
+    סריקות באותו event loop חולקות אותו ואת תקציב ה-DNS), או session
+    (requests), resolver (AsyncDNSEngine), nameservers ו-dns_cache /
+    http_cache שמהם נבנה context פרטי שנסגר בסוף. options עוברים
+    ל-SubdomainEnumerator (permutation_budget, recursive וכו'). הסריקה
+    עצמה רצה ב-thread משלה; היא נעצרת ב-cancel.cancel(), ביציאה מהלולאה
+    או בביטול ה-task. resolver כבר נושא את ה-nameservers וה-cache שלו, ולכן
+    לא מקבל אותם בנוסף (ValueError).
+    """
+    if resolver is not None and (nameservers is not None or dns_cache is not None):
+        raise ValueError("resolver= already has its nameservers and cache; "
+                         "pass nameservers=/dns_cache= only without resolver=")
+    domain = domain.strip().lower().rstrip('.')
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    # token פרטי: יציאה מוקדמת עוצרת רק את הסריקה הזו, גם כש-cancel משותף
+    token = CancelToken(parent=cancel)
+    owns_context = context is None
+    if owns_context:
+        context = ScanContext(nameservers=nameservers, dns_cache=dns_cache, http_cache=http_cache,
+                              session=session, dns_engine=resolver, extractor=HostExtractor(workers=0))
+    sink = _ResultSink(loop, queue, domain)
+    errors = []
+    
+    def run():
+        try:
+            enumerator = SubdomainEnumerator(domain, context=context, quiet=True, events=sink, write_files=False,
+                                             cancel=token, on_status=sink.status, **options)
+            enumerator.run(passive=passive, active=active, validate=validate, wordlist=wordlist)
+        except ScanCancelled:
+            pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            sink.put(None)
+    
+    worker = threading.Thread(target=run, name=f"scan-{domain}", daemon=True)
+    worker.start()
+    try:
+        while True:
+            result = await queue.get()
+            if result is None:
+                break
+            yield result
+        if errors:
+            raise errors[0]
+    finally:
+        token.cancel()
+        # התשתית נסגרת רק אחרי שה-thread של הסריקה יצא ממנה
+        await loop.run_in_executor(None, worker.join)
+        if owns_context:
+            context.close()
+
+
+def iter_subdomains(domain, **kwargs):
+    """עטיפה סינכרונית ל-enumerate_subdomains (לקוד שלא רץ בתוך event loop)"""
+    loop = asyncio.new_event_loop()
+    results = enumerate_subdomains(domain, **kwargs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+
+def read_targets(path):
+    """קריאת רשימת מטרות מקובץ או מ-stdin ('-'), בלי כפילויות"""
+    stream = sys.stdin if path == '-' else open(path, 'r')
+    seen = set()
+    try:
+        for line in stream:
+            domain = line.strip().lower().rstrip('.')
+            if domain and not domain.startswith('#') and domain not in seen:
+                seen.add(domain)
+                yield domain
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def parse_shard(value):
+    """'K/N' -> (K, N) עבור --wordlist-shard"""
+    try:
+        k, n = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected K/N, got {value!r}")
+    if not 1 <= k <= n:
+        raise argparse.ArgumentTypeError(f"shard {value} out of range (1 <= K <= N)")
+    return k, n
+
+
+def scan_target(domain, args, context, output_file=None, quiet=False):
+    """סריקת מטרה אחת על context נתון (משמש גם את מצב ה-batch)"""
+    # יומן סריקה לצורך המשך אחרי קריסה - רק כשמבקשים
+    journal = None
+    resumed = False
+    if args.journal or args.resume:
+        custom_path = isinstance(args.journal, str) and not args.targets
+        journal = ScanJournal(args.journal if custom_path else ScanJournal.default_path(domain))
+        shard = '%d/%d' % args.wordlist_shard if args.wordlist_shard else None
+        resumed = journal.open({'domain': domain, 'wordlist': args.wordlist, 'wordlist_shard': shard},
+                               resume=args.resume)
+        if args.resume and not resumed and not quiet:
+            print(f"[!] No journal found at {journal.path}, starting a new scan")
+    
+    # יצירת האובייקט
+    enumerator = SubdomainEnumerator(
+        domain=domain,
+        output_file=output_file,
+        threads=args.threads,
+        timeout=args.timeout,
+        source_timeout=args.source_timeout,
+        permutation_budget=args.permutation_budget,
+        permutation_rounds=args.permutation_rounds,
+        crawl_depth=args.crawl_depth,
+        crawl_pages=args.crawl_pages,
+        recursive=args.recursive,
+        recursive_depth=args.depth,
+        query_budget=args.query_budget,
+        wordlist_shard=args.wordlist_shard,
+        journal=journal,
+        context=context,
+        quiet=quiet
+    )
+    if resumed:
+        enumerator.resume_from_journal()
+    if args.since:
+        state_path = args.since if isinstance(args.since, str) and not args.targets else TargetState.default_path(domain)
+        state = TargetState(state_path)
+        state.load()
+        enumerator.load_state(state)
+    
+    # הרצה
+    try:
+        enumerator.run(
+            passive=not args.active_only,
+            active=not args.passive_only,
+            validate=not args.no_validate,
+            wordlist=args.wordlist
+        )
+    except BaseException:
+        if journal is not None:
+            journal.close()  # נשמר ל---resume
+        raise
+    if journal is not None:
+        journal.discard()
+    return enumerator
+
+
+def run_batch(args, context):
+    """סריקת הרבה מטרות בתהליך אחד, על session / resolvers / cache משותפים"""
+    output_dir = args.output_dir or '.'
+    os.makedirs(output_dir, exist_ok=True)
+    targets = list(read_targets(args.targets))
+    print(f"[*] Batch mode: {len(targets)} targets, {args.parallel_targets} in parallel, "
+          f"{context.dns_engine.max_inflight} DNS queries in flight shared between them")
+    
+    started = time.time()
+    failed = 0
+    metrics = []
+    with ThreadPoolExecutor(max_workers=args.parallel_targets, thread_name_prefix='target') as executor:
+        futures = {}
+        for domain in targets:
+            output_file = os.path.join(output_dir, f"subdomains_{domain}.txt")
+            futures[executor.submit(scan_target, domain, args, context, output_file, True)] = domain
+        for i, future in enumerate(as_completed(futures), 1):
+            domain = futures[future]
+            try:
+                enumerator = future.result()
+                metrics.append(enumerator.metrics)
+                print(f"[+] [{i}/{len(targets)}] {domain}: {len(enumerator.subdomains)} found, "
+                      f"{len(enumerator.validated_subs)} validated")
+            except Exception as e:
+                failed += 1
+                print(f"[-] [{i}/{len(targets)}] {domain}: failed: {e}")
+    
+    print(f"[*] Batch completed in {time.time() - started:.2f} seconds "
+          f"({len(targets) - failed} succeeded, {failed} failed)")
+    return metrics
+
+
+def add_context_arguments(parser):
+    """אפשרויות התשתית המשותפת (resolvers, caches, פרסור) - משותף ל-CLI ול-daemon"""
+    parser.add_argument('--resolvers', type=lambda value: [ns for ns in value.split(',') if ns],
+                        metavar='IP[:PORT],...', help='Resolvers to use instead of the public defaults')
+    parser.add_argument('--dns-concurrency', type=int, default=500, help='Max in-flight DNS queries (default: 500)')
+    parser.add_argument('--dns-cache', nargs='?', const=DEFAULT_DNS_CACHE, metavar='PATH',
+                        help=f'Persist DNS answers between runs (default path: {DEFAULT_DNS_CACHE})')
+    parser.add_argument('--http-cache', nargs='?', const=DEFAULT_HTTP_CACHE, metavar='DIR',
+                        help=f'Cache passive source responses on disk (default dir: {DEFAULT_HTTP_CACHE})')
+    parser.add_argument('--http-cache-size', type=int, default=512, metavar='MB',
+                        help='Max size of the HTTP cache before old entries are evicted (default: 512)')
+    parser.add_argument('--parser', choices=EXTRACT_BACKENDS, default='regex',
+                        help='Backend for extracting names from pages (default: regex; lxml if installed)')
+    parser.add_argument('--parse-workers', type=int, metavar='N',
+                        help='Processes for parsing large pages off the main process (0 disables, default: up to 4)')
+
+
+def build_context(args, events=None):
+    """ScanContext לפי האפשרויות של add_context_arguments, כולל טעינת cache ה-DNS"""
+    dns_cache = DNSCache(path=args.dns_cache)
+    if args.dns_cache:
+        loaded = dns_cache.load()
+        print(f"[*] Loaded {loaded} cached DNS answers from {args.dns_cache}")
+        if dns_cache.skipped:
+            print(f"[!] Skipped {dns_cache.skipped} corrupt lines in {args.dns_cache}")
+    
+    http_cache = None
+    if args.http_cache:
+        http_cache = HTTPCache(args.http_cache, max_bytes=args.http_cache_size * 1024 * 1024)
+    
+    if args.parser == 'lxml' and not LXML_AVAILABLE:
+        print("[!] Warning: lxml not installed, falling back to the regex parser")
+        print("[!] Install with: pip install lxml")
+    extractor = HostExtractor(args.parser, workers=args.parse_workers)
+    
+    return ScanContext(nameservers=args.resolvers, dns_concurrency=args.dns_concurrency, dns_cache=dns_cache,
+                       http_cache=http_cache, events=events, initial_concurrency=args.threads,
+                       extractor=extractor)
+
+
+def compile_wordlist_command(argv):
+    """subrecon compile-wordlist - בניית wordlist מקומפל ל-mmap"""
+    parser = argparse.ArgumentParser(
+        prog='subrecon compile-wordlist',
+        description='Compile wordlists into a sorted, deduplicated, memory-mappable file for -w')
+    parser.add_argument('wordlists', nargs='*', help='Text wordlists to include')
+    parser.add_argument('-o', '--output', required=True, help='Compiled wordlist path')
+    parser.add_argument('--no-builtin', action='store_true', help='Leave out the built-in wordlist')
+    parser.add_argument('--affix', action='append', default=[], metavar='RULE',
+                        help="Variation rule applied to every custom word, '{}' is the word "
+                             "(e.g. '{}-dev', 'dev-{}'); may be repeated")
+    parser.add_argument('--builtin-affixes', action='store_true',
+                        help='Apply the built-in variation rules to custom words as well')
+    parser.add_argument('--run-words', type=int, default=1000000,
+                        help='Words sorted in memory per run of the external sort (default: 1000000)')
+    parser.add_argument('--tmp-dir', metavar='DIR', help='Directory for sort runs (default: system temp)')
+    args = parser.parse_args(argv)
+    
+    affixes = ['{}']
+    if args.builtin_affixes:
+        affixes.extend(WORDLIST_AFFIXES)
+    affixes.extend(args.affix)
+    affixes = list(dict.fromkeys(affixes))
+    try:
+        parse_affix_rules(affixes)
+    except ValueError as e:
+        parser.error(str(e))
+    for path in args.wordlists:
+        if not os.path.exists(path):
+            parser.error(f"wordlist not found: {path}")
+    # לבדוק לפני ה-sort (שיכול לקחת דקות), לא רק בכתיבה בסופו
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    if not os.path.isdir(output_dir) or not os.access(output_dir, os.W_OK):
+        parser.error(f"output directory does not exist or is not writable: {output_dir}")
+    if args.tmp_dir and not os.path.isdir(args.tmp_dir):
+        parser.error(f"--tmp-dir {args.tmp_dir} is not a directory")
+    
+    started = time.time()
+    count = compile_wordlist(args.output, args.wordlists, affixes, builtin=not args.no_builtin,
+                             run_words=args.run_words, tmp_dir=args.tmp_dir)
+    print(f"[+] Compiled {count} words into {args.output} "
+          f"({os.path.getsize(args.output) / 1024 / 1024:.1f}MB, {time.time() - started:.1f}s)")
+
+
+# ==================== daemon ====================
+
+# אפשרויות שמותר להעביר ב-job: שם -> סוג. passive/active/validate/wordlist
+# הולכים ל-run() וכל השאר ל-SubdomainEnumerator
+JOB_OPTIONS = {
+    'passive': bool, 'active': bool, 'validate': bool, 'wordlist': str,
+    'timeout': int, 'source_timeout': int, 'permutation_budget': int, 'permutation_rounds': int,
+    'crawl_depth': int, 'crawl_pages': int, 'recursive': bool, 'recursive_depth': int, 'query_budget': int,
+}
+JOB_RUN_OPTIONS = ('passive', 'active', 'validate', 'wordlist')
+DEFAULT_LISTEN = '127.0.0.1:8765'
+# סוד משותף ל-API (daemon / coordinator) - חובה כשמאזינים על כתובת שאינה loopback
+SECRET_ENV = 'SUBRECON_SECRET'
+
+
+def is_loopback_listen(listen):
+    """האם HOST:PORT מאזין רק על loopback (host ריק = 127.0.0.1, כמו ב-create_job_server)"""
+    host = listen.rpartition(':')[0].strip('[]')
+    if host in ('', 'localhost'):
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def confined_wordlist(name, wordlist_dir):
+    """נתיב של wordlist שהוגשה ב-job - רק קובץ בתוך wordlist_dir; זורק ValueError"""
+    if not wordlist_dir:
+        raise ValueError('wordlist is disabled on this daemon (start it with --wordlist-dir)')
+    root = os.path.realpath(wordlist_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ValueError(f"no such wordlist: {name}")
+    return path
+
+
+class ScanJob:
+    """סריקה אחת שהוגשה ל-daemon
+
+    משמשת גם כ-sink לאירועים של ה-enumerator (אותו ממשק כמו EventWriter):
+    כל שורת NDJSON נשמרת (עד MAX_EVENTS האחרונות), וכל מי שעוקב אחרי ה-job
+    מקבל אותה מיד. בסוף ה-job התוצאות נבנות פעם אחת וה-enumerator משתחרר.
+    """
+
+    FINISHED = ('done', 'failed')
+    MAX_EVENTS = 20000
+
+    def __init__(self, domain, options):
+        self.id = os.urandom(6).hex()
+        self.domain = domain
+        self.options = options
+        self.status = 'queued'
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.enumerator = None
+        self.lines = deque(maxlen=self.MAX_EVENTS)
+        self.dropped = 0  # שורות ישנות שנזרקו מההיסטוריה
+        self._results = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in self.FINISHED
+
+    def emit(self, event, domain, **fields):
+        record = {'event': event, 'domain': domain, 'ts': round(time.time(), 3), 'job': self.id}
+        record.update(fields)
+        line = json.dumps(record, separators=(',', ':'))
+        with self._cond:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(line)
+            self._cond.notify_all()
+
+    def flush(self):
+        pass
+
+    def set_status(self, status, **fields):
+        """מעבר מצב, שנרשם גם כאירוע job בזרם"""
+        with self._cond:
+            self.status = status
+            if status == 'running':
+                self.started = time.time()
+            elif status in self.FINISHED:
+                self.finished = time.time()
+                self.error = fields.get('error')
+        self.emit('job', self.domain, status=status, **fields)
+
+    def follow(self):
+        """כל שורות האירועים שעוד בהיסטוריה, ואחר כך החדשות - עד שה-job מסתיים"""
+        pos = 0
+        while True:
+            with self._cond:
+                while pos >= self.dropped + len(self.lines) and not self.done:
+                    self._cond.wait(1.0)
+                pos = max(pos, self.dropped)  # עוקב איטי מדלג על מה שכבר נזרק
+                batch = list(itertools.islice(self.lines, pos - self.dropped, None))
+                pos += len(batch)
+                finished = self.done
+            if batch:
+                yield batch
+            elif finished:
+                return
+
+    def to_dict(self):
+        info = {
+            'id': self.id, 'domain': self.domain, 'status': self.status, 'options': self.options,
+            'created': self.created, 'started': self.started, 'finished': self.finished,
+        }
+        enumerator = self.enumerator
+        if enumerator is not None:
+            info['found'] = len(enumerator.subdomains)
+            info['validated'] = len(enumerator.validated_subs)
+        elif self._results is not None:
+            info['found'] = len(self._results['all'])
+            info['validated'] = len(self._results['validated'])
+        if self.error:
+            info['error'] = self.error
+        return info
+
+    def collect(self, status):
+        """בניית התוצאות בסוף ה-job ושחרור ה-enumerator (stores, מדדים, memo)"""
+        enumerator = self.enumerator
+        if enumerator is None:
+            return
+        self._results = {
+            'id': self.id, 'domain': self.domain, 'status': status,
+            'validated': [dict(meta, name=name) for name, meta in enumerator.validated_subs.items()],
+            'all': list(enumerator.subdomains),
+            'metrics': enumerator.metrics.to_dict(),
+        }
+        self.enumerator = None
+
+    def results(self):
+        """התוצאות של job שהסתיים, או None"""
+        return self._results
+
+
+class JobManager:
+    """תור סריקות על ScanContext אחד שנשאר חם בין jobs
+
+    session ה-HTTP (חיבורי TLS פתוחים), ה-sockets והבריאות של ה-resolvers,
+    ה-caches, ה-process pool של הפרסור וה-wordlist המובנה נבנים פעם אחת -
+    job חדש מתחיל מיד. עד max_jobs סריקות רצות במקביל ומתחלקות בתקציב ה-DNS.
+    """
+
+    MAX_FINISHED = 256
+
+    def __init__(self, context, max_jobs=4, threads=20, wordlist_dir=None):
+        self.context = context
+        self.threads = threads
+        self.max_jobs = max_jobs
+        self.wordlist_dir = wordlist_dir
+        self.jobs = OrderedDict()
+        self.started = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='job')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_spec(spec, wordlist_dir=None):
+        """בדיקת גוף הבקשה: {"domain": ..., אפשרויות מ-JOB_OPTIONS}; זורק ValueError
+
+        wordlist הוא שם קובץ בתוך wordlist_dir בלבד (בלי wordlist_dir - אסור).
+        """
+        if not isinstance(spec, dict):
+            raise ValueError('job must be a JSON object')
+        domain = str(spec.get('domain') or '').strip().lower().rstrip('.')
+        if not re.fullmatch(r'(?:[a-z0-9_-]+\.)+[a-z0-9-]+', domain):
+            raise ValueError('a valid target domain is required')
+        options = {}
+        for key, value in spec.items():
+            if key == 'domain':
+                continue
+            if key not in JOB_OPTIONS:
+                raise ValueError(f"unknown option: {key}")
+            if JOB_OPTIONS[key] is bool and not isinstance(value, bool):
+                raise ValueError(f"option {key} must be true or false")
+            try:
+                options[key] = JOB_OPTIONS[key](value)
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid value for {key}: {value!r}")
+        if 'wordlist' in options:
+            confined_wordlist(options['wordlist'], wordlist_dir)
+        return domain, options
+
+    def submit(self, spec):
+        domain, options = self.parse_spec(spec, self.wordlist_dir)
+        job = ScanJob(domain, options)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._evict()
+        job.set_status('queued')
+        self._executor.submit(self._run, job)
+        return job
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.MAX_FINISHED, 0)]:
+            del self.jobs[job_id]
+
+    def _run(self, job):
+        job.set_status('running')
+        run_options = {k: v for k, v in job.options.items() if k in JOB_RUN_OPTIONS}
+        options = {k: v for k, v in job.options.items() if k not in JOB_RUN_OPTIONS}
+        try:
+            if 'wordlist' in run_options:
+                run_options['wordlist'] = confined_wordlist(run_options['wordlist'], self.wordlist_dir)
+            job.enumerator = SubdomainEnumerator(job.domain, threads=self.threads, context=self.context,
+                                                 quiet=True, events=job, write_files=False, **options)
+            job.enumerator.run(**run_options)
+        except Exception as e:
+            job.collect('failed')
+            job.set_status('failed', error=str(e))
+        else:
+            job.collect('done')
+            results = job.results()
+            job.set_status('done', found=len(results['all']), validated=len(results['validated']))
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def health(self):
+        with self._lock:
+            statuses = Counter(job.status for job in self.jobs.values())
+        return {
+            'uptime_s': round(time.time() - self.started, 1),
+            'max_jobs': self.max_jobs,
+            'jobs': dict(statuses),
+            'dns_cache': len(self.context.dns_cache),
+            'resolvers': self.context.dns_engine.pool.summary(),
+        }
+
+    def close(self):
+        """ביטול jobs שבתור והמתנה לאלו שכבר רצים"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _APIRequestHandler(BaseHTTPRequestHandler):
+    """בסיס משותף ל-API של ה-daemon ושל ה-coordinator: JSON פנימה והחוצה"""
+
+    server_version = 'subrecon'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        """בדיקת הסוד המשותף (Authorization: Bearer ...) אם השרת הוגדר עם סוד; שולח 401 אם לא"""
+        secret = getattr(self.server, 'secret', None)
+        if not secret:
+            return True
+        supplied = self.headers.get('Authorization') or ''
+        if hmac.compare_digest(supplied.encode(), f"Bearer {secret}".encode()):
+            return True
+        self._send_json(401, {'error': 'missing or wrong secret'})
+        return False
+
+    def _read_json(self):
+        """גוף הבקשה כ-JSON; זורק ValueError על גוף לא תקין
+
+        רק Content-Type: application/json - טופס או text/plain מדף אחר בדפדפן
+        (שלא עובר preflight של CORS) נדחה.
+        """
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            raise ValueError('Content-Type must be application/json')
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        return [part for part in parsed.path.split('/') if part], parse_qs(parsed.query)
+
+
+class _JobRequestHandler(_APIRequestHandler):
+    """ה-API של ה-daemon:
+
+    POST /jobs                  הגשת סריקה ({"domain": ..., ...}); עם ?stream=1
+                                התשובה היא זרם ה-NDJSON של ה-job עד סופו
+    GET  /jobs                  כל ה-jobs
+    GET  /jobs/<id>             מצב job
+    GET  /jobs/<id>/events      זרם NDJSON (מההתחלה ועד סוף ה-job)
+    GET  /jobs/<id>/results     התוצאות של job שהסתיים
+    GET  /health                מצב ה-daemon וה-resolvers
+    """
+
+    def _stream(self, job):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        try:
+            for lines in job.follow():
+                self.wfile.write(('\n'.join(lines) + '\n').encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # הלקוח התנתק; ה-job ממשיך לרוץ
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        manager = self.server.manager
+        parts, _query = self._route()
+        if parts == ['health']:
+            return self._send_json(200, manager.health())
+        if parts == ['jobs']:
+            return self._send_json(200, manager.list())
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = manager.get(parts[1])
+            if job is None:
+                return self._send_json(404, {'error': 'no such job'})
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+            if parts[2] == 'events':
+                return self._stream(job)
+            if parts[2] == 'results':
+                if not job.done or job.results() is None:
+                    return self._send_json(409, {'error': f"job is {job.status}"})
+                return self._send_json(200, job.results())
+        self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        parts, query = self._route()
+        if parts != ['jobs']:
+            return self._send_json(404, {'error': 'not found'})
+        try:
+            job = self.server.manager.submit(self._read_json())
+        except ValueError as e:
+            return self._send_json(400, {'error': str(e)})
+        if query.get('stream', ['0'])[0] not in ('', '0', 'false'):
+            return self._stream(job)
+        self._send_json(202, job.to_dict())
+
+
+class _TCPJobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixJobServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def create_job_server(manager, listen=DEFAULT_LISTEN, socket_path=None, secret=None):
+    """שרת ה-API: TCP על listen (host:port) או Unix socket שנגיש רק לבעלים
+
+    עם secret כל בקשה צריכה Authorization: Bearer <secret>.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # socket שנשאר מ-daemon קודם
+        server = _UnixJobServer(socket_path, _JobRequestHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        host, _, port = listen.rpartition(':')
+        server = _TCPJobServer((host or '127.0.0.1', int(port)), _JobRequestHandler)
+    server.manager = manager
+    server.secret = secret
+    return server
+
+
+def serve(argv):
+    """subrecon serve - daemon שמחזיק את התשתית חמה ומקבל סריקות דרך API מקומי"""
+    parser = argparse.ArgumentParser(
+        prog='subrecon serve',
+        description='Run subrecon as a daemon that keeps sessions, resolvers and caches warm '
+                    'and accepts scan jobs over a local HTTP API')
+    parser.add_argument('--listen', default=DEFAULT_LISTEN, metavar='HOST:PORT',
+                        help=f'Address for the job API (default: {DEFAULT_LISTEN})')
+    parser.add_argument('--socket', metavar='PATH', help='Serve the job API on a Unix socket instead of TCP')
+    parser.add_argument('--secret', default=os.environ.get(SECRET_ENV),
+                        help=f'Shared secret clients must send as "Authorization: Bearer <secret>" '
+                             f'(default: ${SECRET_ENV}; required when --listen is not a loopback address)')
+    parser.add_argument('--wordlist-dir', metavar='DIR',
+                        help='Directory jobs may pick a "wordlist" file from (default: jobs cannot set one)')
+    parser.add_argument('--max-jobs', type=int, default=4, help='Scans running at once (default: 4)')
+    parser.add_argument('-t', '--threads', type=int, default=20,
+                        help='Starting concurrency per resolver / HTTP host; adapts at runtime (default: 20)')
+    add_context_arguments(parser)
+    args = parser.parse_args(argv)
+    if not args.socket and not args.secret and not is_loopback_listen(args.listen):
+        parser.error(f"--listen {args.listen} is reachable from other hosts; set --secret or ${SECRET_ENV}")
+    if args.wordlist_dir and not os.path.isdir(args.wordlist_dir):
+        parser.error(f"--wordlist-dir {args.wordlist_dir} is not a directory")
+    
+    context = build_context(args)
+    manager = JobManager(context, max_jobs=args.max_jobs, threads=args.threads, wordlist_dir=args.wordlist_dir)
+    try:
+        server = create_job_server(manager, args.listen, args.socket, args.secret)
+    except (OSError, ValueError) as e:
+        context.close()
+        parser.error(f"cannot listen on {args.socket or args.listen}: {e}")
+    
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+    
+    address = args.socket or '%s:%d' % server.server_address[:2]
+    print(f"[*] subrecon daemon listening on {address} ({args.max_jobs} jobs at once)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("[*] Shutting down: waiting for running jobs")
+        server.server_close()
+        manager.close()
+        context.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        if args.dns_cache:
+            context.dns_cache.save()
+
+
+# ==================== brute force מבוזר ====================
+
+DEFAULT_COORDINATOR = '127.0.0.1:8766'
+
+
+class Lease:
+    """טווח [start, stop) של ה-wordlist מתחת ל-parent אחד של מטרה
+
+    token מתחלף בכל הקצאה, כך ש-worker שה-lease שלו פג והוקצה מחדש מזוהה
+    ומקבל הוראה לעצור. ה-tokens הקודמים נשמרים (עד שה-lease מסתיים) כדי
+    לקבל תוצאות מאוחרות רק ממי שה-lease באמת הוקצה לו.
+    """
+
+    __slots__ = ('id', 'target', 'parent', 'depth', 'start', 'stop', 'state', 'worker', 'token',
+                 'past_tokens', 'expires', 'attempts')
+
+    def __init__(self, lease_id, target, parent, depth, start, stop):
+        self.id = lease_id
+        self.target = target
+        self.parent = parent
+        self.depth = depth
+        self.start = start
+        self.stop = stop
+        self.state = 'pending'
+        self.worker = None
+        self.token = None
+        self.past_tokens = ()
+        self.expires = 0.0
+        self.attempts = 0
+
+
+class BruteforceCoordinator:
+    """חלוקת מרחב ה-brute force (wordlist x מטרות x עומק) ל-leases עבור workers
+
+    לכל (מטרה, parent) יש תוכנית שממנה נחתכים leases של lease_size מילים רק
+    כשמישהו מבקש עבודה, כך שגם wordlist של מיליוני מילים על הרבה מטרות לא
+    יוצר מראש מיליוני אובייקטים. lease שלא חודש תוך lease_ttl (כל דיווח
+    תוצאות מחדש אותו) חוזר לתור ומוקצה שוב בעדיפות, עד max_attempts. השמות
+    שה-workers מחזירים מתמזגים ל-SubdomainStore לכל מטרה (dedup גם כשאותו
+    lease רץ פעמיים), ועם depth > 1 כל שם חדש הופך ל-parent של תוכנית ברמה
+    הבאה.
+    """
+
+    def __init__(self, targets, wordlist, lease_size=2000, depth=1, lease_ttl=30.0, max_attempts=3, events=None):
+        self.wordlist = wordlist
+        self.lease_size = max(int(lease_size), 1)
+        self.depth = max(int(depth), 1)
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.events = events
+        self.results = OrderedDict((target, SubdomainStore()) for target in targets)
+        self.started = time.time()
+        self.total_leases = 0
+        self.completed = 0
+        self.failed = []
+        self.queries = 0
+        self.workers = {}
+        self._plans = deque()
+        self._retry = deque()
+        self._leases = {}
+        self._expanded = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        for target in self.results:
+            self._plan(target, target, 1)
+        if not self._plans:
+            self._finished.set()
+
+    def _plan(self, target, parent, depth):
+        if parent in self._expanded or not len(self.wordlist):
+            return
+        self._expanded.add(parent)
+        self._plans.append([target, parent, depth, 0])
+        self.total_leases += -(-len(self.wordlist) // self.lease_size)
+
+    def words(self, start, stop):
+        if isinstance(self.wordlist, CompiledWordlist):
+            return list(self.wordlist.iter_range(start, stop))
+        return list(self.wordlist[start:stop])
+
+    def _next_lease(self):
+        if self._retry:
+            return self._retry.popleft()
+        if not self._plans:
+            return None
+        plan = self._plans[0]
+        target, parent, depth, start = plan
+        stop = min(start + self.lease_size, len(self.wordlist))
+        plan[3] = stop
+        if stop >= len(self.wordlist):
+            self._plans.popleft()
+        lease = Lease(next(self._ids), target, parent, depth, start, stop)
+        self._leases[lease.id] = lease
+        return lease
+
+    def _reap(self, now):
+        """leases שפג תוקפם חוזרים לתור (או נכשלים אחרי max_attempts)"""
+        for lease in list(self._leases.values()):
+            if lease.state != 'active' or lease.expires > now:
+                continue
+            lease.worker = None
+            if lease.attempts >= self.max_attempts:
+                lease.state = 'failed'
+                del self._leases[lease.id]
+                self.failed.append(lease)
+            else:
+                lease.state = 'pending'
+                self._retry.append(lease)
+        self._check_finished()
+
+    def _check_finished(self):
+        if not self._plans and not self._leases:
+            self._finished.set()
+
+    def claim(self, worker):
+        """lease הבא עבור worker: {'lease': ...}, {'retry': שניות} או {'done': True}"""
+        now = time.time()
+        with self._lock:
+            self.workers[worker] = now
+            self._reap(now)
+            lease = self._next_lease()
+            if lease is None:
+                if self._finished.is_set():
+                    return {'done': True}
+                # כל העבודה מוקצית - אולי lease יפוג ויחזור לתור
+                return {'retry': min(self.lease_ttl / 4, 2.0)}
+            lease.state = 'active'
+            lease.worker = worker
+            if lease.token is not None:
+                lease.past_tokens += (lease.token,)
+            lease.token = os.urandom(8).hex()
+            lease.attempts += 1
+            lease.expires = now + self.lease_ttl
+        return {'lease': {
+            'id': lease.id, 'token': lease.token, 'target': lease.target, 'parent': lease.parent,
+            'depth': lease.depth, 'start': lease.start, 'stop': lease.stop, 'ttl': self.lease_ttl,
+            'words': self.words(lease.start, lease.stop),
+        }}
+
+    def _held(self, lease_id, token):
+        lease = self._leases.get(lease_id)
+        if lease is None or lease.state != 'active' or lease.token != token:
+            return None
+        return lease
+
+    def report(self, lease_id, token, results):
+        """מיזוג תוצאות של lease; מחזיר False אם ה-lease כבר לא של ה-worker
+
+        תוצאות מאוחרות מ-worker שה-lease שלו פג והוקצה מחדש עדיין מתמזגות, אבל
+        רק עם token שבאמת הונפק ל-lease שעוד פתוח. המטרה והעומק תמיד של ה-lease.
+        """
+        now = time.time()
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None or lease.token is None or token not in (lease.token,) + lease.past_tokens:
+                return False
+            held = lease.state == 'active' and lease.token == token
+            if held:
+                lease.expires = now + self.lease_ttl
+            for item in results:
+                self._merge(lease.target, lease.depth, item)
+        return held
+
+    def _merge(self, target, depth, item):
+        name = str(item.get('name') or '').strip().lower().rstrip('.')
+        if not name.endswith(f".{target}"):
+            return  # רק שמות מתחת למטרה
+        records = tuple(tuple(record) for record in item.get('records') or ())
+        if not self.results[target].add(name, 'bruteforce', records):
+            return
+        if self.events is not None:
+            self.events.emit('resolved', target, name=name, source='bruteforce',
+                             records=[list(record) for record in records])
+        if depth < self.depth:
+            self._plan(target, name, depth + 1)
+
+    def complete(self, lease_id, token, queried=0):
+        """סיום lease; מחזיר False אם ה-lease הוקצה בינתיים ל-worker אחר"""
+        with self._lock:
+            lease = self._held(lease_id, token)
+            if lease is None:
+                return False
+            lease.state = 'done'
+            del self._leases[lease.id]
+            self.completed += 1
+            self.queries += max(int(queried), 0)
+            self._check_finished()
+        return True
+
+    def wait(self, timeout=None):
+        """המתנה לסיום כל ה-leases; מחזיר True אם הכל הסתיים"""
+        if not self._finished.wait(timeout):
+            with self._lock:
+                self._reap(time.time())
+        return self._finished.is_set()
+
+    def status(self):
+        with self._lock:
+            active = [lease for lease in self._leases.values() if lease.state == 'active']
+            return {
+                'elapsed_s': round(time.time() - self.started, 1),
+                'targets': len(self.results),
+                'leases': {'total': self.total_leases, 'completed': self.completed, 'active': len(active),
+                           'retry': len(self._retry), 'failed': len(self.failed)},
+                'queries': self.queries,
+                'found': sum(len(store) for store in self.results.values()),
+                'workers': {worker: sum(1 for lease in active if lease.worker == worker)
+                            for worker in self.workers},
+                'done': self._finished.is_set(),
+            }
+
+
+class _CoordinatorRequestHandler(_APIRequestHandler):
+    """הפרוטוקול בין coordinator ל-workers:
+
+    POST /leases                   {"worker": שם} -> {"lease": {...}} / {"retry": s} / {"done": true}
+    POST /leases/<id>/results      {"token", "results": [{"name", "records"}]} - מחדש את ה-lease;
+                                   409 אם ה-lease כבר לא של ה-worker (צריך לעצור)
+    POST /leases/<id>/done         {"token", "queried"}
+    GET  /status                   התקדמות
+
+    עם secret כל בקשה צריכה Authorization: Bearer <secret>.
+    """
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts, _query = self._route()
+        if parts == ['status']:
+            return self._send_json(200, self.server.coordinator.status())
+        self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        coordinator = self.server.coordinator
+        parts, _query = self._route()
+        try:
+            body = self._read_json()
+            if parts == ['leases']:
+                return self._send_json(200, coordinator.claim(str(body.get('worker') or self.client_address[0])))
+            if len(parts) == 3 and parts[0] == 'leases':
+                lease_id, token = int(parts[1]), str(body.get('token'))
+                if parts[2] == 'results':
+                    held = coordinator.report(lease_id, token, list(body.get('results') or ()))
+                elif parts[2] == 'done':
+                    held = coordinator.complete(lease_id, token, body.get('queried') or 0)
+                else:
+                    return self._send_json(404, {'error': 'not found'})
+                if not held:
+                    return self._send_json(409, {'error': 'lease is no longer held by this worker'})
+                return self._send_json(200, {'ok': True})
+        except (ValueError, TypeError, AttributeError) as e:
+            return self._send_json(400, {'error': f"bad request: {e}"})
+        self._send_json(404, {'error': 'not found'})
+
+
+class BruteforceWorker:
+    """worker חסר מצב: מבקש lease, פותר אותו על ה-context המקומי ומזרים תוצאות חזרה
+
+    התוצאות נשלחות ב-batches כל flush_interval שניות תוך כדי הרזולוציה (וכל
+    שליחה מחדשת את ה-lease). 409 מה-coordinator עוצר את ה-lease מיד. ה-worker
+    מסתיים כשה-coordinator מודיע שאין עוד עבודה, או כשהוא לא זמין יותר.
+    """
+
+    MAX_ERRORS = 5
+
+    def __init__(self, url, context, name=None, flush_interval=1.0, secret=None):
+        self.url = url.rstrip('/')
+        self.context = context
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.flush_interval = flush_interval
+        self.session = requests.Session()
+        if secret:
+            self.session.headers['Authorization'] = f"Bearer {secret}"
+        self.leases = 0
+        self.found = 0
+        self._enumerators = OrderedDict()
+
+    def _post(self, path, payload):
+        response = self.session.post(self.url + path, json=payload, timeout=30)
+        if response.status_code == 409:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def _enumerator(self, target):
+        """enumerator שקט לכל מטרה - זיהוי ה-wildcard וה-CNAME memo נשמרים בין leases"""
+        enumerator = self._enumerators.pop(target, None)
+        if enumerator is None:
+            enumerator = SubdomainEnumerator(target, quiet=True, write_files=False, context=self.context)
+            if len(self._enumerators) >= 64:
+                self._enumerators.popitem(last=False)
+        self._enumerators[target] = enumerator
+        return enumerator
+
+    def run(self):
+        errors = 0
+        while True:
+            try:
+                reply = self._post('/leases', {'worker': self.name})
+            except (requests.RequestException, ValueError) as e:
+                errors += 1
+                if errors >= self.MAX_ERRORS:
+                    print(f"[-] Coordinator unavailable ({e}), stopping")
+                    return
+                time.sleep(min(2 ** errors, 10))
+                continue
+            errors = 0
+            if reply is None or reply.get('done'):
+                break
+            if reply.get('lease') is None:
+                time.sleep(reply.get('retry', 1.0))
+                continue
+            self.resolve(reply['lease'])
+        print(f"[+] Worker {self.name} finished: {self.leases} leases, {self.found} names found")
+
+    def resolve(self, lease):
+        enumerator = self._enumerator(lease['target'])
+        cancel = CancelToken()
+        enumerator.cancel = cancel
+        path = f"/leases/{lease['id']}"
+        found_names = set()
+        pending = []
+        lock = threading.Lock()
+        stop = threading.Event()
+        
+        def on_found(name):
+            found_names.add(name)
+        
+        def on_result(result):
+            if result.name in found_names:
+                with lock:
+                    pending.append({'name': result.name, 'records': [
+                        [r[1], r[3]] for r in result.records if not isinstance(r[3], bytes)]})
+        
+        def flush():
+            with lock:
+                batch = pending[:]
+                del pending[:]
+            try:
+                held = self._post(path + '/results', {'token': lease['token'], 'results': batch})
+            except (requests.RequestException, ValueError):
+                with lock:
+                    pending[:0] = batch  # ננסה שוב בשליחה הבאה
+                return
+            if held is None:
+                cancel.cancel()
+        
+        def flusher():
+            while not stop.wait(self.flush_interval):
+                flush()
+        
+        thread = threading.Thread(target=flusher, daemon=True)
+        thread.start()
+        candidates = (f"{word}.{lease['parent']}".lower() for word in lease['words'])
+        try:
+            enumerator.resolve_names(candidates, on_result=on_result, desc=f"Lease {lease['id']}",
+                                     filter_wildcards=True, on_found=on_found)
+        except ScanCancelled:
+            pass
+        finally:
+            stop.set()
+            thread.join()
+            enumerator.cancel = None
+        flush()
+        if cancel.cancelled:
+            return  # ה-lease הוקצה ל-worker אחר
+        try:
+            self._post(path + '/done', {'token': lease['token'], 'queried': len(lease['words'])})
+        except (requests.RequestException, ValueError):
+            return  # ה-lease יפוג ויוקצה מחדש
+        self.leases += 1
+        self.found += len(found_names)
+
+
+def load_coordinator_wordlist(path):
+    """ה-wordlist שממנו נחתכים ה-leases: מקומפל (mmap), קובץ טקסט או המובנה
+
+    קובץ טקסט מקומפל קודם לקובץ זמני (merge sort חיצוני בזיכרון חסום, יחד
+    עם ה-wordlist המובנה) ומוגש מה-mmap כמו רשימה מקומפלת - גם רשימה של
+    מאות מיליוני שורות לא נטענת לזיכרון. הקובץ הזמני נמחק מיד אחרי הפתיחה.
+    """
+    if not path:
+        return load_common_subdomains()
+    if CompiledWordlist.is_compiled(path):
+        return CompiledWordlist(path)
+    fd, compiled_path = tempfile.mkstemp(prefix='subrecon-coordinator-', suffix='.srwl')
+    os.close(fd)
+    try:
+        compile_wordlist(compiled_path, [path])
+        return CompiledWordlist(compiled_path)
+    finally:
+        os.unlink(compiled_path)  # ה-mmap נשאר תקף
+
+
+def coordinator_command(argv):
+    """subrecon coordinator - חלוקת ה-brute force ל-leases עבור workers מרוחקים או מקומיים"""
+    parser = argparse.ArgumentParser(
+        prog='subrecon coordinator',
+        description='Split DNS brute force (wordlist x targets x depth) into leases that '
+                    '`subrecon worker` processes claim over HTTP, and merge their results')
+    parser.add_argument('domains', nargs='*', help='Target domains')
+    parser.add_argument('-T', '--targets', metavar='FILE', help="File with one domain per line ('-' for stdin)")
+    parser.add_argument('-w', '--wordlist',
+                        help='Wordlist (text, or compiled with compile-wordlist; a compiled list is used as is)')
+    parser.add_argument('--depth', type=int, default=1,
+                        help='Levels below each target; names found at one level are brute forced at the next (default: 1)')
+    parser.add_argument('--lease-size', type=int, default=2000, help='Words per lease (default: 2000)')
+    parser.add_argument('--lease-ttl', type=float, default=30.0,
+                        help='Seconds without a report before a lease is reassigned (default: 30)')
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help='Assignments per lease before it is given up (default: 3)')
+    parser.add_argument('--listen', default=DEFAULT_COORDINATOR, metavar='HOST:PORT',
+                        help=f'Address workers connect to (default: {DEFAULT_COORDINATOR})')
+    parser.add_argument('--secret', default=os.environ.get(SECRET_ENV),
+                        help=f'Shared secret workers must send (default: ${SECRET_ENV}; '
+                             f'required when --listen is not a loopback address)')
+    parser.add_argument('--local-workers', type=int, default=0, metavar='N',
+                        help='Also start N worker processes on this host')
+    parser.add_argument('--resolvers', metavar='IP[:PORT],...', help='Resolvers for --local-workers')
+    parser.add_argument('--output-dir', metavar='DIR', help='Directory for per-target results (default: .)')
+    parser.add_argument('--ndjson', metavar='FILE',
+                        help="Stream merged results as JSON lines ('-' for stdout)")
+    args = parser.parse_args(argv)
+    
+    targets = list(dict.fromkeys(domain.strip().lower().rstrip('.') for domain in args.domains))
+    if args.targets:
+        targets.extend(domain for domain in read_targets(args.targets) if domain not in targets)
+    if not targets:
+        parser.error('at least one target domain or --targets is required')
+    if args.wordlist and not os.path.exists(args.wordlist):
+        parser.error(f"wordlist not found: {args.wordlist}")
+    if not args.secret and not is_loopback_listen(args.listen):
+        parser.error(f"--listen {args.listen} is reachable from other hosts; set --secret or ${SECRET_ENV}")
+    
+    events = None
+    stdout = sys.stdout
+    if args.ndjson == '-':
+        events = EventWriter(stdout)
+        sys.stdout = sys.stderr
+    elif args.ndjson:
+        events = EventWriter(args.ndjson)
+    
+    wordlist = load_coordinator_wordlist(args.wordlist)
+    coordinator = BruteforceCoordinator(targets, wordlist, lease_size=args.lease_size, depth=args.depth,
+                                        lease_ttl=args.lease_ttl, max_attempts=args.max_attempts, events=events)
+    host, _, port = args.listen.rpartition(':')
+    try:
+        server = _TCPJobServer((host or '127.0.0.1', int(port)), _CoordinatorRequestHandler)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot listen on {args.listen}: {e}")
+    server.coordinator = coordinator
+    server.secret = args.secret
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    address = '%s:%d' % server.server_address[:2]
+    print(f"[*] Coordinator on {address}: {len(targets)} targets x {len(wordlist)} words, "
+          f"{coordinator.total_leases} leases of {coordinator.lease_size} (depth {coordinator.depth})")
+    
+    workers = []
+    for i in range(args.local_workers):
+        command = [sys.executable, os.path.abspath(__file__), 'worker', f"http://{address}",
+                   '--name', f"local-{i + 1}"]
+        if args.resolvers:
+            command += ['--resolvers', args.resolvers]
+        # הסוד עובר בסביבה ולא בשורת הפקודה (שגלויה ב-ps)
+        env = dict(os.environ, **{SECRET_ENV: args.secret}) if args.secret else None
+        workers.append(subprocess.Popen(command, env=env))
+    
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    warned = False
+    try:
+        while not stopped.is_set() and not coordinator.wait(5.0):
+            status = coordinator.status()
+            leases = status['leases']
+            print(f"[*] Leases {leases['completed']}/{leases['total']} done, {leases['active']} active, "
+                  f"{len(status['workers'])} workers, {status['found']} names found")
+            if workers and not warned and all(worker.poll() is not None for worker in workers):
+                print("[!] All local workers exited; waiting for remote workers")
+                warned = True
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if coordinator.wait(0):
+            # workers שממתינים ל-lease מקבלים "done" לפני שהשרת נסגר
+            deadline = time.time() + 10
+            for worker in workers:
+                try:
+                    worker.wait(max(deadline - time.time(), 0.1))
+                except subprocess.TimeoutExpired:
+                    pass
+            if len(coordinator.workers) > len(workers):
+                time.sleep(min(coordinator.lease_ttl / 4, 2.0) + 0.5)  # workers מרוחקים
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+                worker.wait()
+        server.shutdown()
+        server.server_close()
+    
+    output_dir = args.output_dir or '.'
+    os.makedirs(output_dir, exist_ok=True)
+    for target, store in coordinator.results.items():
+        with open(os.path.join(output_dir, f"subdomains_{target}.txt"), 'w') as f:
+            for name in store:
+                f.write(name + '\n')
+    
+    status = coordinator.status()
+    leases = status['leases']
+    print(f"[+] Brute force {'completed' if status['done'] else 'stopped'} in {status['elapsed_s']}s: "
+          f"{status['found']} names from {status['queries']} queries "
+          f"({leases['completed']}/{leases['total']} leases, {leases['failed']} failed)")
+    print(f"[+] Results saved to {output_dir}/subdomains_<target>.txt")
+    if events is not None:
+        events.close()
+        sys.stdout = stdout
+    if isinstance(wordlist, CompiledWordlist):
+        wordlist.close()
+
+
+def worker_command(argv):
+    """subrecon worker - פתרון leases של coordinator על ה-resolvers והרשת של המכונה הזו"""
+    parser = argparse.ArgumentParser(
+        prog='subrecon worker',
+        description='Claim brute force leases from a `subrecon coordinator`, resolve them and stream results back')
+    parser.add_argument('coordinator', help=f"Coordinator URL (e.g. http://{DEFAULT_COORDINATOR})")
+    parser.add_argument('--name', help='Worker name shown by the coordinator (default: host-pid)')
+    parser.add_argument('--secret', default=os.environ.get(SECRET_ENV),
+                        help=f'Shared secret of the coordinator (default: ${SECRET_ENV})')
+    parser.add_argument('-t', '--threads', type=int, default=20,
+                        help='Starting concurrency per resolver; adapts at runtime (default: 20)')
+    add_context_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    url = args.coordinator if '://' in args.coordinator else f"http://{args.coordinator}"
+    context = build_context(args)
+    worker = BruteforceWorker(url, context, name=args.name, secret=args.secret)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"[*] Worker {worker.name} on {url}")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        context.close()
+        if args.dns_cache:
+            context.dns_cache.save()
+
+
+# פקודות משנה: subrecon <command> ...
+SUBCOMMANDS = {
+    'serve': serve,
+    'compile-wordlist': compile_wordlist_command,
+    'coordinator': coordinator_command,
+    'worker': worker_command,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
+    
     parser = argparse.ArgumentParser(
         description='Advanced Subdomain Enumeration Tool - No API Required',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
-    parser.add_argument('domain', help='Target domain (e.g., example.com)')
+    parser.add_argument('domain', nargs='?', help='Target domain (e.g., example.com)')
     parser.add_argument('-o', '--output', help='Output file')
-    parser.add_argument('-t', '--threads', type=int, default=20, help='Number of threads (default: 20)')
-    parser.add_argument('-w', '--wordlist', help='Custom wordlist for brute force')
+    parser.add_argument('-t', '--threads', type=int, default=20,
+                        help='Starting concurrency per resolver / HTTP host; adapts at runtime (default: 20)')
+    parser.add_argument('-w', '--wordlist',
+                        help='Custom wordlist for brute force (text, or compiled with compile-wordlist)')
+    parser.add_argument('--wordlist-shard', type=parse_shard, metavar='K/N',
+                        help='Brute force only part K of N of a compiled wordlist (e.g. 2/4); '
+                             'if the list was compiled with --no-builtin, shard 1 also tries the builtin words')
     parser.add_argument('--passive-only', action='store_true', help='Run only passive enumeration')
     parser.add_argument('--active-only', action='store_true', help='Run only active enumeration')
     parser.add_argument('--no-validate', action='store_true', help='Skip DNS validation')
     parser.add_argument('--fast', action='store_true', help='Fast mode (limited checks)')
     parser.add_argument('--timeout', type=int, default=30, help='Timeout in seconds (default: 30)')
+    parser.add_argument('--source-timeout', type=int, default=120, help='Time budget per passive source in seconds (default: 120)')
+    parser.add_argument('--permutation-budget', type=int, default=20000,
+                        help='Max permutation candidates to resolve (default: 20000)')
+    parser.add_argument('--permutation-rounds', type=int, default=3,
+                        help='Max permutation rounds on newly found names (default: 3)')
+    parser.add_argument('--recursive', action='store_true', help='Brute force below discovered names, guided by hit rate')
+    parser.add_argument('--depth', type=int, default=3, help='Max labels below the domain for --recursive (default: 3)')
+    parser.add_argument('--query-budget', type=int, default=100000,
+                        help='Total DNS queries for --recursive (default: 100000)')
+    parser.add_argument('--crawl-depth', type=int, default=2, help='Max link depth for the site crawler (default: 2)')
+    parser.add_argument('--crawl-pages', type=int, default=300, help='Max URLs fetched by the site crawler (default: 300)')
+    parser.add_argument('--since', nargs='?', const=True, metavar='STATE',
+                        help='Incremental rescan against the previous results; only new and stale names are '
+                             'resolved and a diff is written (default state: ~/.subrecon/state/<domain>.jsonl)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume an interrupted scan from its journal (and keep journaling)')
+    parser.add_argument('--journal', nargs='?', const=True, metavar='PATH',
+                        help='Journal progress so an interrupted scan can be resumed; removed when the scan '
+                             'completes (default path: ~/.subrecon/scans/<domain>.journal)')
+    add_context_arguments(parser)
+    parser.add_argument('--ndjson', metavar='FILE',
+                        help="Stream discovered/resolved/rejected events as JSON lines ('-' for stdout)")
+    parser.add_argument('--metrics-json', metavar='PATH', help='Write per-stage/source/resolver metrics as JSON')
+    parser.add_argument('--metrics-prom', metavar='PATH', help='Write metrics as a Prometheus textfile')
+    parser.add_argument('-T', '--targets', metavar='FILE', help="Batch mode: file with one domain per line ('-' for stdin)")
+    parser.add_argument('--output-dir', metavar='DIR', help='Batch mode: directory for per-target results (default: .)')
+    parser.add_argument('--parallel-targets', type=int, default=4, help='Batch mode: targets scanned at once (default: 4)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if not args.domain and not args.targets:
+        parser.error('a target domain or --targets is required')
+    if args.wordlist_shard and not (args.wordlist and CompiledWordlist.is_compiled(args.wordlist)):
+        parser.error('--wordlist-shard needs -w to be a compiled wordlist (see compile-wordlist)')
     
     # התאמות ל-fast mode
     if args.fast:
         args.threads = min(args.threads, 10)
         args.timeout = 15
+        args.source_timeout = min(args.source_timeout, 60)
+        args.permutation_budget = min(args.permutation_budget, 2000)
+        args.permutation_rounds = 1
+        args.crawl_depth = min(args.crawl_depth, 1)
+        args.crawl_pages = min(args.crawl_pages, 50)
     
-    # יצירת האובייקט
-    enumerator = SubdomainEnumerator(
-        domain=args.domain,
-        output_file=args.output,
-        threads=args.threads,
-        timeout=args.timeout
-    )
+    events = None
+    stdout = sys.stdout
+    if args.ndjson == '-':
+        # stdout שמור לאירועים; כל הפלט האנושי עובר ל-stderr
+        events = EventWriter(stdout)
+        sys.stdout = sys.stderr
+    elif args.ndjson:
+        events = EventWriter(args.ndjson)
     
-    # הרצה
-    enumerator.run(
-        passive=not args.active_only,
-        active=not args.passive_only,
-        validate=not args.no_validate,
-        wordlist=args.wordlist
-    )
+    context = build_context(args, events)
+    try:
+        if args.targets:
+            metrics = run_batch(args, context)
+        else:
+            metrics = [scan_target(args.domain, args, context, output_file=args.output).metrics]
+        if args.metrics_json or args.metrics_prom:
+            write_metrics(metrics, context.dns_engine.pool, args.metrics_json, args.metrics_prom)
+    finally:
+        context.close()
+        if events is not None:
+            events.close()
+            sys.stdout = stdout
+        if args.dns_cache:
+            context.dns_cache.save()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dns_stub import StubDNSServer  # noqa: E402
+from subrecon import ScanContext  # noqa: E402
+
+
+@pytest.fixture
+def dns_stub():
+    """start(zone) -> (server, context): ScanContext שכל השאילתות שלו הולכות ל-resolver מקומי"""
+    started = []
+
+    def start(zone):
+        server = StubDNSServer(zone)
+        context = ScanContext(nameservers=[server.address], dns_concurrency=50)
+        started.append((server, context))
+        return server, context
+
+    yield start
+    for server, context in started:
+        context.close()
+        server.close()
@@ -0,0 +1,84 @@
+"""resolver מקומי מינימלי לבדיקות: UDP על 127.0.0.1 עם zone קבוע בזיכרון"""
+
+import socket
+import struct
+import threading
+
+from subrecon import DNS_RECORD_TYPES, _read_dns_name
+
+
+def _encode_name(name):
+    return b''.join(bytes([len(label)]) + label.encode('ascii') for label in name.split('.')) + b'\x00'
+
+
+class StubDNSServer:
+    """zone: שם -> [(rtype, value)]; '*.zone' עונה לכל שם מתחת ל-zone שאינו ב-zone
+
+    [('SERVFAIL', None)] כרשומות של שם מחזיר SERVFAIL (כשל זמני של השרת).
+
+    CNAME מוחזר לבד, בלי הכתובות של היעד - כמו שרת סמכותי של zone אחר -
+    כך שהשלמת השרשרת נשארת לצד של הלקוח.
+    """
+
+    def __init__(self, zone):
+        self.zone = {name.lower(): records for name, records in zone.items()}
+        self.queries = 0
+        self.names = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(('127.0.0.1', 0))
+        self.address = '127.0.0.1:%d' % self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._sock.close()
+
+    def lookup(self, name):
+        if name in self.zone:
+            return self.zone[name]
+        parts = name.split('.')
+        for i in range(1, len(parts)):
+            records = self.zone.get('*.' + '.'.join(parts[i:]))
+            if records is not None:
+                return records
+        return None
+
+    def _serve(self):
+        while True:
+            try:
+                data, addr = self._sock.recvfrom(4096)
+            except OSError:
+                return
+            self.queries += 1
+            self._sock.sendto(self.answer(data), addr)
+
+    def answer(self, data):
+        txid = struct.unpack('>H', data[:2])[0]
+        name, offset = _read_dns_name(data, 12)
+        self.names.append(name)
+        qtype = struct.unpack('>H', data[offset:offset + 2])[0]
+        question = data[12:offset + 4]
+        records = self.lookup(name)
+        if records and records[0][0] == 'SERVFAIL':
+            return struct.pack('>HHHHHH', txid, 0x8182, 1, 0, 0, 0) + question
+        answers = []
+        for rtype, value in records or ():
+            if DNS_RECORD_TYPES[rtype] != qtype and rtype != 'CNAME':
+                continue
+            if rtype == 'A':
+                rdata = socket.inet_aton(value)
+            elif rtype == 'AAAA':
+                rdata = socket.inet_pton(socket.AF_INET6, value)
+            else:
+                rdata = _encode_name(value)
+            answers.append(_encode_name(name) + struct.pack('>HHIH', DNS_RECORD_TYPES[rtype], 1, 300, len(rdata))
+                           + rdata)
+        flags = 0x8180 if records is not None else 0x8183
+        header = struct.pack('>HHHHHH', txid, flags, 1, len(answers), 0, 0)
+        return header + question + b''.join(answers)
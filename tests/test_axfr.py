@@ -0,0 +1,20 @@
+from subrecon import SubdomainEnumerator, dnspython_resolver
+
+
+def test_dnspython_resolver_keeps_nameserver_port():
+    resolver = dnspython_resolver(['127.0.0.1:5353', '[::1]:5300', '9.9.9.9'])
+    assert [(ns.address, ns.port) for ns in resolver.nameservers] == [('127.0.0.1', 5353), ('::1', 5300), ('9.9.9.9', 53)]
+
+
+def test_axfr_queries_the_configured_resolver(dns_stub):
+    server, context = dns_stub({
+        'example.com': [('NS', 'ns1.example.com')],
+        'ns1.example.com': [('A', '127.0.0.1')],
+    })
+    messages = []
+    enumerator = SubdomainEnumerator('example.com', context=context, write_files=False, timeout=2,
+                                     on_status=lambda status, message: messages.append(message))
+    enumerator.dns_axfr_advanced()
+    assert 'Found NS: ns1.example.com' in messages
+    assert not any('AXFR error' in message for message in messages)
+    assert server.queries >= 2
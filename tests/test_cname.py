@@ -0,0 +1,54 @@
+from subrecon import CNAMEMemo
+
+
+def resolve_all(context, names, memo):
+    results = {}
+
+    def on_result(result):
+        results[result.name] = result
+
+    engine = context.dns_engine
+    engine.submit(engine.resolve_many(names, 'ADDR', on_result, cname_memo=memo)).result(timeout=10)
+    return results
+
+
+def test_shared_cname_target_is_resolved_once(dns_stub):
+    server, context = dns_stub({
+        'www.example.com': [('CNAME', 'edge.cdn.example.net')],
+        'app.example.com': [('CNAME', 'edge.cdn.example.net')],
+        'edge.cdn.example.net': [('A', '10.0.0.9')],
+    })
+    memo = CNAMEMemo()
+    results = resolve_all(context, ['www.example.com', 'app.example.com'], memo)
+    for name in ('www.example.com', 'app.example.com'):
+        assert results[name].found
+        assert ('edge.cdn.example.net', 'A', 300, '10.0.0.9') in results[name].records
+    assert list(memo) == ['edge.cdn.example.net']
+    assert server.queries == 6  # A+AAAA לכל שם, והיעד המשותף פעם אחת
+    assert memo.waiting == {}
+
+
+def test_cname_cycle_does_not_deadlock(dns_stub):
+    _server, context = dns_stub({
+        'x.example.com': [('CNAME', 'a.example.net')],
+        'a.example.net': [('CNAME', 'x.example.com')],
+    })
+    results = resolve_all(context, ['x.example.com'], CNAMEMemo())
+    result = results['x.example.com']
+    assert not result.found
+    assert ('x.example.com', 'CNAME', 300, 'a.example.net') in result.records
+
+
+def test_cycle_across_concurrent_chains_does_not_deadlock(dns_stub):
+    # x -> a -> b -> a ו-y -> b -> a -> b: כל שרשרת ממתינה ל-future של השנייה
+    _server, context = dns_stub({
+        'x.example.com': [('CNAME', 'a.example.net')],
+        'y.example.com': [('CNAME', 'b.example.net')],
+        'a.example.net': [('CNAME', 'b.example.net')],
+        'b.example.net': [('CNAME', 'a.example.net')],
+    })
+    memo = CNAMEMemo()
+    results = resolve_all(context, ['x.example.com', 'y.example.com'], memo)
+    assert set(results) == {'x.example.com', 'y.example.com'}
+    assert not any(result.found for result in results.values())
+    assert memo.waiting == {}
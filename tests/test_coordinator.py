@@ -0,0 +1,121 @@
+import os
+import tempfile
+import time
+
+import pytest
+
+from subrecon import BruteforceCoordinator, CompiledWordlist, coordinator_command, load_coordinator_wordlist
+
+
+def claim(coordinator, worker='w1'):
+    return coordinator.claim(worker)['lease']
+
+
+def test_lease_lifecycle_and_reassignment():
+    coordinator = BruteforceCoordinator(['example.com'], ['www', 'api', 'mail'], lease_size=2, lease_ttl=30)
+    first = claim(coordinator)
+    assert (first['start'], first['stop'], first['words']) == (0, 2, ['www', 'api'])
+
+    assert coordinator.report(first['id'], first['token'], [{'name': 'www.example.com', 'records': [['A', '1.2.3.4']]},
+                                                          {'name': 'www.other.com'}])
+    assert list(coordinator.results['example.com']) == ['www.example.com']
+
+    # ה-lease פג ומוקצה מחדש עם token חדש
+    coordinator._leases[first['id']].expires = 0
+    second = claim(coordinator, 'w2')
+    assert second['id'] == first['id'] and second['token'] != first['token']
+
+    # תוצאה מאוחרת מה-worker הקודם מתמזגת, אבל הוא כבר לא מחזיק את ה-lease
+    assert not coordinator.report(first['id'], first['token'], [{'name': 'api.example.com'}])
+    assert 'api.example.com' in coordinator.results['example.com']
+    assert not coordinator.complete(first['id'], first['token'])
+    assert coordinator.complete(second['id'], second['token'], queried=2)
+
+    # אחרי שה-lease נסגר גם ה-token הישן נדחה
+    assert not coordinator.report(first['id'], first['token'], [{'name': 'late.example.com'}])
+    assert 'late.example.com' not in coordinator.results['example.com']
+
+    third = claim(coordinator)
+    assert third['words'] == ['mail']
+    assert coordinator.complete(third['id'], third['token'], queried=1)
+    assert coordinator.wait(0)
+    assert coordinator.status()['queries'] == 3
+
+
+def test_reports_for_unissued_leases_are_rejected():
+    coordinator = BruteforceCoordinator(['example.com'], ['www', 'api'], lease_size=1, depth=2)
+    lease = claim(coordinator)
+    assert not coordinator.report(lease['id'] + 100, lease['token'], [{'name': 'x.example.com'}])
+    assert not coordinator.report(lease['id'], 'forged', [{'name': 'y.example.com'}])
+    pending = coordinator._next_lease()  # נחתך אבל מעולם לא הוקצה - אין לו token
+    assert not coordinator.report(pending.id, None, [{'name': 'z.example.com'}])
+    assert len(coordinator.results['example.com']) == 0
+
+
+def test_depth_comes_from_the_lease():
+    coordinator = BruteforceCoordinator(['example.com'], ['dev'], lease_size=1, depth=2)
+    lease = claim(coordinator)
+    before = coordinator.total_leases
+    coordinator.report(lease['id'], lease['token'], [{'name': 'dev.example.com'}])
+    assert coordinator.total_leases == before + 1  # dev.example.com נכנס כ-parent ברמה 2
+    coordinator.complete(lease['id'], lease['token'])
+    nested = claim(coordinator)
+    assert (nested['parent'], nested['depth']) == ('dev.example.com', 2)
+    coordinator.report(nested['id'], nested['token'], [{'name': 'dev.dev.example.com'}])
+    assert coordinator.total_leases == before + 1  # עומק 2 הוא המקסימום
+
+
+def test_lease_fails_after_max_attempts():
+    coordinator = BruteforceCoordinator(['example.com'], ['www'], lease_size=1, max_attempts=2)
+    for _ in range(2):
+        claim(coordinator)
+        for lease in coordinator._leases.values():
+            lease.expires = 0
+    assert coordinator.claim('w1') == {'done': True}
+    assert len(coordinator.failed) == 1
+
+
+def test_text_wordlist_is_served_from_a_compiled_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    path = tmp_path / 'words.txt'
+    path.write_text('Zeta\nwww\nbad word\nzeta\n')
+    wordlist = load_coordinator_wordlist(str(path))
+    try:
+        assert isinstance(wordlist, CompiledWordlist) and wordlist.includes_builtin
+        words = list(wordlist)
+        assert words == sorted(set(words))
+        assert 'zeta' in words and 'bad word' not in words and 'mail' in words
+        assert os.listdir(str(tmp_path)) == ['words.txt']  # העותק המקומפל כבר נמחק מהדיסק
+    finally:
+        wordlist.close()
+
+
+def test_public_listen_requires_secret(monkeypatch, capsys):
+    monkeypatch.delenv('SUBRECON_SECRET', raising=False)
+    with pytest.raises(SystemExit):
+        coordinator_command(['example.com', '--listen', '0.0.0.0:0'])
+    assert '--secret' in capsys.readouterr().err
+
+
+def test_local_workers_against_stub_resolver(dns_stub, tmp_path, monkeypatch):
+    server, _context = dns_stub({
+        'www.example.com': [('A', '10.0.0.1')],
+        'api.example.com': [('A', '10.0.0.2')],
+        'dev.api.example.com': [('A', '10.0.0.3')],
+        'mail.example.org': [('A', '10.0.0.4')],
+    })
+    wordlist = tmp_path / 'words.txt'
+    wordlist.write_text('\n'.join(['www', 'api', 'dev', 'mail'] + ['w%d' % i for i in range(40)]) + '\n')
+    monkeypatch.setenv('SUBRECON_SECRET', 'local-secret')
+    started = time.time()
+    coordinator_command(['example.com', 'example.org', '-w', str(wordlist), '--depth', '2',
+                         '--lease-size', '500', '--local-workers', '2', '--listen', '127.0.0.1:0',
+                         '--resolvers', server.address, '--output-dir', str(tmp_path / 'out')])
+    assert time.time() - started < 60
+
+    def found(target):
+        with open(os.path.join(str(tmp_path / 'out'), 'subdomains_%s.txt' % target)) as f:
+            return f.read().split()
+
+    assert found('example.com') == ['api.example.com', 'dev.api.example.com', 'www.example.com']
+    assert found('example.org') == ['mail.example.org']
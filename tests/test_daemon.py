@@ -0,0 +1,110 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from subrecon import JobManager, ScanJob, create_job_server, is_loopback_listen, serve
+
+
+@pytest.fixture
+def daemon(dns_stub, tmp_path):
+    """start(secret=None) -> base URL של daemon על ה-resolver המקומי, עם wordlist_dir"""
+    _server, context = dns_stub({'www.example.com': [('A', '10.0.0.1')], 'api.example.com': [('A', '10.0.0.2')]})
+    (tmp_path / 'lists').mkdir()
+    (tmp_path / 'lists' / 'words.txt').write_text('www\napi\nnope\n')
+    (tmp_path / 'secret.txt').write_text('www\n')
+    manager = JobManager(context, max_jobs=1, wordlist_dir=str(tmp_path / 'lists'))
+    servers = []
+
+    def start(secret=None):
+        server = create_job_server(manager, '127.0.0.1:0', secret=secret)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return 'http://127.0.0.1:%d' % server.server_address[1], manager
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    manager.close()
+
+
+def submit(base, spec, **kwargs):
+    return requests.post(base + '/jobs?stream=1', json=spec, timeout=30, **kwargs)
+
+
+def test_non_json_body_is_rejected(daemon):
+    base, manager = daemon()
+    response = requests.post(base + '/jobs', data=json.dumps({'domain': 'example.com'}),
+                             headers={'Content-Type': 'text/plain'}, timeout=5)
+    assert response.status_code == 400
+    assert 'application/json' in response.json()['error']
+    assert manager.list() == []
+
+
+def test_wordlist_must_be_inside_wordlist_dir(daemon, tmp_path):
+    base, _manager = daemon()
+    for name in (str(tmp_path / 'secret.txt'), '../secret.txt', '/etc/passwd', 'missing.txt'):
+        response = requests.post(base + '/jobs', json={'domain': 'example.com', 'wordlist': name}, timeout=5)
+        assert response.status_code == 400, name
+
+    lines = [json.loads(line) for line in submit(base, {'domain': 'example.com', 'passive': False,
+                                                        'wordlist': 'words.txt'}).iter_lines()]
+    assert lines[-1]['status'] == 'done'
+    results = requests.get(base + '/jobs/%s/results' % lines[-1]['job'], timeout=5).json()
+    assert {'www.example.com', 'api.example.com'} <= set(results['all'])
+
+
+def test_wordlist_rejected_without_wordlist_dir():
+    with pytest.raises(ValueError, match='wordlist-dir'):
+        JobManager.parse_spec({'domain': 'example.com', 'wordlist': 'words.txt'})
+
+
+def test_secret_is_required_when_configured(daemon):
+    base, _manager = daemon(secret='s3cret')
+    assert requests.get(base + '/health', timeout=5).status_code == 401
+    assert requests.get(base + '/health', headers={'Authorization': 'Bearer nope'}, timeout=5).status_code == 401
+    assert requests.get(base + '/health', headers={'Authorization': 'Bearer s3cret'}, timeout=5).status_code == 200
+
+
+def test_public_listen_requires_secret(monkeypatch, capsys):
+    monkeypatch.delenv('SUBRECON_SECRET', raising=False)
+    with pytest.raises(SystemExit):
+        serve(['--listen', '0.0.0.0:0'])
+    assert '--secret' in capsys.readouterr().err
+
+
+def test_loopback_listen_detection():
+    assert is_loopback_listen('127.0.0.1:8765')
+    assert is_loopback_listen('localhost:8765')
+    assert is_loopback_listen('[::1]:8765')
+    assert is_loopback_listen(':8765')
+    assert not is_loopback_listen('0.0.0.0:8765')
+    assert not is_loopback_listen('10.1.2.3:8765')
+
+
+def test_finished_job_keeps_results_but_not_the_enumerator(daemon):
+    base, manager = daemon()
+    lines = [json.loads(line) for line in submit(base, {'domain': 'example.com', 'passive': False,
+                                                        'wordlist': 'words.txt'}).iter_lines()]
+    job = manager.get(lines[-1]['job'])
+    assert job.enumerator is None
+    info = requests.get(base + '/jobs/' + job.id, timeout=5).json()
+    assert info['found'] == len(job.results()['all']) >= 2
+    assert job.results()['status'] == 'done'
+
+
+def test_event_history_is_capped():
+    class SmallJob(ScanJob):
+        MAX_EVENTS = 5
+
+    job = SmallJob('example.com', {})
+    for i in range(12):
+        job.emit('discovered', 'example.com', name='w%d.example.com' % i)
+    job.set_status('done')
+    assert job.dropped == 8
+    followed = [json.loads(line) for batch in job.follow() for line in batch]
+    assert [line.get('name') for line in followed][:4] == ['w8.example.com', 'w9.example.com',
+                                                           'w10.example.com', 'w11.example.com']
+    assert followed[-1]['status'] == 'done'
@@ -0,0 +1,81 @@
+import json
+import time
+
+from subrecon import DNSCache, DNSResult
+
+
+def a_result(name, address='10.0.0.1', ttl=300):
+    return DNSResult(name, 'A', 'NOERROR', [(name, 'A', ttl, address)], (), ('1.1.1.1', 53))
+
+
+def test_get_respects_ttl():
+    cache = DNSCache()
+    cache.put(a_result('www.example.com'))
+    assert cache.get('www.example.com', 'A').values('A') == ['10.0.0.1']
+    assert cache.get('www.example.com', 'AAAA') is None
+
+
+def test_negative_answer_uses_soa_minimum():
+    soa = ('example.com', 'SOA', 600, ('ns1.example.com', 60))
+    cache = DNSCache()
+    cache.put(DNSResult('nope.example.com', 'A', 'NXDOMAIN', (), (soa,), None))
+    assert DNSCache.ttl_for('NXDOMAIN', 'A', (), (soa,)) == 60
+    assert cache.get('nope.example.com', 'A').rcode == 'NXDOMAIN'
+
+
+def test_transient_errors_are_not_cached():
+    cache = DNSCache()
+    cache.put(DNSResult('www.example.com', 'A', 'SERVFAIL'))
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = DNSCache(max_entries=2)
+    for name in ('a.example.com', 'b.example.com'):
+        cache.put(a_result(name))
+    cache.get('a.example.com', 'A')
+    cache.put(a_result('c.example.com'))
+    assert cache.get('b.example.com', 'A') is None
+    assert cache.get('a.example.com', 'A') is not None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'cache.jsonl')
+    cache = DNSCache(path=path)
+    cache.put(a_result('www.example.com'))
+    cache.put(a_result('api.example.com', '10.0.0.2'))
+    cache.save()
+
+    loaded = DNSCache(path=path)
+    assert loaded.load() == 2
+    assert loaded.get('api.example.com', 'A').values('A') == ['10.0.0.2']
+
+
+def test_load_skips_expired_entries(tmp_path):
+    path = tmp_path / 'cache.jsonl'
+    path.write_text(json.dumps(['old.example.com', 'A', time.time() - 1, 'NOERROR', [], None]) + '\n')
+    cache = DNSCache(path=str(path))
+    assert cache.load() == 0
+    assert cache.skipped == 0
+
+
+def test_load_skips_corrupt_lines(tmp_path):
+    path = str(tmp_path / 'cache.jsonl')
+    cache = DNSCache(path=path)
+    cache.put(a_result('www.example.com'))
+    cache.put(a_result('api.example.com'))
+    cache.save()
+    with open(path) as f:
+        lines = f.read().splitlines()
+    # שורה קטועה באמצע, שורה במבנה לא נכון וזבל בינארי
+    lines.insert(1, lines[0][:25])
+    lines.append(json.dumps(['x.example.com', 'A']))
+    lines.append('\x00\x01garbage')
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines))
+
+    loaded = DNSCache(path=path)
+    assert loaded.load() == 2
+    assert loaded.skipped == 3
+    assert loaded.get('www.example.com', 'A') is not None
+    assert loaded.get('api.example.com', 'A') is not None
@@ -0,0 +1,28 @@
+import io
+import json
+import time
+
+from subrecon import EventWriter
+
+
+def test_quiet_event_is_flushed_by_timer():
+    out = io.StringIO()
+    events = EventWriter(out)
+    events.FLUSH_INTERVAL = 0.05
+    events.emit('discovered', 'example.com', name='www.example.com', source='crt.sh')
+    events.emit('discovered', 'example.com', name='dev.example.com', source='crt.sh')
+    deadline = time.monotonic() + 2
+    while out.getvalue().count('\n') < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [line['name'] for line in lines] == ['www.example.com', 'dev.example.com']
+    events.close()
+    assert not events._flusher.is_alive()
+
+
+def test_close_flushes_buffer_to_file(tmp_path):
+    path = tmp_path / 'events.ndjson'
+    events = EventWriter(str(path))
+    events.emit('completed', 'example.com', found=3)
+    events.close()
+    assert json.loads(path.read_text())['found'] == 3
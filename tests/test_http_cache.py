@@ -0,0 +1,68 @@
+import os
+
+import pytest
+import requests
+
+from subrecon import CachedBody, HTTPCache
+
+
+class FakeResponse:
+    def __init__(self, etag='"v1"'):
+        self.headers = {'ETag': etag, 'Content-Type': 'application/json'}
+        self.encoding = 'utf-8'
+
+
+URL = 'https://crt.sh/?q=%25.example.com&output=json'
+
+
+def test_lookup_streams_body_from_disk(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    body = b'[' + b','.join(b'{"name_value": "w%d.example.com"}' % i for i in range(20000)) + b']'
+    cache.store(URL, FakeResponse(), body)
+
+    meta, cached = cache.lookup(URL)
+    assert isinstance(cached, CachedBody)
+    assert meta['etag'] == '"v1"'
+    assert cached.read(100) == body[:100]
+    cached.close()
+
+    response = HTTPCache.build_response(URL, *cache.lookup(URL))
+    chunks = list(response.iter_content(4096))
+    assert max(len(chunk) for chunk in chunks) <= 4096
+    assert b''.join(chunks) == body
+    assert HTTPCache.build_response(URL, *cache.lookup(URL)).json()[-1] == {'name_value': 'w19999.example.com'}
+    assert response.headers['X-Subrecon-Cache'] == 'hit'
+
+
+def test_refresh_rewrites_only_the_sidecar(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store(URL, FakeResponse(), b'body')
+    meta, _body = cache.lookup(URL)
+    body_path = os.path.join(str(tmp_path), HTTPCache._file_name(URL))
+    inode = os.stat(body_path).st_ino
+
+    cache.refresh(URL, dict(meta, stored=0))
+    meta, body = cache.lookup(URL)
+    assert meta['stored'] > 0
+    assert os.stat(body_path).st_ino == inode
+    assert body.read() == b'body'
+
+
+def test_missing_or_foreign_meta_is_a_miss(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    assert cache.lookup(URL) is None
+    cache.store(URL, FakeResponse(), b'body')
+    with open(cache._meta_path(HTTPCache._file_name(URL)), 'w') as f:
+        f.write('{"url": "https://other/"}')
+    assert cache.lookup(URL) is None
+
+
+def test_corrupt_body_raises_decoding_error(tmp_path):
+    cache = HTTPCache(str(tmp_path))
+    cache.store(URL, FakeResponse(), b'body' * 1000)
+    with open(os.path.join(str(tmp_path), HTTPCache._file_name(URL)), 'r+b') as f:
+        f.seek(10)
+        f.write(b'\xff' * 16)
+    response = HTTPCache.build_response(URL, *cache.lookup(URL))
+    with pytest.raises(requests.exceptions.ContentDecodingError):
+        response.content
@@ -0,0 +1,68 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from subrecon import HostConcurrency, ScanContext, SubdomainEnumerator
+
+
+class ChunkedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(4 * 65536))
+        self.end_headers()
+        for _ in range(4):
+            self.wfile.write(b'x' * 65536)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ChunkedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%d/' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def enumerator():
+    context = ScanContext(nameservers=['127.0.0.1:9'])
+    yield SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False)
+    context.close()
+
+
+def inflight(enumerator):
+    return enumerator.http_limits._get('127.0.0.1')[0].inflight
+
+
+def test_session_pool_matches_max_concurrency(enumerator):
+    for prefix in ('http://', 'https://'):
+        assert enumerator.session.get_adapter(prefix + 'example.com')._pool_maxsize == HostConcurrency.MAXIMUM
+
+
+def test_stream_holds_slot_until_body_is_read(enumerator, http_server):
+    response = enumerator.http_get(http_server, stream=True)
+    assert inflight(enumerator) == 1
+    body = b''.join(response.iter_content(65536))
+    assert len(body) == 4 * 65536
+    assert inflight(enumerator) == 0
+    response.close()
+    assert inflight(enumerator) == 0
+
+
+def test_stream_slot_is_released_on_close(enumerator, http_server):
+    with enumerator.http_get(http_server, stream=True) as response:
+        next(response.iter_content(1024))
+        assert inflight(enumerator) == 1
+    assert inflight(enumerator) == 0
+
+
+def test_plain_get_releases_slot_immediately(enumerator, http_server):
+    response = enumerator.http_get(http_server)
+    assert len(response.content) == 4 * 65536
+    assert inflight(enumerator) == 0
@@ -0,0 +1,90 @@
+import json
+
+from subrecon import ScanJournal, StreamProgress, SubdomainEnumerator
+
+
+def test_stream_progress_watermark_waits_for_oldest():
+    progress = StreamProgress(start=10)
+    items = list(progress.track(['a', 'b', 'c', 'a']))
+    assert items == ['a', 'b', 'c', 'a']
+    progress.complete('b')
+    progress.complete('c')
+    assert progress.watermark == 10
+    progress.complete('a')
+    assert progress.watermark == 13
+    progress.complete('a')
+    assert progress.watermark == 14
+
+
+def test_load_restores_progress_and_skips_truncated_line(tmp_path):
+    path = str(tmp_path / 'scan.journal')
+    journal = ScanJournal(path)
+    assert journal.open({'domain': 'example.com', 'wordlist': None}) is False
+    journal.source_done('crt.sh')
+    journal.stage_done('passive')
+    journal.record_discovered('www.example.com', 'crt.sh')
+    journal.record_validated('www.example.com')
+    journal.record_bruteforce(1234, force=True)
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('{"t": "bf", "offs')  # קריסה באמצע כתיבה
+
+    resumed = ScanJournal(path)
+    assert resumed.open({'domain': 'example.com', 'wordlist': None}, resume=True) is True
+    resumed.close()
+    assert resumed.sources_done == {'crt.sh'}
+    assert resumed.stages_done == {'passive'}
+    assert resumed.discovered == {'www.example.com': 'crt.sh'}
+    assert resumed.validated == {'www.example.com'}
+    assert resumed.bruteforce_offset == 1234
+
+
+def test_resume_with_another_wordlist_restarts_bruteforce(tmp_path):
+    path = str(tmp_path / 'scan.journal')
+    journal = ScanJournal(path)
+    journal.open({'domain': 'example.com', 'wordlist': 'a.txt'})
+    journal.record_bruteforce(500, force=True)
+    journal.stage_done('bruteforce')
+    journal.close()
+
+    resumed = ScanJournal(path)
+    assert resumed.open({'domain': 'example.com', 'wordlist': 'b.txt'}, resume=True)
+    resumed.close()
+    assert resumed.bruteforce_offset == 0
+    assert 'bruteforce' not in resumed.stages_done
+
+
+def test_discard_removes_the_journal(tmp_path):
+    path = tmp_path / 'scan.journal'
+    journal = ScanJournal(str(path))
+    journal.open({'domain': 'example.com'})
+    journal.discard()
+    assert not path.exists()
+
+
+def test_bruteforce_resumes_from_journal_offset(tmp_path, dns_stub):
+    words = [f"w{i}" for i in range(300)]
+    zone = {f"w{i}.example.com": [('A', '10.0.0.1')] for i in (5, 150, 299)}
+    server, context = dns_stub(zone)
+
+    path = str(tmp_path / 'scan.journal')
+    journal = ScanJournal(path)
+    journal.open({'domain': 'example.com', 'wordlist': 'words'})
+    journal.record_discovered('w5.example.com', 'bruteforce')
+    journal.record_bruteforce(100, force=True)
+    journal.close()
+
+    journal = ScanJournal(path)
+    assert journal.open({'domain': 'example.com', 'wordlist': 'words'}, resume=True)
+    enumerator = SubdomainEnumerator('example.com', context=context, journal=journal, quiet=True,
+                                     write_files=False)
+    enumerator.resume_from_journal()
+    enumerator.dns_bruteforce_advanced(words)
+    journal.close()
+
+    assert set(enumerator.subdomains) == {'w5.example.com', 'w150.example.com', 'w299.example.com'}
+    # רק המילים מה-offset ואילך נשאלו (ועוד בדיקות ה-wildcard)
+    assert 200 <= server.queries < 220
+    with open(path) as f:
+        offsets = [event['offset'] for event in map(json.loads, f) if event['t'] == 'bf']
+    assert offsets[-1] == 300
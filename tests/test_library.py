@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import pytest
+import requests
+
+import subrecon
+from subrecon import AsyncDNSEngine, CancelToken, enumerate_subdomains, iter_subdomains
+
+WORDS = 20000
+
+
+@pytest.fixture
+def scan(dns_stub, tmp_path):
+    """(server, kwargs) לסריקה אקטיבית ארוכה מול ה-resolver המקומי"""
+    zone = {'w%d.example.com' % i: [('A', '10.0.0.1')] for i in range(0, WORDS, 10)}
+    zone['www.example.com'] = [('A', '10.0.0.2')]
+    server, _context = dns_stub(zone)
+    wordlist = tmp_path / 'words.txt'
+    wordlist.write_text('\n'.join('w%d' % i for i in range(WORDS)) + '\n')
+    return server, {'passive': False, 'validate': False, 'wordlist': str(wordlist),
+                    'nameservers': [server.address], 'recursive': False}
+
+
+def scan_threads():
+    return [t for t in threading.enumerate() if t.name.startswith('scan-')]
+
+
+def test_early_break_cancels_only_this_scan(scan):
+    server, kwargs = scan
+    shared = CancelToken()
+    results = iter_subdomains('example.com', cancel=shared, **kwargs)
+    first = next(result for result in results if result.kind == 'discovered')
+    assert first.name.endswith('.example.com')
+    results.close()
+    assert scan_threads() == []
+    assert len(server.names) < WORDS
+    assert not shared.cancelled
+
+
+def test_external_token_cancels_mid_scan(scan):
+    server, kwargs = scan
+    token = CancelToken()
+
+    async def consume():
+        kinds = []
+        async for result in enumerate_subdomains('example.com', cancel=token, **kwargs):
+            kinds.append(result.kind)
+            if result.kind == 'discovered':
+                token.cancel()
+        return kinds
+
+    kinds = asyncio.run(consume())
+    assert 'discovered' in kinds and 'completed' not in kinds
+    assert len(server.names) < WORDS
+    assert scan_threads() == []
+
+
+def test_scan_error_propagates_from_worker(scan, monkeypatch):
+    _server, kwargs = scan
+
+    def broken(self, **_kwargs):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(subrecon.SubdomainEnumerator, 'run', broken)
+    with pytest.raises(RuntimeError, match='boom'):
+        list(iter_subdomains('example.com', **kwargs))
+    assert scan_threads() == []
+
+
+def test_caller_resolver_and_session_stay_open(scan):
+    server, kwargs = scan
+    kwargs.pop('nameservers')
+    kwargs['wordlist'] = None  # ה-wordlist המובנה מספיק כאן
+    engine = AsyncDNSEngine([server.address])
+    session = requests.Session()
+    closed = []
+    session.close = lambda: closed.append(True)
+    try:
+        found = [r.name for r in iter_subdomains('example.com', resolver=engine, session=session, **kwargs)
+                 if r.kind == 'discovered']
+        assert 'www.example.com' in found
+        assert closed == []
+        assert engine.run(engine.query('w20.example.com')).found
+    finally:
+        engine.close()
+
+
+def test_resolver_with_nameservers_or_cache_is_rejected(scan):
+    server, kwargs = scan
+    engine = AsyncDNSEngine([server.address])
+    for extra in ({'nameservers': [server.address]}, {'dns_cache': subrecon.DNSCache()}):
+        with pytest.raises(ValueError, match='resolver='):
+            list(iter_subdomains('example.com', resolver=engine, **dict(kwargs, **extra)))
+    assert engine.loop is None  # לא נוצרה תשתית ולא התחילה סריקה
@@ -0,0 +1,89 @@
+import threading
+
+from subrecon import SubdomainEnumerator
+
+
+def test_stage_dns_counts_are_per_target_on_a_shared_engine(dns_stub):
+    zone = {'w1.a.example': [('A', '10.0.0.1')], 'w2.b.example': [('A', '10.0.0.2')]}
+    server, context = dns_stub(zone)
+    sizes = {'a.example': 100, 'b.example': 400}
+    enumerators = {domain: SubdomainEnumerator(domain, context=context, quiet=True, write_files=False)
+                   for domain in sizes}
+
+    def scan(domain):
+        words = [f"w{i}" for i in range(sizes[domain])]
+        enumerators[domain]._timed_stage('bruteforce', enumerators[domain].dns_bruteforce_advanced, words)
+
+    threads = [threading.Thread(target=scan, args=(domain,)) for domain in sizes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for domain, size in sizes.items():
+        stage = enumerators[domain].metrics.to_dict()['stages']['bruteforce']
+        # המילים עצמן ועוד בדיקות ה-wildcard של ה-zone (לכל היותר כמה שאילתות)
+        assert size <= stage['dns_queries'] <= size + 10, (domain, stage)
+        assert stage['dns_latency_avg_ms'] is not None
+    total = sum(e.metrics.to_dict()['stages']['bruteforce']['dns_queries'] for e in enumerators.values())
+    assert total == context.dns_engine.pool.total_queries()
+
+
+def test_cache_hits_are_counted_separately(dns_stub):
+    server, context = dns_stub({'w0.example.com': [('A', '10.0.0.1')]})
+    words = [f"w{i}" for i in range(50)]
+    first = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False)
+    first._timed_stage('bruteforce', first.dns_bruteforce_advanced, words)
+    second = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False)
+    second._timed_stage('bruteforce', second.dns_bruteforce_advanced, words)
+
+    stage = second.metrics.to_dict()['stages']['bruteforce']
+    # רק בדיקות ה-wildcard (תוויות אקראיות) יוצאות שוב לרשת
+    assert stage['dns_queries'] <= 6
+    assert stage['dns_cache_hits'] >= 50
+
+
+def test_active_sources_record_wall_time_and_status(dns_stub, tmp_path):
+    _server, context = dns_stub({'www.example.com': [('A', '10.0.0.1')], 'api.example.com': [('A', '10.0.0.2')]})
+    wordlist = tmp_path / 'words.txt'
+    wordlist.write_text('www\napi\nnope\n')
+    enumerator = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False)
+    enumerator.run(passive=False, active=True, validate=True, wordlist=str(wordlist))
+
+    sources = enumerator.metrics.to_dict()['sources']
+    assert sources['axfr']['status'] == 'ok'
+    for label in ('bruteforce', 'hidden'):
+        assert sources[label]['status'] == 'ok', label
+        assert sources[label]['wall_s'] > 0, label
+    assert sources['bruteforce']['new_names'] >= 2
+    durations = [line for line in enumerator.metrics.prometheus_lines()
+                 if line.startswith('subrecon_source_duration_seconds') and 'source="bruteforce"' in line]
+    assert len(durations) == 1 and float(durations[0].rsplit(' ', 1)[1]) > 0
+
+
+def test_abandoned_source_adds_nothing_and_stays_timed_out(dns_stub):
+    _server, context = dns_stub({})
+    enumerator = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False,
+                                     source_timeout=0)
+    finished = threading.Event()
+
+    def slow_source():
+        run = enumerator._source_ctx.run
+        enumerator.add_subdomain('early.example.com', 'slow')
+        run.abandoned.wait(30)
+        enumerator.add_subdomain('late.example.com', 'slow')
+        finished.set()
+
+    enumerator.slow_source = slow_source
+    enumerator.PASSIVE_SOURCES = [('slow', 'slow_source')]
+    enumerator.run_passive_enumeration()
+    assert finished.wait(10)
+    for thread in threading.enumerate():
+        if thread.name.startswith('passive'):
+            thread.join(10)  # ה-finally של המקור כבר רץ
+
+    assert 'early.example.com' in enumerator.subdomains
+    assert 'late.example.com' not in enumerator.subdomains
+    source = enumerator.metrics.to_dict()['sources']['slow']
+    # הרישום של ה-thread הראשי (timeout אחרי source_timeout) לא נדרס כשהמקור מסיים מאוחר
+    assert (source['status'], source['wall_s'], source['new_names']) == ('timeout', 0, 1)
@@ -0,0 +1,55 @@
+from subrecon import PermutationEngine, SubdomainEnumerator
+
+
+def test_candidates_in_order_and_only_once():
+    engine = PermutationEngine('example.com', seed_tokens=('dev',))
+    candidates = list(engine.candidates(['api01.example.com']))
+    assert candidates[:3] == ['api02.example.com', 'api00.example.com', 'api03.example.com']
+    assert candidates[3:] == ['dev01.example.com', 'dev-api01.example.com', 'api01-dev.example.com',
+                              'devapi01.example.com', 'api01dev.example.com', 'dev.api01.example.com']
+    assert list(engine.candidates(['api01.example.com'])) == []
+
+
+def test_known_names_and_foreign_names_are_skipped():
+    engine = PermutationEngine('example.com', seed_tokens=('dev',))
+    known = {'api02.example.com', 'dev-api01.example.com'}
+    candidates = list(engine.candidates(['api01.example.com', 'www.other.com'], is_known=known.__contains__))
+    assert not known & set(candidates)
+    assert all(name.endswith('.example.com') for name in candidates)
+
+
+def test_learned_tokens_come_before_seed():
+    engine = PermutationEngine('example.com', seed_tokens=('dev', 'test'))
+    engine.learn(['staging.example.com', 'api-staging.example.com', 'mail.example.com', 'www.other.com'])
+    assert engine.tokens() == ['staging', 'dev', 'test']
+
+
+def hidden_scan(context, **options):
+    messages = []
+    enumerator = SubdomainEnumerator('example.com', context=context, write_files=False,
+                                     on_status=lambda status, message: messages.append(message), **options)
+    enumerator.add_subdomain('api01.example.com', 'test')
+    enumerator.find_hidden_subdomains()
+    return enumerator, messages[-1]
+
+
+ZONE = {'api0%d.example.com' % i: [('A', '10.0.0.%d' % i)] for i in range(1, 5)}
+
+
+def test_rounds_chain_from_new_findings(dns_stub):
+    _server, context = dns_stub(ZONE)
+    one, summary = hidden_scan(context, permutation_rounds=1)
+    assert {'api02.example.com', 'api03.example.com'} <= set(one.subdomains)
+    assert 'api04.example.com' not in one.subdomains
+    assert '(1 rounds' in summary
+
+    two, _summary = hidden_scan(context, permutation_rounds=2)
+    assert 'api04.example.com' in two.subdomains
+
+
+def test_budget_caps_candidates(dns_stub):
+    _server, context = dns_stub(ZONE)
+    enumerator, summary = hidden_scan(context, permutation_budget=1)
+    assert 'api02.example.com' in enumerator.subdomains
+    assert 'api03.example.com' not in enumerator.subdomains
+    assert summary == 'Hidden subdomain search completed (1 rounds, 1 candidates)'
@@ -0,0 +1,30 @@
+import subrecon
+from subrecon import SubdomainEnumerator
+
+
+def test_recursive_stage_uses_one_progress_bar(dns_stub, monkeypatch):
+    _server, context = dns_stub({
+        'dev.example.com': [('A', '10.0.0.1')],
+        'api.dev.example.com': [('A', '10.0.0.2')],
+        'www.example.com': [('A', '10.0.0.3')],
+    })
+    bars = []
+    real_tqdm = subrecon.tqdm
+
+    def counting_tqdm(*args, **kwargs):
+        bar = real_tqdm(*args, **kwargs)
+        bars.append(bar)
+        return bar
+
+    monkeypatch.setattr(subrecon, 'tqdm', counting_tqdm)
+    monkeypatch.setattr(subrecon, 'TQDM_AVAILABLE', True)
+    enumerator = SubdomainEnumerator('example.com', context=context, write_files=False, query_budget=2000)
+    enumerator.common_subdomains = ['api', 'mail'] + [f"w{i}" for i in range(600)]
+    enumerator.add_subdomain('dev.example.com', 'test')
+    enumerator.add_subdomain('www.example.com', 'test')
+    enumerator.recursive_enumeration()
+
+    assert 'api.dev.example.com' in enumerator.subdomains
+    assert len(bars) == 1
+    assert bars[0].n == bars[0].total <= 2000
+    assert bars[0].n > 2 * subrecon.ExpansionScheduler.CHUNK
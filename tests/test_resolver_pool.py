@@ -0,0 +1,92 @@
+import random
+import socket
+from collections import Counter
+
+import pytest
+
+from dns_stub import StubDNSServer
+from subrecon import AsyncDNSEngine, ResolverPool, parse_nameserver
+
+ZONE = {'www.example.com': [('A', '10.0.0.1')]}
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(zone):
+        server = StubDNSServer(zone)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.close()
+
+
+@pytest.fixture
+def engine():
+    """engine(*addresses) -> AsyncDNSEngine שבוחר שרתים לפי הסדר (הראשון שעוד לא נוסה)"""
+    engines = []
+
+    def start(*addresses, timeout=2.0):
+        dns = AsyncDNSEngine(list(addresses), timeout=timeout)
+        order = [parse_nameserver(address) for address in addresses]
+        dns.pool.pick = lambda exclude=(), candidates=None: next(s for s in order if s not in exclude)
+        engines.append(dns)
+        return dns
+
+    yield start
+    for dns in engines:
+        dns.close()
+
+
+def test_nxdomain_and_nodata_are_final(servers, engine):
+    first, second = servers(ZONE), servers(ZONE)
+    dns = engine(first.address, second.address)
+    missing = dns.run(dns.query('nope.example.com'))
+    nodata = dns.run(dns.query('www.example.com', 'AAAA'))
+    assert missing.rcode == 'NXDOMAIN' and not missing.found
+    assert nodata.rcode == 'NOERROR' and not nodata.found
+    assert first.names == ['nope.example.com', 'www.example.com']
+    assert second.names == []
+
+
+def test_servfail_is_retried_on_another_resolver(servers, engine):
+    broken = servers({'www.example.com': [('SERVFAIL', None)]})
+    healthy = servers(ZONE)
+    dns = engine(broken.address, healthy.address)
+    result = dns.run(dns.query('www.example.com'))
+    assert result.found and result.values() == ['10.0.0.1']
+    assert broken.names == healthy.names == ['www.example.com']
+    assert dns.pool.health[parse_nameserver(broken.address)].rcodes == {'SERVFAIL': 1}
+
+
+def test_timeout_is_retried_on_another_resolver(servers, engine):
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+    try:
+        address = '127.0.0.1:%d' % silent.getsockname()[1]
+        healthy = servers(ZONE)
+        dns = engine(address, healthy.address, timeout=0.3)
+        result = dns.run(dns.query('www.example.com'))
+        assert result.found
+        assert healthy.names == ['www.example.com']
+        assert dns.pool.health[parse_nameserver(address)].rcodes == {'TIMEOUT': 1}
+    finally:
+        silent.close()
+
+
+def test_health_weighting_moves_traffic_off_failing_resolver():
+    pool = ResolverPool(['127.0.0.1:1001', '127.0.0.1:1002'])
+    bad, good = pool.servers
+    for _ in range(20):
+        pool.record(bad, None, 'SERVFAIL')
+        pool.record(good, 0.02, 'NOERROR')
+    assert pool.health[good].weight > 10 * pool.health[bad].weight
+    random.seed(1)
+    picks = Counter(pool.pick() for _ in range(1000))
+    assert picks[good] > 900
+    # שרת חולה עדיין מקבל שאילתה כשהוא היחיד שלא נוסה
+    assert pool.pick(exclude={good}) == bad
+    assert pool.summary()[0]['server'] == '127.0.0.1:1002'
@@ -0,0 +1,122 @@
+import json
+import time
+
+from subrecon import ScanJournal, SubdomainEnumerator, TargetState
+
+
+def write_state(path, entries):
+    with open(path, 'w') as f:
+        for name, entry in entries.items():
+            f.write(json.dumps(dict(entry, name=name)) + '\n')
+
+
+def entry(records, last_checked, first_seen=0, last_seen=None, ttl=300):
+    return {'records': records, 'ttl': ttl, 'first_seen': first_seen,
+            'last_seen': last_checked if last_seen is None else last_seen,
+            'last_checked': last_checked, 'source': 'crt.sh'}
+
+
+def test_interval_grows_with_stability_and_is_capped():
+    state = TargetState('unused')
+    assert state.interval(entry([], 0, ttl=60)) == TargetState.MIN_INTERVAL
+    assert state.interval(entry([], 0, ttl=7200)) == 7200
+    assert state.interval(entry([], 0, last_seen=8 * 3600)) == 2 * 3600
+    assert state.interval(entry([], 0, last_seen=365 * 86400)) == TargetState.MAX_INTERVAL
+
+
+def test_due_depends_on_last_check():
+    state = TargetState('unused')
+    now = 1000000
+    state.entries = {'www.example.com': entry([], now - 60, first_seen=now - 60),
+                     'old.example.com': entry([], now - 7200, first_seen=now - 7200)}
+    assert state.due('new.example.com', now)
+    assert not state.due('www.example.com', now)
+    assert state.due('old.example.com', now)
+
+
+def run_incremental(context, path, *names, journal=None):
+    state = TargetState(path)
+    state.load()
+    enumerator = SubdomainEnumerator('example.com', context=context, write_files=False, quiet=True, journal=journal)
+    if journal is not None:
+        enumerator.resume_from_journal()
+    enumerator.load_state(state)
+    for name in names:
+        enumerator.add_subdomain(name, 'test')
+    enumerator.validate_all_subdomains()
+    return enumerator
+
+
+def test_validation_diffs_against_previous_scan(dns_stub, tmp_path):
+    server, context = dns_stub({
+        'same.example.com': [('A', '10.0.0.1')],
+        'moved.example.com': [('A', '10.0.0.3')],
+        'flaky.example.com': [('SERVFAIL', None)],
+        'new.example.com': [('A', '10.0.0.4')],
+    })
+    now = time.time()
+    path = str(tmp_path / 'example.com.jsonl')
+    write_state(path, {
+        'fresh.example.com': entry([['A', '10.0.0.9']], now),  # לא הגיע זמנו - לא נשאל בכלל
+        'same.example.com': entry([['A', '10.0.0.1']], 0),
+        'moved.example.com': entry([['A', '10.0.0.2']], 0),
+        'gone.example.com': entry([['A', '10.0.0.5']], 0),
+        'flaky.example.com': entry([['A', '10.0.0.6']], 0),
+    })
+    enumerator = run_incremental(context, path, 'new.example.com')
+
+    diff = enumerator.diff
+    assert [item['name'] for item in diff['added']] == ['new.example.com']
+    assert [item['name'] for item in diff['removed']] == ['gone.example.com']
+    assert diff['changed'] == [{'name': 'moved.example.com', 'old': [('A', '10.0.0.2')], 'new': [('A', '10.0.0.3')]}]
+    # SERVFAIL הוא כשל זמני, לא הוכחה שהשם נעלם
+    assert 'flaky.example.com' in enumerator.validated_subs
+    assert 'fresh.example.com' in enumerator.validated_subs
+    assert 'gone.example.com' not in enumerator.validated_subs
+
+    saved = TargetState(path)
+    saved.load()
+    assert set(saved.entries) == {'fresh.example.com', 'same.example.com', 'moved.example.com',
+                                  'flaky.example.com', 'new.example.com'}
+    assert saved.entries['flaky.example.com']['records'] == [('A', '10.0.0.6')]
+    assert saved.entries['moved.example.com']['records'] == [('A', '10.0.0.3')]
+    assert saved.entries['moved.example.com']['first_seen'] == 0
+    assert saved.entries['same.example.com']['last_checked'] >= now
+    assert saved.entries['fresh.example.com']['last_checked'] == now
+
+    # סריקה שנייה מיד אחריה: אין שינויים ואין שמות שהגיע זמנם
+    asked = len(server.names)
+    again = run_incremental(context, path)
+    assert again.diff == {'added': [], 'removed': [], 'changed': []}
+    assert set(server.names[asked:]) == {'flaky.example.com'}  # SERVFAIL לא מעדכן את last_checked
+
+
+def test_resumed_incremental_scan_keeps_names_validated_before_the_crash(dns_stub, tmp_path):
+    server, context = dns_stub({
+        'www.example.com': [('A', '10.0.0.5')],
+        'api.example.com': [('A', '10.0.0.2')],
+    })
+    path = str(tmp_path / 'example.com.jsonl')
+    write_state(path, {'www.example.com': entry([['A', '10.0.0.1']], 0)})
+    journal_path = str(tmp_path / 'scan.journal')
+    params = {'domain': 'example.com', 'wordlist': None, 'wordlist_shard': None}
+    journal = ScanJournal(journal_path)
+    journal.open(params)
+    journal.record_discovered('www.example.com', 'crt.sh')
+    journal.record_discovered('api.example.com', 'crt.sh')
+    journal.record_validated('www.example.com')
+    journal.close()
+
+    resumed = ScanJournal(journal_path)
+    assert resumed.open(params, resume=True)
+    enumerator = run_incremental(context, path, journal=resumed)
+    resumed.close()
+    assert 'www.example.com' not in server.names
+
+    # www אומת לפני הקריסה ונשאר כמו שהיה; api נבדק עכשיו
+    assert [item['name'] for item in enumerator.diff['added']] == ['api.example.com']
+    assert enumerator.diff['changed'] == [] and enumerator.diff['removed'] == []
+    saved = TargetState(path)
+    saved.load()
+    assert saved.entries['www.example.com']['records'] == [('A', '10.0.0.1')]
+    assert saved.entries['api.example.com']['records'] == [('A', '10.0.0.2')]
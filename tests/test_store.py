@@ -0,0 +1,94 @@
+import random
+import tracemalloc
+
+from subrecon import SubdomainStore
+
+
+def test_add_is_case_insensitive_and_reports_new_names():
+    store = SubdomainStore()
+    assert store.add('WWW.Example.com.', 'crt.sh') is True
+    assert store.add('www.example.com', 'bruteforce') is False
+    assert store.add('.example.com') is False
+    assert store.add('a..example.com') is False
+    assert 'www.EXAMPLE.com' in store
+    assert len(store) == 1
+    assert store.meta('www.example.com')['source'] == 'crt.sh'
+
+
+def test_records_update_existing_name_but_keep_source():
+    store = SubdomainStore()
+    store.add('www.example.com', 'crt.sh')
+    first_seen = store.meta('www.example.com')['first_seen']
+    assert store.add('www.example.com', 'validation', records=['10.0.0.1']) is False
+    meta = store.meta('www.example.com')
+    assert meta == {'source': 'crt.sh', 'first_seen': first_seen, 'records': ('10.0.0.1',)}
+    assert store.meta('nope.example.com') is None
+
+
+def test_iteration_is_canonical_order():
+    names = ['b.example.com', 'example.com', 'a-b.example.com', 'x.a.example.com',
+             'a.example.com', 'z.example.com', 'mail.example.org']
+    store = SubdomainStore(names)
+    # הורה לפני ילדיו, והשוואה label אחרי label ('a' < 'a-b' גם ש-'-' < '.')
+    assert list(store) == ['example.com', 'a.example.com', 'x.a.example.com', 'a-b.example.com',
+                           'b.example.com', 'z.example.com', 'mail.example.org']
+    assert [name for name, _meta in store.items()] == list(store)
+
+
+def test_under_only_yields_names_below():
+    store = SubdomainStore(['b.example.com', 'dev.example.com', 'api.dev.example.com',
+                            'x.api.dev.example.com', 'devx.example.com'])
+    assert list(store.under('a.b.example.com')) == []
+    assert list(store.under('dev.example.com')) == ['dev.example.com', 'api.dev.example.com',
+                                                    'x.api.dev.example.com']
+    assert list(store.under('dev.example.com', include_self=False)) == ['api.dev.example.com',
+                                                                        'x.api.dev.example.com']
+    assert list(store.under('nope.example.com')) == []
+
+
+def test_discard_and_readd():
+    store = SubdomainStore(['a.example.com', 'b.example.com'])
+    store.discard('a.example.com')
+    store.discard('missing.example.com')
+    assert 'a.example.com' not in store
+    assert list(store) == ['b.example.com']
+    assert store.add('a.example.com', 'again') is True
+    assert list(store) == ['a.example.com', 'b.example.com']
+    store.clear()
+    assert not store and list(store) == []
+
+
+def test_merged_block_and_pending_names_stay_consistent():
+    random.seed(13)
+    names = ['w%05d.%s.example.com' % (i, random.choice(['eu', 'us', 'ap'])) for i in range(3 * SubdomainStore.MERGE_MIN)]
+    store = SubdomainStore()
+    for name in names:
+        store.add(name, 'bruteforce')
+    removed = names[::3]
+    for name in removed:
+        store.discard(name)
+    for name in removed[::2]:
+        store.add(name, 'again')
+    expected = set(names) - set(removed) | set(removed[::2])
+    assert len(store) == len(expected)
+    assert list(store) == sorted(expected, key=lambda name: name.split('.')[::-1])
+    assert all(name in store for name in expected)
+    assert sum(1 for name in names if name in store) == len(expected)
+    assert list(store.under('eu.example.com')) == sorted(name for name in expected if name.endswith('.eu.example.com'))
+
+
+def test_smaller_than_a_set():
+    names = ['w%06d.example.com' % i for i in range(50000)]
+    tracemalloc.start()
+    as_set = {name.encode().decode() for name in names}
+    set_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del as_set
+    tracemalloc.start()
+    store = SubdomainStore()
+    for name in names:
+        store.add(name.encode().decode(), 'bruteforce')
+    store_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(store) == len(names)
+    assert store_size < set_size
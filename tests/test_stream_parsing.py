@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+import requests
+
+from subrecon import (JSONStreamError, ScanContext, SubdomainEnumerator, compile_host_pattern, iter_json_array,
+                      iter_text_matches)
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64, 4096])
+def test_items_across_chunk_boundaries(size):
+    items = [{'id': i, 'name_value': f"w{i}.example.com\nx{i}.example.com"} for i in range(50)]
+    items += [12345, -0.5, 'שם', [1, [2, 3]], None, True]
+    data = json.dumps(items).encode('utf-8')
+    assert list(iter_json_array(split(data, size))) == items
+
+
+def test_number_at_chunk_end_is_not_cut():
+    assert list(iter_json_array([b'[12', b'34, 5', b'6]'])) == [1234, 56]
+
+
+def test_whitespace_and_empty_array():
+    assert list(iter_json_array([b'  \n[ ', b' ]  '])) == []
+
+
+def test_empty_response():
+    with pytest.raises(JSONStreamError, match='Empty'):
+        list(iter_json_array([b'', b'  ']))
+
+
+def test_not_an_array_keeps_unparsed_text():
+    with pytest.raises(JSONStreamError) as info:
+        list(iter_json_array([b'<html>a.example.com', b' b.example.com</html>']))
+    assert info.value.remainder.startswith('<html>a.example.com')
+
+
+def test_truncated_array_keeps_unparsed_text():
+    items = []
+    with pytest.raises(JSONStreamError) as info:
+        for item in iter_json_array(split(b'[{"id": 1}, {"id": 2, "name_value": "c.example.com', 5)):
+            items.append(item)
+    assert items == [{'id': 1}]
+    assert 'c.example.com' in info.value.remainder
+
+
+def test_item_over_buffer_limit():
+    with pytest.raises(JSONStreamError, match='buffer limit'):
+        list(iter_json_array(split(b'["' + b'a' * 1000 + b'"]', 10), max_buffer=100))
+
+
+@pytest.mark.parametrize('size', [1, 5, 50, 4096])
+def test_text_matches_across_chunk_boundaries(size):
+    names = [f"host{i}.example.com" for i in range(200)]
+    data = ' junk '.join(names).encode()
+    pattern = compile_host_pattern('example.com')
+    assert list(iter_text_matches(split(data, size), pattern, overlap=16)) == names
+
+
+def test_crt_sh_skips_certificates_seen_in_earlier_queries(monkeypatch):
+    bodies = [
+        [{'id': i, 'name_value': f"w{i}.example.com"} for i in range(5000)],
+        # אותן תעודות בווריאנט אחר של השאילתה - השמות כאן לא אמורים להיכנס
+        [{'id': i, 'name_value': f"dup{i}.example.com"} for i in range(5000)]
+        + [{'id': 9999, 'name_value': 'new.example.com'}],
+        [{'name_value': 'noid.example.com'}],
+    ]
+
+    def fake_get(url, stream=False):
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(json.dumps(bodies.pop(0)).encode('utf-8'))
+        return response
+
+    context = ScanContext(nameservers=['127.0.0.1:9'])
+    try:
+        enumerator = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False)
+        monkeypatch.setattr(enumerator, 'http_get', fake_get)
+        monkeypatch.setattr(enumerator.dns_engine, 'prefetch', lambda *args, **kwargs: False)
+        enumerator.crt_sh_advanced()
+    finally:
+        context.close()
+    names = set(enumerator.subdomains)
+    assert len(names) == 5002
+    assert {'w4999.example.com', 'new.example.com', 'noid.example.com'} <= names
+    assert not any(name.startswith('dup') for name in names)
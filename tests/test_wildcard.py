@@ -0,0 +1,44 @@
+from subrecon import DNSResult, SubdomainEnumerator, WildcardFingerprint
+
+
+def test_wildcard_answers_are_dropped_and_real_names_kept(dns_stub):
+    server, context = dns_stub({
+        '*.example.com': [('A', '10.9.9.9')],
+        'www.example.com': [('A', '10.0.0.1')],
+        'mirror.example.com': [('A', '10.9.9.9')],
+        'www.other.com': [('A', '10.0.0.2')],
+    })
+    enumerator = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False)
+    found = enumerator.resolve_names(['www.example.com', 'nope.example.com', 'mirror.example.com',
+                                      'www.other.com'], filter_wildcards=True)
+    assert sorted(found) == ['www.example.com', 'www.other.com']
+    assert enumerator.wildcards.rejected == 2
+    assert enumerator.wildcards.wildcard_zones() == ['example.com']
+
+    # הבדיקה נעשית פעם אחת לכל zone
+    asked = len(server.names)
+    assert enumerator.resolve_names(['api.example.com'], filter_wildcards=True) == []
+    assert server.names[asked:] == ['api.example.com']
+
+
+def test_without_filter_wildcard_answers_count(dns_stub):
+    _server, context = dns_stub({'*.example.com': [('A', '10.9.9.9')]})
+    enumerator = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False)
+    assert enumerator.resolve_names(['nope.example.com']) == ['nope.example.com']
+
+
+def answer(name, *addresses, ttl=300):
+    return DNSResult(name, 'A', 'NOERROR', [(name, 'A', ttl, address) for address in addresses])
+
+
+def test_rotating_wildcard_matches_by_network_and_ttl():
+    fingerprint = WildcardFingerprint('example.com', 'A')
+    fingerprint.addresses = {'10.9.9.1', '10.9.9.2'}
+    fingerprint.ttl = 300
+    fingerprint.rotating = True
+    assert fingerprint.matches(answer('a.example.com', '10.9.9.7'))
+    assert not fingerprint.matches(answer('b.example.com', '10.9.9.7', ttl=3600))
+    assert not fingerprint.matches(answer('c.example.com', '10.8.0.1'))
+    fingerprint.rotating = False
+    assert not fingerprint.matches(answer('a.example.com', '10.9.9.7'))
+    assert fingerprint.matches(answer('d.example.com', '10.9.9.2'))
@@ -0,0 +1,63 @@
+import pytest
+
+import subrecon
+from subrecon import CompiledWordlist, ScanContext, SubdomainEnumerator, compile_wordlist_command, main
+
+
+@pytest.fixture
+def words(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_text('www\nApi\nmail\nwww\n')
+    return str(path)
+
+
+def test_compile_and_shard(words, tmp_path):
+    output = str(tmp_path / 'words.srwl')
+    compile_wordlist_command([words, '-o', output, '--no-builtin', '--affix', '{}-dev'])
+    compiled = CompiledWordlist(output)
+    assert list(compiled) == ['api', 'api-dev', 'mail', 'mail-dev', 'www', 'www-dev']
+    shards = [list(compiled.slice(start, stop)) for start, stop in compiled.split(2)]
+    assert sum(shards, []) == list(compiled)
+
+
+@pytest.mark.parametrize('affix', ['dev', '{}-{}', '{}_x!'])
+def test_bad_affix_is_a_usage_error(words, tmp_path, affix, capsys, monkeypatch):
+    monkeypatch.setattr(subrecon, 'compile_wordlist', lambda *a, **k: pytest.fail('compiled with a bad rule'))
+    with pytest.raises(SystemExit):
+        compile_wordlist_command([words, '-o', str(tmp_path / 'out.srwl'), '--affix', affix])
+    assert 'invalid affix rule' in capsys.readouterr().err
+
+
+def test_missing_output_dir_fails_before_sorting(words, tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(subrecon, 'compile_wordlist', lambda *a, **k: pytest.fail('sorted before checking output'))
+    with pytest.raises(SystemExit):
+        compile_wordlist_command([words, '-o', str(tmp_path / 'missing' / 'out.srwl')])
+    assert 'output directory' in capsys.readouterr().err
+
+
+def test_shard_requires_compiled_wordlist(words, capsys):
+    for argv in (['example.com', '--wordlist-shard', '1/2'],
+                 ['example.com', '-w', words, '--wordlist-shard', '1/2']):
+        with pytest.raises(SystemExit):
+            main(argv)
+        assert 'compiled wordlist' in capsys.readouterr().err
+
+
+def test_builtin_words_go_to_the_first_shard_only(words, tmp_path):
+    output = str(tmp_path / 'words.srwl')
+    compile_wordlist_command([words, '-o', output, '--no-builtin'])
+    context = ScanContext(nameservers=['127.0.0.1:9'])
+    try:
+        builtin = list(context.common_subdomains)
+        shards = []
+        for k in (1, 2):
+            enumerator = SubdomainEnumerator('example.com', context=context, quiet=True, write_files=False,
+                                             wordlist_shard=(k, 2))
+            shards.append(list(enumerator.open_compiled_wordlist(output)))
+    finally:
+        context.close()
+    assert shards[0][:len(builtin)] == builtin
+    assert not set(builtin) & set(shards[1])
+    tried = shards[0] + shards[1]
+    assert len(tried) == len(set(tried))
+    assert set(tried) == set(builtin) | {'api', 'mail', 'www'}